@@ -1,8 +1,8 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from typing import Dict, Any, List, Optional
 from database import db
+import asyncio
 import os
-import time
 
 class AIService:
     def __init__(self):
@@ -16,7 +16,7 @@ class AIService:
             api_key = db.get_setting('openai_api_key')
             if api_key:
                 # Use latest OpenAI SDK initialization (v1.0+)
-                self.client = OpenAI(
+                self.client = AsyncOpenAI(
                     api_key=api_key,
                     timeout=60.0,  # Increased timeout for complex health analysis
                     max_retries=2
@@ -34,7 +34,7 @@ class AIService:
 
             db.save_setting('openai_api_key', api_key)
             # Reinitialize client with new key
-            self.client = OpenAI(
+            self.client = AsyncOpenAI(
                 api_key=api_key,
                 timeout=60.0,  # Increased timeout for complex health analysis
                 max_retries=2
@@ -49,18 +49,18 @@ class AIService:
         self.model = model
         db.save_setting('openai_model', model)
 
-    def _call_openai_with_retry(self, **params) -> Any:
-        """Call OpenAI API with retry logic"""
+    async def _call_openai_with_retry(self, **params) -> Any:
+        """Await the OpenAI API with retry logic; concurrent calls interleave instead of holding threads"""
         max_retries = 5
         last_error = None
 
         for attempt in range(max_retries):
             try:
-                return self.client.chat.completions.create(**params)
+                return await self.client.chat.completions.create(**params)
             except Exception as e:
                 last_error = str(e)
                 if attempt < max_retries - 1:
-                    time.sleep(0.5)
+                    await asyncio.sleep(0.5)
                     continue
                 raise Exception(f'Failed after {max_retries} attempts. Last error: {last_error}')
 
@@ -69,7 +69,11 @@ class AIService:
         context = "Database Schema:\n\n"
 
         for table in schema_data.get('tables', []):
-            table_name = table.get('name') if isinstance(table, dict) else table
+            if isinstance(table, dict):
+                schema = table.get('schema')
+                table_name = table.get('name') if schema in (None, 'public') else f"{schema}.{table.get('name')}"
+            else:
+                table_name = table
             context += f"Table: {table_name}\n"
 
             columns = schema_data.get('columns', {}).get(table_name, [])
@@ -89,7 +93,7 @@ class AIService:
 
         return context
 
-    def generate_sql(self, prompt: str, schema_context: str, conversation_history: list = None) -> Dict[str, Any]:
+    async def generate_sql(self, prompt: str, schema_context: str, conversation_history: list = None) -> Dict[str, Any]:
         """Generate SQL from natural language prompt with conversation history"""
         if not self.client:
             return {
@@ -148,7 +152,7 @@ Rules:
                 params["temperature"] = 0.3
                 params["max_tokens"] = 500
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
 
             sql = response.choices[0].message.content.strip()
 
@@ -170,7 +174,7 @@ Rules:
                 'error': str(e)
             }
 
-    def explain_query(self, query: str, schema_context: str) -> Dict[str, Any]:
+    async def explain_query(self, query: str, schema_context: str) -> Dict[str, Any]:
         """Explain SQL query in plain English"""
         if not self.client:
             return {
@@ -215,7 +219,7 @@ Rules:
                 params["temperature"] = 0.5
                 params["max_tokens"] = 1000
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
             explanation = response.choices[0].message.content.strip()
 
             return {
@@ -229,7 +233,7 @@ Rules:
                 'error': str(e)
             }
 
-    def debug_query(self, query: str, error: str, schema_context: str) -> Dict[str, Any]:
+    async def debug_query(self, query: str, error: str, schema_context: str) -> Dict[str, Any]:
         """Debug and fix SQL query errors"""
         if not self.client:
             return {
@@ -272,7 +276,7 @@ Rules:
                 params["temperature"] = 0.3
                 params["max_tokens"] = 800
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
             content = response.choices[0].message.content.strip()
 
             # Try to parse as JSON first
@@ -317,7 +321,7 @@ Rules:
                 'error': str(e)
             }
 
-    def optimize_query(self, query: str, schema_context: str, exec_time: float = None,
+    async def optimize_query(self, query: str, schema_context: str, exec_time: float = None,
                       indexes_context: str = None) -> Dict[str, Any]:
         """Optimize SQL query for better performance"""
         if not self.client:
@@ -364,7 +368,7 @@ Rules:
                 params["temperature"] = 0.4
                 params["max_tokens"] = 1500
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
             content = response.choices[0].message.content.strip()
 
             # Try to parse as JSON
@@ -413,8 +417,8 @@ Rules:
                 'error': str(e)
             }
 
-    def analyze_explain_plan(self, explain_output: str, query: str, schema_context: str) -> Dict[str, Any]:
-        """Analyze EXPLAIN ANALYZE output and provide insights"""
+    async def analyze_explain_plan(self, explain_output: str, query: str, schema_context: str, hints: str = '') -> Dict[str, Any]:
+        """Analyze EXPLAIN ANALYZE output and provide insights, building on the local analyzer's hints"""
         if not self.client:
             return {
                 'success': False,
@@ -432,11 +436,13 @@ Rules:
 - Provide specific recommendations for improvement
 - Highlight the most expensive operations
 - Suggest indexes or query rewrites where applicable
+- Findings from an automated rule check are listed with the plan; confirm, refine or dismiss them rather than repeating them
 - Return response in JSON format with 'insights' (array), 'bottlenecks' (array), 'recommendations' (array), and 'summary' keys"""
 
             messages = [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze this query execution plan:\n\nQuery:\n{query}\n\nEXPLAIN ANALYZE Output:\n{explain_output}"}
+                {"role": "user", "content": f"Analyze this query execution plan:\n\nQuery:\n{query}\n\nEXPLAIN ANALYZE Output:\n{explain_output}"
+                                            + (f"\n\nAutomated findings:\n{hints}" if hints else "")}
             ]
 
             is_gpt5_or_o_series = (
@@ -457,7 +463,7 @@ Rules:
                 params["temperature"] = 0.4
                 params["max_tokens"] = 2000
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
             content = response.choices[0].message.content.strip()
 
             # Try to parse as JSON
@@ -490,9 +496,8 @@ Rules:
                 'error': str(e)
             }
 
-    def suggest_indexes(self, schema_data: Dict[str, Any], query_history: List[Dict[str, Any]],
-                       existing_indexes: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
-        """Suggest missing indexes based on query history and schema"""
+    async def narrate_index_advice(self, advice_text: str, schema_context: str) -> Dict[str, Any]:
+        """Explain index recommendations computed locally, without changing them"""
         if not self.client:
             return {
                 'success': False,
@@ -500,37 +505,22 @@ Rules:
             }
 
         try:
-            schema_context = self.build_schema_context(schema_data)
-
-            # Build indexes context
-            indexes_context = "\n\nExisting Indexes:\n"
-            for table, indexes in existing_indexes.items():
-                indexes_context += f"\nTable: {table}\n"
-                for idx in indexes:
-                    indexes_context += f"  - {idx.get('name', 'unknown')}: {idx.get('definition', 'N/A')}\n"
-
-            # Build query history context (limit to recent queries)
-            queries_context = "\n\nRecent Query History (most frequent patterns):\n"
-            for i, qh in enumerate(query_history[:50], 1):  # Limit to 50 queries
-                queries_context += f"{i}. {qh.get('query', '')[:200]}...\n"
-
             system_prompt = f"""You are a PostgreSQL database performance expert specializing in index optimization.
 
-Analyze the schema, existing indexes, and query patterns to recommend missing indexes that would improve performance.
+The index recommendations below were computed from the workload by a deterministic advisor. Explain them to the user.
 
-{schema_context}{indexes_context}
+{schema_context}
 
 Rules:
-- Look for common patterns in WHERE clauses, JOINs, and ORDER BY
-- Suggest composite indexes where multiple columns are frequently used together
-- Don't suggest indexes that already exist
-- Prioritize high-impact indexes
-- Provide CREATE INDEX statements
-- Return response in JSON format with 'recommendations' (array of objects with 'table', 'columns', 'reason', 'create_statement' keys)"""
+- Do not add, remove, reorder or change any recommended index
+- Explain why each column order serves the statements it was derived from
+- Mention write and storage costs, and which existing indexes become redundant
+- Point out patterns that are already served by existing indexes
+- Keep it to a few short paragraphs of plain text"""
 
             messages = [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Suggest missing indexes based on these query patterns:\n{queries_context}"}
+                {"role": "user", "content": f"Explain these index recommendations:\n\n{advice_text}"}
             ]
 
             is_gpt5_or_o_series = (
@@ -546,34 +536,16 @@ Rules:
             }
 
             if is_gpt5_or_o_series:
-                params["max_completion_tokens"] = 2000
+                params["max_completion_tokens"] = 1500
             else:
                 params["temperature"] = 0.3
-                params["max_tokens"] = 2000
-
-            response = self._call_openai_with_retry(**params)
-            content = response.choices[0].message.content.strip()
+                params["max_tokens"] = 1500
 
-            # Try to parse as JSON
-            import json
-            try:
-                result = json.loads(content)
-                recommendations = result.get('recommendations', [])
-            except:
-                # Fallback: try to extract CREATE INDEX statements
-                recommendations = []
-                lines = content.split('\n')
-                for line in lines:
-                    if 'CREATE INDEX' in line.upper():
-                        recommendations.append({
-                            'create_statement': line.strip(),
-                            'reason': 'Based on query patterns'
-                        })
+            response = await self._call_openai_with_retry(**params)
 
             return {
                 'success': True,
-                'recommendations': recommendations,
-                'analyzed_queries': len(query_history)
+                'narrative': response.choices[0].message.content.strip()
             }
 
         except Exception as e:
@@ -582,7 +554,7 @@ Rules:
                 'error': str(e)
             }
 
-    def analyze_slow_queries_batch(self, queries: List[Dict[str, Any]], schema_context: str) -> Dict[str, Any]:
+    async def analyze_slow_queries_batch(self, queries: List[Dict[str, Any]], schema_context: str) -> Dict[str, Any]:
         """Analyze multiple slow queries and provide optimization recommendations"""
         if not self.client:
             return {
@@ -640,7 +612,7 @@ Rules:
                 params["temperature"] = 0.4
                 params["max_tokens"] = 3000
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
             content = response.choices[0].message.content.strip()
 
             # Try to parse as JSON
@@ -667,7 +639,7 @@ Rules:
                 'error': str(e)
             }
 
-    def analyze_database_health(self, bloat_data: Dict[str, Any], index_data: Dict[str, Any],
+    async def analyze_database_health(self, bloat_data: Dict[str, Any], index_data: Dict[str, Any],
                                 cache_data: Dict[str, Any], schema_context: str) -> Dict[str, Any]:
         """Analyze database health and provide optimization recommendations"""
         if not self.client:
@@ -684,12 +656,19 @@ BLOAT & VACUUM STATS:
 {len(bloat_data.get('tables', []))} tables analyzed
 Sample top issues:
 """
-            # Add top 5 most bloated tables
+            # Add the 5 tables and indexes wasting the most space; bloat is estimated wasted pages, not dead tuples
             bloated_tables = sorted(bloat_data.get('tables', []),
-                                   key=lambda x: x.get('bloat_percent', 0),
+                                   key=lambda x: x.get('bloat_bytes', 0),
                                    reverse=True)[:5]
             for t in bloated_tables:
-                health_context += f"- {t['tablename']}: {t['bloat_percent']}% bloat, {t['total_size']}, {t['n_dead_tup']} dead tuples\n"
+                health_context += f"- {t['tablename']}: {t['bloat_percent']}% bloat ({t.get('bloat_bytes', 0) // 1024} kB wasted), " \
+                                  f"{t['total_size']}, {t['n_dead_tup']} dead tuples\n"
+            bloated_indexes = sorted(bloat_data.get('indexes', []),
+                                     key=lambda x: x.get('bloat_bytes', 0),
+                                     reverse=True)[:5]
+            for i in bloated_indexes:
+                health_context += f"- index {i['indexname']} on {i['tablename']}: {i['bloat_percent']}% bloat " \
+                                  f"({i.get('bloat_bytes', 0) // 1024} kB wasted), {i['total_size']}\n"
 
             health_context += f"\nINDEX ANALYSIS:\n"
             health_context += f"{len(index_data.get('indexes', []))} indexes analyzed\n"
@@ -756,7 +735,7 @@ Rules:
                 params["temperature"] = 0.4
                 params["max_tokens"] = 2500
 
-            response = self._call_openai_with_retry(**params)
+            response = await self._call_openai_with_retry(**params)
             content = response.choices[0].message.content.strip()
 
             # Try to parse as JSON
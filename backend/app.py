@@ -1,41 +1,274 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, copy_current_request_context
 from flask_cors import CORS
 import os
+import json
+import asyncio
+import hashlib
+import csv
 from database import db
-from postgres_client import pg_client
+from postgres_client import pg_client, RESULT_FORMATS, EXPORT_FORMATS, pa
 from ai_service import ai_service
+from async_runtime import runtime
 from sql_formatter import format_sql
+import data_import
+import plan_analyzer
+import index_advisor
+from plan_model import Plan
+from plan_capture import plan_capture
+from monitoring import (statement_sampler, lock_sampler, activity_monitor, wait_profiler,
+                        DEFAULT_ACTIVITY_INTERVAL_SECONDS, DEFAULT_PROFILE_SECONDS, DEFAULT_PROFILE_HZ,
+                        DEFAULT_PROFILE_TOP_K)
 import traceback
+import time
+import select
+import socket
+import threading
+import queue
+import uuid
+from contextlib import contextmanager
+from functools import wraps
 
 app = Flask(__name__)
 # Allow all origins in development
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+def apply_runtime_settings(settings: dict):
+    """Push settings that tune the backend at runtime into the services that use them"""
+    if settings.get('pool_max_total_connections'):
+        pg_client.pool_manager.set_max_total(int(settings['pool_max_total_connections']))
+    if settings.get('query_max_rows'):
+        pg_client.max_rows = int(settings['query_max_rows'])
+    if settings.get('query_max_mb'):
+        pg_client.max_bytes = int(float(settings['query_max_mb']) * 1024 * 1024)
+    if settings.get('pg_stat_sample_interval_seconds') is not None:
+        statement_sampler.interval_seconds = float(settings['pg_stat_sample_interval_seconds'])
+    if settings.get('pg_stat_retention_hours'):
+        statement_sampler.retention_hours = float(settings['pg_stat_retention_hours'])
+        lock_sampler.retention_hours = float(settings['pg_stat_retention_hours'])
+    if settings.get('lock_sample_interval_seconds') is not None:
+        lock_sampler.interval_seconds = float(settings['lock_sample_interval_seconds'])
+    if settings.get('plan_capture_threshold_ms') is not None:
+        plan_capture.threshold_ms = float(settings['plan_capture_threshold_ms'])
+    if settings.get('result_cache_max_mb') is not None or settings.get('result_cache_ttl_seconds') is not None:
+        pg_client.result_cache.configure(
+            max_bytes=int(float(settings['result_cache_max_mb']) * 1024 * 1024) if settings.get('result_cache_max_mb') is not None else None,
+            ttl_seconds=settings.get('result_cache_ttl_seconds')
+        )
+
+apply_runtime_settings(db.get_all_settings())
+
+# How often a running query checks whether its HTTP client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+# Seconds without an activity event before an SSE keepalive comment is sent
+SSE_KEEPALIVE_SECONDS = 15
+# Upper bound on items in one /batch request
+BATCH_MAX_ITEMS = 50
+
+def client_disconnected(sock) -> bool:
+    """True once the peer has closed its end of the request socket"""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+    except (BlockingIOError, InterruptedError, ValueError):
+        # ValueError: TLS sockets do not support peeking; treat as still connected
+        return False
+    except OSError:
+        return True
+
+@contextmanager
+def cancel_on_disconnect(query_id: str):
+    """Cancel query_id if the client goes away while the block is running"""
+    sock = request.environ.get('werkzeug.socket')
+    if sock is None:
+        yield
+        return
+
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(DISCONNECT_POLL_SECONDS):
+            if client_disconnected(sock):
+                pg_client.cancel_query(query_id)
+                return
+
+    threading.Thread(target=watch, name=f'pgai-watch-{query_id}', daemon=True).start()
+    try:
+        yield
+    finally:
+        done.set()
+
+def job_capable(view):
+    """Let a slow route run as a background job when called with ?async=1; poll /api/jobs/<id> for the response"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.args.get('async') not in ('1', 'true'):
+            return view(*args, **kwargs)
+
+        # Read the body now; the job outlives the request stream
+        request.get_json(silent=True)
+
+        @copy_current_request_context
+        def run():
+            response = app.make_response(view(*args, **kwargs))
+            return {'status_code': response.status_code, 'body': response.get_json()}
+
+        job_id = runtime.submit(request.endpoint, run)
+        return jsonify({'job_id': job_id, 'status': 'pending'}), 202
+    return wrapper
+
+# Where exports written to a file land unless a path is given
+EXPORT_DIR = os.path.join(os.path.expanduser('~'), '.pgai', 'exports')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'sql': 'application/sql'}
+
+def write_export_file(job_id: str, conn_data: dict, query: str, export_format: str, table_name: str, path: str) -> dict:
+    """Write an export to disk chunk by chunk, publishing progress on the job"""
+    start_time = time.time()
+    written = 0
+    reported_at = 0.0
+    with open(path, 'wb') as f:
+        for chunk in pg_client.export_query(conn_data, query, export_format, table_name, query_id=job_id):
+            f.write(chunk)
+            written += len(chunk)
+            if time.time() - reported_at >= 0.5:
+                runtime.update_job(job_id, progress={'bytes': written, 'elapsed': round(time.time() - start_time, 1)})
+                reported_at = time.time()
+    runtime.update_job(job_id, progress={'bytes': written, 'elapsed': round(time.time() - start_time, 1)})
+    return {'path': path, 'bytes': written, 'execution_time': round(time.time() - start_time, 3)}
+
+def save_import_upload() -> tuple:
+    """Persist an uploaded file so an import job can read it after the request ends"""
+    upload = request.files.get('file')
+    if upload is None:
+        raise ValueError('A file upload is required')
+
+    directory = os.path.join(os.path.expanduser('~'), '.pgai', 'imports', 'uploads')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}-{os.path.basename(upload.filename or 'upload')}")
+    upload.save(path)
+    return path, upload.filename or os.path.basename(path)
+
+def run_import(job_id: str, conn_data: dict, path: str, source_name: str, options: dict) -> dict:
+    """Import a file into a table, writing rejected rows and their errors to a side file"""
+    total_bytes = os.path.getsize(path)
+    file_progress = {'bytes_read': 0}
+    rejects = {'writer': None, 'file': None, 'path': None}
+
+    def on_reject(row, error):
+        if rejects['writer'] is None:
+            rejects['path'] = data_import.rejects_path(source_name)
+            rejects['file'] = open(rejects['path'], 'w', newline='')
+            rejects['writer'] = csv.writer(rejects['file'])
+            rejects['writer'].writerow(options['columns'] + ['_error'])
+        rejects['writer'].writerow(['' if value is None else value for value in row] + [error])
+
+    def on_progress(counts):
+        runtime.update_job(job_id, progress=dict(counts, bytes_read=file_progress['bytes_read'], total_bytes=total_bytes))
+
+    def track_bytes(position):
+        file_progress['bytes_read'] = position
+
+    try:
+        rows = data_import.read_rows(path, options['file_format'], options['delimiter'], options['sheet'], track_bytes)
+        if options['has_header']:
+            next(rows, None)
+        file_progress['bytes_read'] = 0
+        result = pg_client.import_rows(
+            conn_data, options['table_name'], options['columns'], options['types'], rows,
+            create_table=options['create_table'], validate_row=data_import.validate_row,
+            on_progress=on_progress, on_reject=on_reject, query_id=job_id
+        )
+        file_progress['bytes_read'] = total_bytes
+        on_progress(result)
+    finally:
+        if rejects['file']:
+            rejects['file'].close()
+        os.remove(path)
+
+    result['table_name'] = options['table_name']
+    result['rejects_path'] = rejects['path']
+    return result
+
+# Minimum seconds between schema fingerprint checks for one connection, so bursts of requests share a check
+SCHEMA_CHECK_INTERVAL = 5
+schema_checked_at = {}
+
 # Helper function to fetch and cache schema
+def get_columns_with_keys(conn_data: dict, table_name: str) -> list:
+    """Table columns with primary key columns marked"""
+    columns = pg_client.get_table_columns(conn_data, table_name)
+    primary_keys = pg_client.get_primary_keys(conn_data, table_name)
+    for col in columns:
+        col['is_primary_key'] = col['name'] in primary_keys
+    return columns
+
+def batch_query(conn_data: dict, params: dict) -> dict:
+    """Run a query for /batch; failures are reported as item errors"""
+    if not params.get('query'):
+        raise ValueError('query is required')
+    result_format = params.get('format', 'objects')
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f'Unsupported format: {result_format}')
+    result = pg_client.execute_query(conn_data, params['query'], params.get('limit'), result_format,
+                                     query_id=params.get('query_id'), timeout_ms=params.get('timeout_ms'),
+                                     max_rows=params.get('max_rows'), max_bytes=params.get('max_bytes'))
+    if not result.get('success'):
+        raise RuntimeError(result.get('error') or 'Query failed')
+    return result
+
+# Operations available to /batch: name -> (callable taking conn_data and params, required params)
+BATCH_OPERATIONS = {
+    'tables': (lambda c, p: pg_client.get_tables(c), ()),
+    'columns': (lambda c, p: get_columns_with_keys(c, p['table']), ('table',)),
+    'indexes': (lambda c, p: pg_client.get_table_indexes(c, p['table']), ('table',)),
+    'relations': (lambda c, p: pg_client.get_table_relations(c, p['table']), ('table',)),
+    'ddl': (lambda c, p: {'ddl': pg_client.get_table_ddl(c, p['table'])}, ('table',)),
+    'stats': (lambda c, p: pg_client.get_table_stats(c, p['table']), ('table',)),
+    'table_stats': (lambda c, p: pg_client.get_table_size_stats(c), ()),
+    'running_queries': (lambda c, p: pg_client.get_currently_running_queries(c), ()),
+    'locks': (lambda c, p: pg_client.get_lock_tree(c), ()),
+    'bloat': (lambda c, p: pg_client.get_table_bloat_analysis(c, bool(p.get('exact'))), ()),
+    'index_health': (lambda c, p: pg_client.get_index_health_analysis(c), ()),
+    'cache_hit_ratio': (lambda c, p: pg_client.get_cache_hit_ratio(c), ()),
+    'query': (batch_query, ('query',))
+}
+
+def run_batch_item(conn_data: dict, item: dict) -> dict:
+    """Run one /batch item, capturing its result or error and its wall time"""
+    start = time.time()
+    try:
+        operation = item.get('op', 'query')
+        if operation not in BATCH_OPERATIONS:
+            raise ValueError(f'Unknown operation: {operation}')
+        func, required = BATCH_OPERATIONS[operation]
+        params = item.get('params') or {}
+        missing = [name for name in required if not params.get(name)]
+        if missing:
+            raise ValueError(f"Missing parameter(s) for {operation}: {', '.join(missing)}")
+        data = func(conn_data, params)
+        return {'success': True, 'data': data, 'execution_time': time.time() - start}
+    except Exception as e:
+        return {'success': False, 'error': str(e), 'execution_time': time.time() - start}
+
 def fetch_and_cache_schema(connection_id: int, conn_data: dict) -> dict:
     """Fetch schema from PostgreSQL and cache it in SQLite"""
     try:
-        # Get tables
-        tables = pg_client.get_tables(conn_data)
+        # Signatures first, so DDL that lands while the catalog is loading is picked up by the next check
+        signatures = pg_client.get_relation_signatures(conn_data, None)
+        relation_signatures = signatures['relations'] if signatures.get('success') else None
 
-        # Build schema with full column details
-        schema_data = {
-            'tables': tables,
-            'columns': {}
-        }
-
-        # Get detailed column info for each table (limit to first 50 tables for performance)
-        for table in tables[:50]:
-            try:
-                columns = pg_client.get_table_columns(conn_data, table['name'])
-                schema_data['columns'][table['name']] = columns
-            except Exception as e:
-                print(f"Warning: Failed to get columns for {table['name']}: {e}")
-                schema_data['columns'][table['name']] = []
+        # Tables, columns, keys, indexes and foreign keys in a handful of catalog queries
+        result = pg_client.get_catalog(conn_data)
+        if not result.get('success'):
+            raise Exception(result.get('error', 'Failed to load catalog'))
+        schema_data = result['catalog']
 
         # Cache the schema
-        db.save_schema_cache(connection_id, schema_data)
-        print(f"✅ Schema cached for connection {connection_id} with {len(tables)} tables")
+        fingerprint = pg_client.fingerprint_from_signatures(relation_signatures) if relation_signatures is not None else None
+        db.save_schema_cache(connection_id, schema_data, fingerprint, relation_signatures)
+        schema_checked_at[connection_id] = time.time()
+        print(f"✅ Schema cached for connection {connection_id} with {len(schema_data['tables'])} tables")
 
         return schema_data
     except Exception as e:
@@ -43,11 +276,107 @@ def fetch_and_cache_schema(connection_id: int, conn_data: dict) -> dict:
         traceback.print_exc()
         raise
 
+def refresh_schema_cache(connection_id: int, conn_data: dict, cached: dict) -> dict:
+    """Compare the cached fingerprint with the catalog and reload only the tables that changed"""
+    result = pg_client.get_schema_fingerprint(conn_data)
+    if not result.get('success'):
+        print(f"⚠️ Could not check schema fingerprint for connection {connection_id}: {result.get('error')}")
+        return cached['schema']
+    schema_checked_at[connection_id] = time.time()
+
+    fingerprint = result['namespaces']
+    old_fingerprint = cached['fingerprint']
+    changed_schemas = sorted(
+        schema for schema in set(fingerprint) | set(old_fingerprint)
+        if fingerprint.get(schema) != old_fingerprint.get(schema)
+    )
+    if not changed_schemas:
+        return cached['schema']
+
+    result = pg_client.get_relation_signatures(conn_data, changed_schemas)
+    if not result.get('success'):
+        raise Exception(result.get('error', 'Failed to load relation signatures'))
+
+    signatures = cached['relation_signatures']
+    new_signatures = result['relations']
+    removed = [oid for oid, (schema, _) in signatures.items() if schema in changed_schemas and oid not in new_signatures]
+    modified = [oid for oid, (_, signature) in new_signatures.items() if signatures.get(oid, [None, None])[1] != signature]
+
+    if modified:
+        result = pg_client.get_catalog(conn_data, [int(oid) for oid in modified])
+        if not result.get('success'):
+            raise Exception(result.get('error', 'Failed to load catalog'))
+        partial = result['catalog']
+    else:
+        partial = {'tables': [], 'columns': {}, 'primary_keys': {}, 'indexes': {}, 'foreign_keys': {}}
+
+    schema_data = pg_client.merge_catalog(cached['schema'], partial, [int(oid) for oid in removed])
+    for oid in removed:
+        signatures.pop(oid, None)
+    signatures.update(new_signatures)
+
+    db.save_schema_cache(connection_id, schema_data, fingerprint, signatures)
+    print(f"🔄 Schema cache for connection {connection_id} refreshed: "
+          f"{len(modified)} tables reloaded, {len(removed)} dropped")
+    return schema_data
+
+def get_schema_data(connection_id: int, conn_data: dict = None, force_check: bool = False) -> dict:
+    """Get cached schema for a connection, refreshing it first if the catalog has changed"""
+    cached = db.get_schema_cache(connection_id)
+    is_current_format = cached and 'indexes' in cached['schema'] and cached['fingerprint'] and cached['relation_signatures']
+
+    if is_current_format and not force_check \
+            and time.time() - schema_checked_at.get(connection_id, 0) < SCHEMA_CHECK_INTERVAL:
+        return cached['schema']
+
+    conn_data = conn_data or db.get_connection_by_id(connection_id)
+    if not conn_data:
+        return cached['schema'] if cached else None
+
+    if not is_current_format:
+        return fetch_and_cache_schema(connection_id, conn_data)
+    return refresh_schema_cache(connection_id, conn_data, cached)
+
+def get_schema_version(connection_id: int, conn_data: dict) -> str:
+    """Hash of the cached schema fingerprint, refreshed at most every SCHEMA_CHECK_INTERVAL seconds"""
+    get_schema_data(connection_id, conn_data)
+    cached = db.get_schema_cache(connection_id)
+    fingerprint = cached.get('fingerprint') if cached else None
+    return hashlib.md5(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
 # Health check
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok'})
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status and, once finished, the result of a background job"""
+    job = runtime.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/pool-stats', methods=['GET'])
+def get_pool_stats():
+    """Get connection pool utilization across all connections"""
+    try:
+        return jsonify(pg_client.get_pool_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/result-cache', methods=['GET'])
+def get_result_cache_stats():
+    """Get query result cache size and hit counters"""
+    return jsonify(pg_client.result_cache.get_stats())
+
+@app.route('/api/result-cache', methods=['DELETE'])
+def clear_result_cache():
+    """Drop cached query results, optionally for one connection only"""
+    connection_id = request.args.get('connection_id', type=int)
+    pg_client.result_cache.invalidate(connection_id)
+    return jsonify({'success': True})
+
 # Connection Management
 @app.route('/api/connections', methods=['GET'])
 def get_connections():
@@ -111,10 +440,10 @@ def test_connection(connection_id):
 
         success, message = pg_client.test_connection(conn_data)
 
-        # If connection is successful, fetch and cache schema
+        # If connection is successful, bring the schema cache up to date
         if success:
             try:
-                fetch_and_cache_schema(connection_id, conn_data)
+                get_schema_data(connection_id, conn_data, force_check=True)
             except Exception as e:
                 print(f"Warning: Failed to cache schema: {e}")
                 # Don't fail the test if schema caching fails
@@ -144,14 +473,7 @@ def get_table_columns(connection_id, table_name):
         if not conn_data:
             return jsonify({'error': 'Connection not found'}), 404
 
-        columns = pg_client.get_table_columns(conn_data, table_name)
-        primary_keys = pg_client.get_primary_keys(conn_data, table_name)
-
-        # Mark primary key columns
-        for col in columns:
-            col['is_primary_key'] = col['name'] in primary_keys
-
-        return jsonify(columns)
+        return jsonify(get_columns_with_keys(conn_data, table_name))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -203,6 +525,61 @@ def get_table_stats(connection_id, table_name):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/connections/<int:connection_id>/tables/<table_name>/rows', methods=['GET'])
+def browse_table(connection_id, table_name):
+    """Page through table rows with keyset pagination and an opaque continuation cursor"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        page_size = min(int(request.args.get('page_size', 100)), 10000)
+        sort = request.args.get('sort') or None
+        direction = request.args.get('direction', 'asc')
+        cursor = request.args.get('cursor') or None
+        filters = json.loads(request.args.get('filters', '[]'))
+
+        result = pg_client.browse_table(conn_data, table_name, page_size, sort, direction, filters, cursor)
+        if not result.get('success'):
+            return jsonify(result), 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/tables/<table_name>/count', methods=['POST'])
+def count_table_rows(connection_id, table_name):
+    """Count table rows exactly or from a TABLESAMPLE, bounded by a timeout"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        data = request.json or {}
+        sample_percent = data.get('sample_percent')
+        timeout_seconds = float(data.get('timeout_seconds', 60))
+
+        if sample_percent is not None and not 0 < float(sample_percent) <= 100:
+            return jsonify({'error': 'sample_percent must be between 0 and 100'}), 400
+
+        result = pg_client.count_table_rows(conn_data, table_name, sample_percent, timeout_seconds,
+                                           data.get('query_id'))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/table-stats', methods=['GET'])
+def get_all_table_stats(connection_id):
+    """Get estimated row counts and size breakdowns for every table in one query"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        result = pg_client.get_table_size_stats(conn_data)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Query Execution
 @app.route('/api/connections/<int:connection_id>/query', methods=['POST'])
 def execute_query(connection_id):
@@ -214,20 +591,363 @@ def execute_query(connection_id):
         data = request.json
         query = data.get('query', '')
         limit = data.get('limit')
+        result_format = data.get('format', 'objects')
+        # Clients may choose the id so they can cancel before the response arrives
+        query_id = data.get('query_id') or uuid.uuid4().hex
+        timeout_ms = data.get('timeout_ms')
+        use_cache = bool(data.get('cache'))
+        max_rows = data.get('max_rows')
+        max_bytes = data.get('max_bytes')
 
         if not query:
             return jsonify({'error': 'Query is required'}), 400
 
-        result = pg_client.execute_query(conn_data, query, limit)
+        if result_format not in RESULT_FORMATS + ('arrow',):
+            return jsonify({'error': f'Unsupported format: {result_format}'}), 400
+
+        if result_format == 'arrow' and pa is None:
+            return jsonify({'error': 'Arrow format requires pyarrow to be installed'}), 400
+
+        # Arrow is encoded from row arrays
+        schema_version = get_schema_version(connection_id, conn_data) if use_cache else None
+
+        with cancel_on_disconnect(query_id):
+            result = pg_client.execute_query(conn_data, query, limit,
+                                             'arrays' if result_format == 'arrow' else result_format,
+                                             query_id=query_id, timeout_ms=timeout_ms,
+                                             cache=use_cache, schema_version=schema_version,
+                                             max_rows=max_rows, max_bytes=max_bytes)
 
         # Save to history if successful
         if result.get('success'):
             db.save_query_history(connection_id, query, result.get('execution_time', 0))
+            # Slow queries get their plan recorded in the background for regression tracking
+            if result.get('cache') != 'hit':
+                plan_capture.maybe_capture(conn_data, query, result.get('execution_time', 0))
+
+        if result_format == 'arrow' and result.get('success') and result.get('columns'):
+            return Response(
+                pg_client.encode_arrow(result),
+                mimetype='application/vnd.apache.arrow.stream',
+                headers={
+                    'X-Row-Count': str(result['row_count']),
+                    'X-Execution-Time': str(result['execution_time']),
+                    'X-Truncated': 'true' if result.get('truncated') else 'false',
+                    **({'X-Cache': result['cache']} if result.get('cache') else {})
+                }
+            )
 
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/connections/<int:connection_id>/batch', methods=['POST'])
+def execute_batch(connection_id):
+    """Run several named queries or catalog operations concurrently and return every result in one response"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        items = (request.json or {}).get('items')
+        if not isinstance(items, dict) or not items:
+            return jsonify({'error': 'items must be an object mapping names to operations'}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({'error': f'At most {BATCH_MAX_ITEMS} items per batch'}), 400
+
+        # Never ask for more connections than the pool holds, so items queue here instead of timing out in the pool
+        concurrency = min(len(items), conn_data.get('pool_max_size') or 10)
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def run_item(item):
+                async with semaphore:
+                    return await runtime.to_thread(run_batch_item, conn_data, item if isinstance(item, dict) else {})
+
+            results = await asyncio.gather(*(run_item(item) for item in items.values()))
+            return dict(zip(items.keys(), results))
+
+        start = time.time()
+        results = runtime.run(run_all())
+        db.update_last_used(connection_id)
+
+        return jsonify({
+            'success': all(r['success'] for r in results.values()),
+            'results': results,
+            'execution_time': time.time() - start
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/query/stream', methods=['POST'])
+def stream_query(connection_id):
+    """Stream a query result as NDJSON: a columns header line, one JSON array per row, then a summary line"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        data = request.json
+        query = data.get('query', '')
+        batch_size = int(data.get('batch_size', 1000))
+        query_id = data.get('query_id') or uuid.uuid4().hex
+
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+
+        def generate():
+            execution_time = None
+            with cancel_on_disconnect(query_id):
+                for event in pg_client.stream_query(conn_data, query, batch_size, query_id):
+                    if event['type'] == 'rows':
+                        yield ''.join(app.json.dumps(row) + '\n' for row in event['rows'])
+                    else:
+                        if event['type'] == 'done':
+                            execution_time = event['execution_time']
+                        yield app.json.dumps(event) + '\n'
+
+            # Save to history once the whole result has been sent
+            if execution_time is not None:
+                db.save_query_history(connection_id, query, execution_time)
+                plan_capture.maybe_capture(conn_data, query, execution_time)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/activity/stream', methods=['GET'])
+def stream_activity(connection_id):
+    """Server-Sent Events feed of pg_stat_activity: a snapshot, then new, finished and changed sessions per poll"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        interval = float(request.args.get('interval', DEFAULT_ACTIVITY_INTERVAL_SECONDS))
+        subscriber = activity_monitor.subscribe(conn_data, interval)
+
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    try:
+                        event = subscriber.events.get(timeout=SSE_KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield ': keepalive\n\n'
+                        continue
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            finally:
+                # Runs when the client goes away; the sampler stops with its last subscriber
+                activity_monitor.unsubscribe(subscriber)
+
+        return Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/wait-profile', methods=['POST'])
+def start_wait_profile(connection_id):
+    """Sample wait events of active sessions for a few seconds as a background job; poll /api/jobs/<id> for the profile"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        data = request.get_json(silent=True) or {}
+        job_id = wait_profiler.start(
+            conn_data,
+            float(data.get('seconds', DEFAULT_PROFILE_SECONDS)),
+            float(data.get('hz', DEFAULT_PROFILE_HZ)),
+            int(data.get('top_k', DEFAULT_PROFILE_TOP_K))
+        )
+        return jsonify({'job_id': job_id, 'status': 'pending'}), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/script', methods=['POST'])
+def execute_script(connection_id):
+    """Run a multi-statement script, streaming one NDJSON event per statement and a summary line"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        data = request.json
+        script = data.get('script', '')
+        mode = data.get('mode', 'transaction')
+        stop_on_error = data.get('stop_on_error', True)
+        query_id = data.get('query_id') or uuid.uuid4().hex
+
+        if not script.strip():
+            return jsonify({'error': 'Script is required'}), 400
+
+        if mode not in ('transaction', 'autocommit'):
+            return jsonify({'error': f'Unsupported mode: {mode}'}), 400
+
+        def generate():
+            # In a transaction, statements are only captured once committed: the capture EXPLAINs on another connection
+            pending_captures = []
+            with cancel_on_disconnect(query_id):
+                for event in pg_client.execute_script(conn_data, script, mode, stop_on_error, query_id):
+                    yield app.json.dumps(event) + '\n'
+                    if event['type'] == 'statement' and event.get('success'):
+                        if mode == 'autocommit':
+                            plan_capture.maybe_capture(conn_data, event['statement'], event['execution_time'])
+                        else:
+                            pending_captures.append(event)
+                    elif event['type'] == 'done':
+                        db.save_query_history(connection_id, script, event['execution_time'], event['statements'])
+                        if event.get('committed'):
+                            for statement in pending_captures:
+                                plan_capture.maybe_capture(conn_data, statement['statement'], statement['execution_time'])
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/export', methods=['POST'])
+def export_query(connection_id):
+    """Export a query result as CSV (COPY), JSON Lines or INSERT statements, streamed or written to a file"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        # Also accepts a plain form post, so the browser can stream the download straight to disk
+        data = request.get_json(silent=True) or request.form
+        query = data.get('query', '')
+        export_format = data.get('format', 'csv')
+        table_name = data.get('table_name') or 'export'
+        destination = data.get('destination', 'download')
+
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unsupported format: {export_format}'}), 400
+
+        if destination == 'file':
+            # The server picks the file name; clients never choose where on disk the export lands
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            path = os.path.join(EXPORT_DIR, f"export-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.{export_format}")
+            job_id = runtime.create_job('export')
+            runtime.start_job(job_id, write_export_file, job_id, conn_data, query, export_format, table_name, path)
+            return jsonify({'job_id': job_id, 'query_id': job_id, 'path': path, 'status': 'pending'}), 202
+
+        query_id = data.get('query_id') or uuid.uuid4().hex
+        chunks = pg_client.export_query(conn_data, query, export_format, table_name, query_id=query_id)
+
+        # Pull the first chunk before answering so SQL errors become a JSON error response
+        try:
+            first_chunk = next(chunks, b'')
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+
+        def generate():
+            with cancel_on_disconnect(query_id):
+                yield first_chunk
+                yield from chunks
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype=EXPORT_MIMETYPES[export_format],
+            headers={'Content-Disposition': f'attachment; filename="export-{time.strftime("%Y%m%d-%H%M%S")}.{export_format}"'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/import/preview', methods=['POST'])
+def preview_import(connection_id):
+    """Read the header and a sample of a CSV/XLSX file and infer column names and types"""
+    try:
+        path, source_name = save_import_upload()
+        try:
+            preview = data_import.preview_file(
+                path,
+                request.form.get('file_format') or data_import.detect_format(source_name),
+                request.form.get('delimiter') or ',',
+                request.form.get('sheet') or None,
+                request.form.get('has_header', 'true') != 'false'
+            )
+        finally:
+            os.remove(path)
+        return jsonify(dict(preview, success=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/import', methods=['POST'])
+def import_file(connection_id):
+    """Import a CSV/XLSX file into a new or existing table as a background job"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        table_name = request.form.get('table_name')
+        if not table_name:
+            return jsonify({'error': 'table_name is required'}), 400
+
+        path, source_name = save_import_upload()
+        try:
+            options = {
+                'table_name': table_name,
+                'create_table': request.form.get('create_table', 'false') == 'true',
+                'file_format': request.form.get('file_format') or data_import.detect_format(source_name),
+                'delimiter': request.form.get('delimiter') or ',',
+                'sheet': request.form.get('sheet') or None,
+                'has_header': request.form.get('has_header', 'true') != 'false'
+            }
+
+            # Column names and types default to what the preview infers; the client may override them
+            preview = data_import.preview_file(path, options['file_format'], options['delimiter'],
+                                               options['sheet'], options['has_header'])
+            options['columns'] = json.loads(request.form['columns']) if request.form.get('columns') else preview['columns']
+            options['types'] = json.loads(request.form['types']) if request.form.get('types') else preview['types']
+            if len(options['columns']) != len(options['types']):
+                raise ValueError('columns and types must have the same length')
+            if options['create_table']:
+                options['types'] = data_import.check_column_types(options['types'])
+        except Exception:
+            os.remove(path)
+            raise
+
+        job_id = runtime.create_job('import')
+        runtime.start_job(job_id, run_import, job_id, conn_data, path, source_name, options)
+        return jsonify({
+            'job_id': job_id,
+            'query_id': job_id,
+            'columns': options['columns'],
+            'types': options['types'],
+            'status': 'pending'
+        }), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/queries', methods=['GET'])
+def get_active_queries(connection_id):
+    """List queries this server is currently running on a connection"""
+    try:
+        return jsonify(pg_client.get_active_queries(connection_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/queries/<query_id>/cancel', methods=['POST'])
+def cancel_query(connection_id, query_id):
+    """Cancel a running query by the id it was started with"""
+    try:
+        if not pg_client.cancel_query(query_id, connection_id):
+            return jsonify({'error': 'Query is not running'}), 404
+        return jsonify({'success': True, 'query_id': query_id})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/connections/<int:connection_id>/format-sql', methods=['POST'])
 def format_sql_endpoint(connection_id):
     try:
@@ -250,13 +970,14 @@ def get_autocomplete(connection_id):
         if not conn_data:
             return jsonify({'error': 'Connection not found'}), 404
 
-        autocomplete_data = pg_client.get_autocomplete_data(conn_data)
+        autocomplete_data = pg_client.get_autocomplete_data(conn_data, catalog=get_schema_data(connection_id, conn_data))
         return jsonify(autocomplete_data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # AI Features
 @app.route('/api/ai/generate-sql', methods=['POST'])
+@job_capable
 def generate_sql():
     try:
         data = request.json
@@ -277,20 +998,8 @@ def generate_sql():
         # Get schema context from cache or fetch if not cached
         schema_context = ""
         if connection_id:
-            # Try to get cached schema first
-            cached = db.get_schema_cache(connection_id)
-
-            if cached:
-                schema_data = cached['schema']
-                print(f"✅ Using cached schema from {cached['cached_at']}")
-            else:
-                # Schema not cached, fetch and cache it now
-                print(f"⚠️ Schema not cached for connection {connection_id}, fetching...")
-                conn_data = db.get_connection_by_id(connection_id)
-                if conn_data:
-                    schema_data = fetch_and_cache_schema(connection_id, conn_data)
-                else:
-                    schema_data = None
+            # Cached schema, refreshed first if the catalog fingerprint changed
+            schema_data = get_schema_data(connection_id)
 
             if schema_data:
                 schema_context = ai_service.build_schema_context(schema_data)
@@ -307,7 +1016,7 @@ def generate_sql():
             except Exception as e:
                 print(f"⚠️ Failed to load conversation history: {e}")
 
-        result = ai_service.generate_sql(prompt, schema_context, conversation_history)
+        result = runtime.run(ai_service.generate_sql(prompt, schema_context, conversation_history))
 
         # Save conversation if successful
         if result.get('success') and connection_id:
@@ -344,6 +1053,7 @@ def delete_ai_conversation(conversation_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ai/explain-query', methods=['POST'])
+@job_capable
 def explain_query():
     """Explain SQL query in plain English"""
     try:
@@ -357,16 +1067,11 @@ def explain_query():
         # Get schema context
         schema_context = ""
         if connection_id:
-            cached = db.get_schema_cache(connection_id)
-            if cached:
-                schema_context = ai_service.build_schema_context(cached['schema'])
-            else:
-                conn_data = db.get_connection_by_id(connection_id)
-                if conn_data:
-                    schema_data = fetch_and_cache_schema(connection_id, conn_data)
-                    schema_context = ai_service.build_schema_context(schema_data)
+            schema_data = get_schema_data(connection_id)
+            if schema_data:
+                schema_context = ai_service.build_schema_context(schema_data)
 
-        result = ai_service.explain_query(query, schema_context)
+        result = runtime.run(ai_service.explain_query(query, schema_context))
         return jsonify(result)
     except Exception as e:
         print(f"Error in explain_query: {e}")
@@ -374,6 +1079,7 @@ def explain_query():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ai/debug-query', methods=['POST'])
+@job_capable
 def debug_query():
     """Debug and fix SQL query errors"""
     try:
@@ -388,16 +1094,11 @@ def debug_query():
         # Get schema context
         schema_context = ""
         if connection_id:
-            cached = db.get_schema_cache(connection_id)
-            if cached:
-                schema_context = ai_service.build_schema_context(cached['schema'])
-            else:
-                conn_data = db.get_connection_by_id(connection_id)
-                if conn_data:
-                    schema_data = fetch_and_cache_schema(connection_id, conn_data)
-                    schema_context = ai_service.build_schema_context(schema_data)
+            schema_data = get_schema_data(connection_id)
+            if schema_data:
+                schema_context = ai_service.build_schema_context(schema_data)
 
-        result = ai_service.debug_query(query, error, schema_context)
+        result = runtime.run(ai_service.debug_query(query, error, schema_context))
         return jsonify(result)
     except Exception as e:
         print(f"Error in debug_query: {e}")
@@ -405,6 +1106,7 @@ def debug_query():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ai/optimize-query', methods=['POST'])
+@job_capable
 def optimize_query():
     """Optimize SQL query for performance"""
     try:
@@ -422,16 +1124,12 @@ def optimize_query():
         if connection_id:
             conn_data = db.get_connection_by_id(connection_id)
             if conn_data:
-                cached = db.get_schema_cache(connection_id)
-                if cached:
-                    schema_context = ai_service.build_schema_context(cached['schema'])
-                else:
-                    schema_data = fetch_and_cache_schema(connection_id, conn_data)
-                    schema_context = ai_service.build_schema_context(schema_data)
+                schema_data = get_schema_data(connection_id, conn_data)
+                schema_context = ai_service.build_schema_context(schema_data)
 
                 # Get all indexes
                 try:
-                    all_indexes = pg_client.get_all_indexes(conn_data)
+                    all_indexes = pg_client.get_all_indexes(conn_data, schema_data)
                     indexes_context = "\n".join([
                         f"Table {table}: {', '.join([idx['name'] for idx in indexes])}"
                         for table, indexes in all_indexes.items() if indexes
@@ -439,7 +1137,7 @@ def optimize_query():
                 except:
                     pass
 
-        result = ai_service.optimize_query(query, schema_context, exec_time, indexes_context)
+        result = runtime.run(ai_service.optimize_query(query, schema_context, exec_time, indexes_context))
         return jsonify(result)
     except Exception as e:
         print(f"Error in optimize_query: {e}")
@@ -447,12 +1145,14 @@ def optimize_query():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ai/analyze-explain', methods=['POST'])
+@job_capable
 def analyze_explain():
-    """Analyze EXPLAIN ANALYZE output"""
+    """Analyze EXPLAIN ANALYZE output with local rules, and with the AI when use_ai is set"""
     try:
         data = request.json
         query = data.get('query', '')
         connection_id = data.get('connection_id')
+        use_ai = bool(data.get('use_ai'))
 
         if not query:
             return jsonify({'error': 'Query is required'}), 400
@@ -470,22 +1170,25 @@ def analyze_explain():
         if not explain_result.get('success'):
             return jsonify({'error': explain_result.get('error', 'Failed to execute EXPLAIN')}), 500
 
-        # Get schema context
-        schema_context = ""
-        cached = db.get_schema_cache(connection_id)
-        if cached:
-            schema_context = ai_service.build_schema_context(cached['schema'])
-        else:
-            schema_data = fetch_and_cache_schema(connection_id, conn_data)
-            schema_context = ai_service.build_schema_context(schema_data)
+        analysis = plan_analyzer.analyze_plan(Plan(explain_result['plan_json']))
 
-        # Analyze with AI
-        explain_output = explain_result['plan_text']
-        result = ai_service.analyze_explain_plan(explain_output, query, schema_context)
+        if use_ai:
+            # Get schema context
+            schema_context = ai_service.build_schema_context(get_schema_data(connection_id, conn_data))
+
+            # The AI gets the local findings as hints and its answer replaces the rule-based summary
+            result = runtime.run(ai_service.analyze_explain_plan(explain_result['plan_text'], query, schema_context,
+                                                                 plan_analyzer.format_hints(analysis)))
+            if result.get('success'):
+                result['source'] = 'ai'
+                result['findings'] = analysis['findings']
+        else:
+            result = analysis
 
         # Add the raw plan data
         if result.get('success'):
             result['plan_json'] = explain_result.get('plan_json')
+            result['plan'] = explain_result.get('plan')
             result['plan_text'] = explain_result.get('plan_text')
 
         return jsonify(result)
@@ -495,11 +1198,13 @@ def analyze_explain():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ai/suggest-indexes', methods=['POST'])
+@job_capable
 def suggest_indexes():
-    """Suggest missing indexes based on query history"""
+    """Recommend indexes for the workload with the local advisor; the AI only narrates the result unless use_ai is false"""
     try:
         data = request.json
         connection_id = data.get('connection_id')
+        use_ai = data.get('use_ai', True) is not False
 
         if not connection_id:
             return jsonify({'error': 'Connection ID is required'}), 400
@@ -508,21 +1213,25 @@ def suggest_indexes():
         if not conn_data:
             return jsonify({'error': 'Connection not found'}), 404
 
-        # Get schema
-        cached = db.get_schema_cache(connection_id)
-        if cached:
-            schema_data = cached['schema']
-        else:
-            schema_data = fetch_and_cache_schema(connection_id, conn_data)
+        schema_data = get_schema_data(connection_id, conn_data)
+
+        # Workload: recent history plus the statements pg_stat_statements saw take the most time
+        query_history = db.get_query_history(connection_id, limit=index_advisor.WORKLOAD_HISTORY_ROWS)
+        statements = pg_client.get_statement_workload(conn_data, limit=index_advisor.WORKLOAD_STATEMENTS)
+        workload = index_advisor.build_workload(query_history, statements['queries'])
 
-        # Get query history
-        query_history = db.get_query_history(connection_id, limit=100)
+        result = index_advisor.advise_indexes(workload, schema_data)
+        if not statements.get('success'):
+            result['pg_stat_statements_error'] = statements.get('error')
 
-        # Get existing indexes
-        existing_indexes = pg_client.get_all_indexes(conn_data)
+        if use_ai and result['recommendations']:
+            narration = runtime.run(ai_service.narrate_index_advice(index_advisor.format_advice(result),
+                                                                    ai_service.build_schema_context(schema_data)))
+            if narration.get('success'):
+                result['narrative'] = narration['narrative']
+            else:
+                result['narrative_error'] = narration.get('error')
 
-        # Get AI suggestions
-        result = ai_service.suggest_indexes(schema_data, query_history, existing_indexes)
         return jsonify(result)
     except Exception as e:
         print(f"Error in suggest_indexes: {e}")
@@ -530,6 +1239,7 @@ def suggest_indexes():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ai/analyze-slow-queries', methods=['POST'])
+@job_capable
 def analyze_slow_queries():
     """Analyze multiple slow queries with AI"""
     try:
@@ -545,17 +1255,12 @@ def analyze_slow_queries():
 
         # Get schema context
         schema_context = ""
-        cached = db.get_schema_cache(connection_id)
-        if cached:
-            schema_context = ai_service.build_schema_context(cached['schema'])
-        else:
-            conn_data = db.get_connection_by_id(connection_id)
-            if conn_data:
-                schema_data = fetch_and_cache_schema(connection_id, conn_data)
-                schema_context = ai_service.build_schema_context(schema_data)
+        schema_data = get_schema_data(connection_id)
+        if schema_data:
+            schema_context = ai_service.build_schema_context(schema_data)
 
         # Analyze with AI
-        result = ai_service.analyze_slow_queries_batch(queries, schema_context)
+        result = runtime.run(ai_service.analyze_slow_queries_batch(queries, schema_context))
         return jsonify(result)
     except Exception as e:
         print(f"Error in analyze_slow_queries: {e}")
@@ -570,8 +1275,11 @@ def refresh_schema(connection_id):
         if not conn_data:
             return jsonify({'error': 'Connection not found'}), 404
 
-        # Fetch and cache fresh schema
-        schema_data = fetch_and_cache_schema(connection_id, conn_data)
+        # Reload only changed tables, unless a full rebuild is requested
+        if request.args.get('full', 'false').lower() == 'true':
+            schema_data = fetch_and_cache_schema(connection_id, conn_data)
+        else:
+            schema_data = get_schema_data(connection_id, conn_data, force_check=True)
 
         return jsonify({
             'success': True,
@@ -583,6 +1291,21 @@ def refresh_schema(connection_id):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/connections/<int:connection_id>/bloat', methods=['GET'])
+def get_bloat(connection_id):
+    """Estimated wasted space per table and btree index; ?exact=1 measures tables with pgstattuple_approx"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        result = pg_client.get_table_bloat_analysis(conn_data, request.args.get('exact') in ('1', 'true'))
+        if not result.get('success'):
+            return jsonify(result), 500
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/connections/<int:connection_id>/health', methods=['GET'])
 def get_database_health(connection_id):
     """Get comprehensive database health analysis"""
@@ -591,35 +1314,76 @@ def get_database_health(connection_id):
         if not conn_data:
             return jsonify({'error': 'Connection not found'}), 404
 
-        # Get all health data
-        bloat_data = pg_client.get_table_bloat_analysis(conn_data)
-        index_data = pg_client.get_index_health_analysis(conn_data)
-        cache_data = pg_client.get_cache_hit_ratio(conn_data)
+        exact_bloat = request.args.get('exact_bloat') in ('1', 'true')
 
-        # Get schema context for AI
-        schema_context = ""
-        cached = db.get_schema_cache(connection_id)
-        if cached:
-            schema_context = ai_service.build_schema_context(cached['schema'])
-        else:
-            schema_data = fetch_and_cache_schema(connection_id, conn_data)
+        # The three catalog collections run concurrently, each on its own pool checkout
+        async def collect():
+            return await asyncio.gather(
+                runtime.to_thread(pg_client.get_table_bloat_analysis, conn_data, exact_bloat),
+                runtime.to_thread(pg_client.get_index_health_analysis, conn_data),
+                runtime.to_thread(pg_client.get_cache_hit_ratio, conn_data)
+            )
+
+        bloat_data, index_data, cache_data = runtime.run(collect())
+
+        # Runs on the event loop: only the catalog read takes a thread, the OpenAI call is awaited
+        async def analyze():
+            schema_data = await runtime.to_thread(get_schema_data, connection_id, conn_data)
             schema_context = ai_service.build_schema_context(schema_data)
+            return await ai_service.analyze_database_health(bloat_data, index_data, cache_data, schema_context)
 
-        # AI analysis
-        ai_analysis = ai_service.analyze_database_health(bloat_data, index_data, cache_data, schema_context)
+        # The AI verdict is delivered separately; poll /api/jobs/<ai_job_id>
+        ai_job_id = runtime.submit('health_analysis', analyze)
 
         return jsonify({
             'success': True,
             'bloat': bloat_data,
             'indexes': index_data,
             'cache': cache_data,
-            'ai_analysis': ai_analysis
+            'ai_job_id': ai_job_id
         })
     except Exception as e:
         print(f"Error in get_database_health: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/connections/<int:connection_id>/plans', methods=['GET'])
+def get_captured_plans(connection_id):
+    """List fingerprints with captured plans, with capture counts, distinct shapes and cost range"""
+    try:
+        limit = int(request.args.get('limit', 100))
+        return jsonify({'fingerprints': db.get_plan_fingerprints(connection_id, limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/plans/<fingerprint>', methods=['GET'])
+def get_fingerprint_plans(connection_id, fingerprint):
+    """Plan history of one query fingerprint, newest first"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        plans = db.get_query_plans(connection_id, fingerprint, limit)
+        if not plans:
+            return jsonify({'error': 'No plans captured for this fingerprint'}), 404
+
+        # Ship each plan's parsed summary rather than the raw JSON unless asked for it
+        include_raw = request.args.get('raw') in ('1', 'true')
+        for plan in plans:
+            plan['plan'] = Plan(plan['plan_json']).to_dict()
+            if not include_raw:
+                del plan['plan_json']
+        return jsonify({'fingerprint': fingerprint, 'plans': plans})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/plan-regressions', methods=['GET'])
+def get_plan_regressions(connection_id):
+    """Captured plans whose shape changed or whose estimated cost jumped against the previous capture"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        return jsonify({'regressions': db.get_plan_regressions(connection_id, limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Query History & Favorites
 @app.route('/api/history/<int:connection_id>', methods=['GET'])
 def get_query_history(connection_id):
@@ -646,6 +1410,8 @@ def get_slow_queries(connection_id):
         min_time = float(request.args.get('min_time', 1.0))
         limit = int(request.args.get('limit', 50))
         source = request.args.get('source', 'auto')  # auto, pg_stat, or history
+        # Rank pg_stat_statements activity over the last window seconds instead of since the last stats reset
+        window = float(request.args['window']) if request.args.get('window') else None
 
         conn_data = db.get_connection_by_id(connection_id)
         if not conn_data:
@@ -658,7 +1424,33 @@ def get_slow_queries(connection_id):
         }
 
         # Try pg_stat_statements first if source is auto or pg_stat
-        if source in ['auto', 'pg_stat']:
+        if source in ['auto', 'pg_stat'] and window:
+            statement_sampler.watch(connection_id)
+            window_result = statement_sampler.get_window_stats(connection_id, window, 'mean_time', min_time * 1000, limit)
+            if window_result.get('success'):
+                result['queries'] = [{
+                    'id': q['queryid'],
+                    'query': q['query'],
+                    'execution_time': q['mean_time_ms'] / 1000,
+                    'executed_at': 'N/A (aggregated)',
+                    'calls': q['calls'],
+                    'total_time': q['total_time_ms'] / 1000,
+                    'total_rows': q['rows'],
+                    'calls_per_second': q['calls_per_second'],
+                    'rows_per_second': q['rows_per_second'],
+                    'source': 'pg_stat_statements'
+                } for q in window_result['queries']]
+                result['source'] = 'pg_stat_statements'
+                result['sources_available'].append('pg_stat_statements')
+                result['window_seconds'] = window_result['window_seconds']
+
+                if source == 'pg_stat':
+                    return jsonify(result)
+            else:
+                # Until two snapshots exist, fall back to cumulative counters
+                result['window_error'] = window_result.get('error')
+
+        if source in ['auto', 'pg_stat'] and 'window_seconds' not in result:
             pg_stat_result = pg_client.get_slow_queries_from_pg_stat(conn_data, min_time, limit)
             if pg_stat_result.get('success'):
                 # Transform pg_stat data to match our format
@@ -700,6 +1492,67 @@ def get_slow_queries(connection_id):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/connections/<int:connection_id>/statement-stats', methods=['GET'])
+def get_statement_stats(connection_id):
+    """Rank pg_stat_statements activity over a recent window from the sampler's snapshots"""
+    try:
+        if not db.get_connection_by_id(connection_id):
+            return jsonify({'error': 'Connection not found'}), 404
+
+        window = float(request.args.get('window', 3600))
+        order = request.args.get('order', 'total_time')
+        limit = int(request.args.get('limit', 50))
+        min_mean_ms = float(request.args.get('min_mean_ms', 0))
+
+        statement_sampler.watch(connection_id)
+        result = statement_sampler.get_window_stats(connection_id, window, order, min_mean_ms, limit)
+        result['sampler'] = statement_sampler.get_status(connection_id)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/statement-stats/<queryid>/series', methods=['GET'])
+def get_statement_series(connection_id, queryid):
+    """Calls/s, mean time and rows/s of one statement per sampling interval"""
+    if not queryid.lstrip('-').isdigit():
+        return jsonify({'error': 'queryid must be an integer'}), 400
+    try:
+        window = float(request.args.get('window', 3600))
+        series = statement_sampler.get_series(connection_id, int(queryid), time.time() - window)
+        return jsonify({'queryid': int(queryid), 'series': series})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/locks', methods=['GET'])
+def get_locks(connection_id):
+    """Current lock waits as blocking trees under root blockers, ranked by sessions and wait time held up"""
+    try:
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return jsonify({'error': 'Connection not found'}), 404
+
+        lock_sampler.watch(connection_id)
+        result = pg_client.get_lock_tree(conn_data)
+        if not result.get('success'):
+            return jsonify(result), 500
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/connections/<int:connection_id>/locks/history', methods=['GET'])
+def get_lock_history(connection_id):
+    """Sampled lock waits over a recent window and the root blockers that held up the most session time"""
+    try:
+        if not db.get_connection_by_id(connection_id):
+            return jsonify({'error': 'Connection not found'}), 404
+
+        window = float(request.args.get('window', 3600))
+        limit = int(request.args.get('limit', 50))
+        lock_sampler.watch(connection_id)
+        return jsonify(lock_sampler.get_history(connection_id, window, limit))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/favorites', methods=['GET'])
 def get_favorites():
     try:
@@ -800,6 +1653,8 @@ def update_settings():
             else:
                 db.save_setting(key, value)
 
+        apply_runtime_settings(data)
+
         return jsonify({'message': 'Settings updated'})
     except Exception as e:
         print(f"Error in update_settings: {e}")
@@ -810,5 +1665,5 @@ def update_settings():
 if __name__ == '__main__':
     port = int(os.environ.get('FLASK_PORT', 5001))
     print(f' * Starting Flask on http://127.0.0.1:{port}')
-    app.run(host='127.0.0.1', port=port, debug=False)
+    app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
 
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, Callable, Optional, Awaitable
+
+# Finished jobs are kept this long so clients can collect their results
+JOB_TTL_SECONDS = 600
+# Threads available to blocking work (psycopg2, SQLite) scheduled from the event loop
+BLOCKING_WORKERS = 16
+# Threads for jobs that are plain callables; kept apart so long jobs cannot starve to_thread() callers
+JOB_WORKERS = 8
+
+
+class AsyncRuntime:
+    """One shared asyncio event loop on a background thread, plus a registry of pollable jobs"""
+
+    def __init__(self, blocking_workers: int = BLOCKING_WORKERS, job_workers: int = JOB_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=blocking_workers, thread_name_prefix='pgai-blocking')
+        self.job_executor = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix='pgai-job')
+        self.loop.set_default_executor(self.executor)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.jobs_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name='pgai-event-loop', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and wait for its result from a worker thread"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError('AsyncRuntime.run() cannot be called from the event loop thread')
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def to_thread(self, func: Callable, *args, **kwargs) -> Any:
+        """Await blocking work on the runtime's executor"""
+        return await self.loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def submit(self, kind: str, func: Callable, *args, **kwargs) -> str:
+        """Start a coroutine function or blocking callable as a background job and return its id"""
+        job_id = self.create_job(kind)
+        self.start_job(job_id, func, *args, **kwargs)
+        return job_id
+
+    def create_job(self, kind: str) -> str:
+        """Register a pending job, for work that needs to know its job id before it starts"""
+        self._prune_jobs()
+        job_id = uuid.uuid4().hex
+        with self.jobs_lock:
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'pending',
+                'progress': None,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'finished_at': None
+            }
+        return job_id
+
+    def start_job(self, job_id: str, func: Callable, *args, **kwargs):
+        asyncio.run_coroutine_threadsafe(self._run_job(job_id, func, args, kwargs), self.loop)
+
+    async def _run_job(self, job_id: str, func: Callable, args: tuple, kwargs: dict):
+        self.update_job(job_id, status='running')
+        try:
+            # Coroutine jobs run on the loop itself; only plain callables take a job thread
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args, **kwargs)
+            else:
+                result = await self.loop.run_in_executor(self.job_executor, partial(func, *args, **kwargs))
+            self.update_job(job_id, status='done', result=result, finished_at=time.time())
+        except Exception as e:
+            self.update_job(job_id, status='error', error=str(e), finished_at=time.time())
+
+    def update_job(self, job_id: str, **fields):
+        """Update a job's status, progress or result; unknown ids are ignored"""
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune_jobs(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        with self.jobs_lock:
+            for job_id in [j for j, job in self.jobs.items()
+                           if job['finished_at'] and job['finished_at'] < cutoff]:
+                del self.jobs[job_id]
+
+# Global instance
+runtime = AsyncRuntime()
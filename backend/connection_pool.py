@@ -0,0 +1,353 @@
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from typing import Dict, Any, List, Optional
+import threading
+import time
+
+# Connections idle for longer than this are pinged before being handed out
+PRE_PING_AFTER_SECONDS = 30
+# Idle connections above a pool's minimum are closed after this long
+IDLE_TIMEOUT_SECONDS = 300
+REAP_INTERVAL_SECONDS = 60
+CHECKOUT_TIMEOUT_SECONDS = 30
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of PostgreSQL connections for one saved connection"""
+
+    def __init__(self, manager: 'PoolManager', connection_id: int, conn_string: str,
+                 min_size: int, max_size: int):
+        self.manager = manager
+        self.connection_id = connection_id
+        self.conn_string = conn_string
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size)
+        self.closed = False
+
+        # Most recently returned connections sit at the end so warm sockets are reused first
+        self._idle: List[Any] = []
+        self._idle_since: Dict[int, float] = {}
+        self._in_use: Dict[int, Any] = {}
+        self._opening = 0
+
+        # Utilization counters
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.last_used = time.time()
+
+    def _open_count(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def getconn(self, timeout: float = CHECKOUT_TIMEOUT_SECONDS):
+        """Check out a validated connection, waiting up to timeout seconds for a free slot"""
+        deadline = time.time() + timeout
+        cond = self.manager.condition
+
+        while True:
+            conn = None
+            idle_for = 0.0
+            with cond:
+                waited = False
+                while True:
+                    if self.closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        idle_for = time.time() - self._idle_since.pop(id(conn), time.time())
+                        self._in_use[id(conn)] = conn
+                        break
+                    if self._open_count() < self.max_size and self.manager._reserve_slot(self):
+                        self._opening += 1
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolError(
+                            f"Timed out after {timeout}s waiting for a connection "
+                            f"(pool max {self.max_size}, global max {self.manager.max_total})"
+                        )
+                    if not waited:
+                        self.waits += 1
+                        waited = True
+                    cond.wait(remaining)
+
+            if conn is None:
+                conn = self._open_connection()
+            elif not self._is_usable(conn, idle_for):
+                self._discard(conn)
+                continue
+
+            with cond:
+                self.checkouts += 1
+                self.last_used = time.time()
+            return conn
+
+    def _open_connection(self):
+        """Open a new connection for a slot that was reserved under the lock"""
+        cond = self.manager.condition
+        try:
+            conn = psycopg2.connect(self.conn_string, connect_timeout=10)
+        except Exception:
+            with cond:
+                self._opening -= 1
+                self.manager._release_slot()
+                cond.notify_all()
+            raise
+
+        with cond:
+            self._opening -= 1
+            self._in_use[id(conn)] = conn
+            self.created += 1
+        return conn
+
+    def fill_to_min(self):
+        """Open idle connections until the pool holds min_size, using only free global budget"""
+        cond = self.manager.condition
+        while True:
+            with cond:
+                # Pre-warming never evicts another pool's connections the way a checkout may
+                if self.closed or self._open_count() >= self.min_size \
+                        or self.manager.total_open >= self.manager.max_total:
+                    return
+                self.manager.total_open += 1
+                self._opening += 1
+
+            try:
+                conn = psycopg2.connect(self.conn_string, connect_timeout=10)
+            except Exception as e:
+                with cond:
+                    self._opening -= 1
+                    self.manager._release_slot()
+                    cond.notify_all()
+                print(f"Warning: could not pre-warm pool for connection {self.connection_id}: {e}")
+                return
+
+            with cond:
+                self._opening -= 1
+                self.created += 1
+                if self.closed:
+                    self.manager._release_slot()
+                else:
+                    self._idle.insert(0, conn)
+                    self._idle_since[id(conn)] = time.time()
+                    cond.notify_all()
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def _is_usable(self, conn, idle_for: float) -> bool:
+        """Validate a connection taken from the idle list"""
+        if conn.closed:
+            return False
+        if idle_for < PRE_PING_AFTER_SECONDS:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        """Close a checked-out connection and give its slot back"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        cond = self.manager.condition
+        with cond:
+            if self._in_use.pop(id(conn), None) is not None:
+                self.manager._release_slot()
+            self.discarded += 1
+            cond.notify_all()
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection, rolling back any transaction it left open"""
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+
+        if close or conn.closed or self.closed:
+            self._discard(conn)
+            return
+
+        cond = self.manager.condition
+        with cond:
+            if self._in_use.pop(id(conn), None) is None:
+                return
+            self._idle.append(conn)
+            self._idle_since[id(conn)] = time.time()
+            self.last_used = time.time()
+            cond.notify_all()
+
+    def _pop_idle_for_eviction(self, keep: int, older_than: Optional[float] = None) -> List[Any]:
+        """Remove idle connections beyond keep (oldest first); caller must hold the lock"""
+        evicted = []
+        now = time.time()
+        while self._idle and len(self._idle) + len(self._in_use) > keep:
+            oldest = self._idle[0]
+            if older_than is not None and now - self._idle_since.get(id(oldest), now) < older_than:
+                break
+            self._idle.pop(0)
+            self._idle_since.pop(id(oldest), None)
+            evicted.append(oldest)
+        return evicted
+
+    def closeall(self):
+        """Close idle connections now; checked-out connections are closed when returned"""
+        cond = self.manager.condition
+        with cond:
+            self.closed = True
+            idle = self._idle
+            self._idle = []
+            self._idle_since.clear()
+            for _ in idle:
+                self.manager._release_slot()
+            cond.notify_all()
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'connection_id': self.connection_id,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'in_use': len(self._in_use),
+            'idle': len(self._idle),
+            'opening': self._opening,
+            'utilization': round(100.0 * len(self._in_use) / self.max_size, 1),
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'created': self.created,
+            'discarded': self.discarded,
+            'last_used': self.last_used
+        }
+
+
+class PoolManager:
+    """Owns one ConnectionPool per saved connection and enforces a global connection budget"""
+
+    def __init__(self, max_total: int = 50):
+        self.condition = threading.Condition()
+        self.max_total = max_total
+        self.total_open = 0
+        self.pools: Dict[int, ConnectionPool] = {}
+        self._reaper = None
+
+    def set_max_total(self, max_total: int):
+        """Change the global budget of backend connections across all pools"""
+        with self.condition:
+            self.max_total = max(1, int(max_total))
+            self.condition.notify_all()
+
+    def get_pool(self, connection_id: int, conn_string: str, min_size: int = 1, max_size: int = 10) -> ConnectionPool:
+        """Get the pool for a connection, replacing it if its settings changed"""
+        stale = None
+        with self.condition:
+            existing = self.pools.get(connection_id)
+            if existing and (existing.conn_string != conn_string or existing.min_size != min_size
+                             or existing.max_size != max_size):
+                stale = existing
+                existing = None
+            created = existing is None
+            if created:
+                existing = ConnectionPool(self, connection_id, conn_string, min_size, max_size)
+                self.pools[connection_id] = existing
+            self._start_reaper()
+
+        if created and existing.min_size:
+            threading.Thread(target=existing.fill_to_min, name=f'pgai-pool-fill-{connection_id}', daemon=True).start()
+
+        if stale:
+            stale.closeall()
+        return existing
+
+    def close_pool(self, connection_id: int):
+        with self.condition:
+            conn_pool = self.pools.pop(connection_id, None)
+        if conn_pool:
+            conn_pool.closeall()
+
+    def _reserve_slot(self, requester: ConnectionPool) -> bool:
+        """Reserve room for one new connection, evicting an idle one from another pool if needed; caller holds the lock"""
+        if self.total_open < self.max_total:
+            self.total_open += 1
+            return True
+
+        # Budget exhausted: steal the longest-idle connection from another pool
+        candidates = [p for p in self.pools.values() if p is not requester and p._idle]
+        if not candidates:
+            return False
+        victim_pool = min(candidates, key=lambda p: p._idle_since.get(id(p._idle[0]), 0))
+        victim = victim_pool._idle.pop(0)
+        victim_pool._idle_since.pop(id(victim), None)
+        victim_pool.discarded += 1
+        try:
+            victim.close()
+        except Exception:
+            pass
+        # The evicted connection's slot is handed straight to the requester
+        return True
+
+    def _release_slot(self):
+        """Give back one connection slot; caller holds the lock"""
+        self.total_open = max(0, self.total_open - 1)
+
+    def _start_reaper(self):
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap_loop, name='pgai-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(REAP_INTERVAL_SECONDS)
+            try:
+                self.reap_idle()
+            except Exception as e:
+                print(f"Warning: pool reaper failed: {e}")
+
+    def reap_idle(self, idle_timeout: float = IDLE_TIMEOUT_SECONDS):
+        """Close idle connections that exceed each pool's minimum size and idle timeout, then top pools
+        that lost connections back up to their minimum"""
+        evicted = []
+        with self.condition:
+            pools = list(self.pools.values())
+            for conn_pool in pools:
+                for conn in conn_pool._pop_idle_for_eviction(conn_pool.min_size, idle_timeout):
+                    evicted.append(conn)
+                    conn_pool.discarded += 1
+                    self._release_slot()
+            self.condition.notify_all()
+
+        for conn in evicted:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        for conn_pool in pools:
+            conn_pool.fill_to_min()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool utilization counters for all connections"""
+        with self.condition:
+            pools = [p.get_stats() for p in self.pools.values()]
+            return {
+                'max_total': self.max_total,
+                'total_open': self.total_open,
+                'total_in_use': sum(p['in_use'] for p in pools),
+                'total_idle': sum(p['idle'] for p in pools),
+                'pools': pools
+            }
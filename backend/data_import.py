@@ -0,0 +1,227 @@
+import csv
+import io
+import os
+import re
+import uuid as uuid_module
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, List, Optional, Iterator, Tuple, Callable
+
+# Rows read to infer column types when creating a table
+SAMPLE_ROWS = 1000
+
+BOOLEAN_VALUES = {'true': True, 't': True, 'yes': True, 'y': True,
+                  'false': False, 'f': False, 'no': False, 'n': False}
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?$')
+TIMESTAMPTZ_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}(:?\d{2})?)$')
+
+
+def _parse_int(value: str):
+    if value.strip() != value or not re.fullmatch(r'[+-]?\d+', value):
+        raise ValueError(f'invalid integer: {value!r}')
+    return int(value)
+
+
+def _check_range(bits: int) -> Callable[[str], int]:
+    limit = 2 ** (bits - 1)
+
+    def check(value: str) -> int:
+        number = _parse_int(value)
+        if not -limit <= number < limit:
+            raise ValueError(f'{value} is out of range for a {bits}-bit integer')
+        return number
+    return check
+
+
+def _parse_numeric(value: str):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'invalid number: {value!r}')
+    if not number.is_finite() and value.strip().lower() not in ('nan', 'infinity', '-infinity'):
+        raise ValueError(f'invalid number: {value!r}')
+    return number
+
+
+def _parse_boolean(value: str):
+    if value.strip().lower() not in BOOLEAN_VALUES:
+        raise ValueError(f'invalid boolean: {value!r}')
+    return BOOLEAN_VALUES[value.strip().lower()]
+
+
+def _parse_date(value: str):
+    if not DATE_PATTERN.match(value):
+        raise ValueError(f'invalid date: {value!r}')
+    return date.fromisoformat(value)
+
+
+def _parse_timestamp(value: str):
+    if not TIMESTAMP_PATTERN.match(value):
+        raise ValueError(f'invalid timestamp: {value!r}')
+    return datetime.fromisoformat(value)
+
+
+def _parse_timestamptz(value: str):
+    if not (TIMESTAMPTZ_PATTERN.match(value) or TIMESTAMP_PATTERN.match(value)):
+        raise ValueError(f'invalid timestamp: {value!r}')
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _parse_uuid(value: str):
+    return uuid_module.UUID(value)
+
+
+# PostgreSQL type -> validator for values read from a file; types not listed are checked by PostgreSQL itself
+VALIDATORS: Dict[str, Callable[[str], Any]] = {
+    'boolean': _parse_boolean,
+    'smallint': _check_range(16),
+    'integer': _check_range(32),
+    'bigint': _check_range(64),
+    'numeric': _parse_numeric,
+    'real': _parse_numeric,
+    'double precision': _parse_numeric,
+    'date': _parse_date,
+    'timestamp without time zone': _parse_timestamp,
+    'timestamp with time zone': _parse_timestamptz,
+    'uuid': _parse_uuid
+}
+
+# Candidate types for inference, most specific first
+INFERENCE_ORDER = ['boolean', 'integer', 'bigint', 'numeric', 'date',
+                   'timestamp without time zone', 'timestamp with time zone', 'uuid']
+
+# Types a created table's columns may be declared with; names are spliced into DDL, so nothing else is accepted
+COLUMN_TYPES = set(VALIDATORS) | {'text'}
+
+
+def to_text(value: Any) -> Optional[str]:
+    """Render a cell as the text COPY expects; empty cells become NULL"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    text = str(value)
+    return text if text != '' else None
+
+
+def detect_format(filename: str) -> str:
+    return 'xlsx' if filename.lower().endswith(('.xlsx', '.xlsm')) else 'csv'
+
+
+def read_rows(path: str, file_format: str = 'csv', delimiter: str = ',',
+              sheet: Optional[str] = None, progress: Optional[Callable[[int], None]] = None) -> Iterator[List[Optional[str]]]:
+    """Stream a CSV or XLSX file as lists of text cells, calling progress with bytes read (CSV only)"""
+    if file_format == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+            for row in worksheet.iter_rows(values_only=True):
+                yield [to_text(value) for value in row]
+        finally:
+            workbook.close()
+        return
+
+    with open(path, 'rb') as raw:
+        text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        for i, row in enumerate(csv.reader(text, delimiter=delimiter)):
+            if progress and i % 1000 == 0:
+                progress(raw.tell())
+            yield [cell if cell != '' else None for cell in row]
+
+
+def normalize_column_name(name: Optional[str], position: int) -> str:
+    """Turn a header cell into a lower-case identifier usable without quoting"""
+    name = re.sub(r'[^0-9a-zA-Z_]+', '_', (name or '').strip()).strip('_').lower()
+    if not name:
+        return f'column_{position + 1}'
+    return f'_{name}' if name[0].isdigit() else name
+
+
+def infer_column_types(sample: List[List[Optional[str]]], column_count: int) -> List[str]:
+    """Pick the most specific type every non-empty sampled value of a column parses as"""
+    types = []
+    for index in range(column_count):
+        values = [row[index] for row in sample if index < len(row) and row[index] is not None]
+        chosen = 'text'
+        if values:
+            for candidate in INFERENCE_ORDER:
+                validator = VALIDATORS[candidate]
+                try:
+                    for value in values:
+                        validator(value)
+                except (ValueError, TypeError, AttributeError):
+                    continue
+                chosen = candidate
+                break
+        types.append(chosen)
+    return types
+
+
+def preview_file(path: str, file_format: str = 'csv', delimiter: str = ',', sheet: Optional[str] = None,
+                 has_header: bool = True) -> Dict[str, Any]:
+    """Read the header and a sample of a file and infer a column name and type for each column"""
+    rows = read_rows(path, file_format, delimiter, sheet)
+    header = next(rows, None) if has_header else None
+    sample = []
+    for row in rows:
+        sample.append(row)
+        if len(sample) >= SAMPLE_ROWS:
+            break
+    rows.close()
+
+    # A header fixes the column count; without one, the widest sampled row does
+    if header:
+        column_count = len(header)
+    else:
+        column_count = max([len(row) for row in sample], default=0)
+        header = [None] * column_count
+    return {
+        'columns': [normalize_column_name(name, i) for i, name in enumerate(header)],
+        'types': infer_column_types(sample, column_count),
+        'sample': sample[:20],
+        'sampled_rows': len(sample)
+    }
+
+
+def check_column_types(types: List[str]) -> List[str]:
+    """Normalize declared column types, raising ValueError for any outside COLUMN_TYPES"""
+    normalized = [' '.join(str(column_type).lower().split()) for column_type in types]
+    unknown = [column_type for column_type, name in zip(types, normalized) if name not in COLUMN_TYPES]
+    if unknown:
+        raise ValueError(f"Unsupported column types: {', '.join(map(str, unknown))}; "
+                         f"use one of {', '.join(sorted(COLUMN_TYPES))}")
+    return normalized
+
+
+def validate_row(row: List[Optional[str]], types: List[str]) -> Tuple[Optional[List[Optional[str]]], Optional[str]]:
+    """Check a row against the target column types; returns (row, None) or (None, error)"""
+    if len(row) != len(types):
+        # Trailing empty cells are common in spreadsheets
+        if len(row) > len(types) and all(cell is None for cell in row[len(types):]):
+            row = row[:len(types)]
+        else:
+            return None, f'expected {len(types)} columns, found {len(row)}'
+
+    for value, column_type in zip(row, types):
+        validator = VALIDATORS.get(column_type)
+        if value is None or validator is None:
+            continue
+        try:
+            validator(value)
+        except (ValueError, TypeError, AttributeError) as e:
+            return None, str(e)
+    return row, None
+
+
+def rejects_path(source_name: str) -> str:
+    """Side file for rejected rows, next to other pgai data"""
+    directory = os.path.join(os.path.expanduser('~'), '.pgai', 'imports')
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.splitext(os.path.basename(source_name))[0] or 'import'
+    return os.path.join(directory, f"{base}-rejected-{uuid_module.uuid4().hex[:8]}.csv")
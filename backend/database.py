@@ -5,6 +5,9 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from encryption import encryption
 
+# Query ids looked up per statement; SQLite allows 999 bound parameters on older builds
+TEXT_LOOKUP_BATCH = 500
+
 class Database:
     def __init__(self):
         self.db_path = Path.home() / '.pgai' / 'pgai.db'
@@ -21,9 +24,33 @@ class Database:
         conn = self.get_connection()
         with open(Path(__file__).parent / 'schema.sql', 'r') as f:
             conn.executescript(f.read())
+        self._migrate(conn)
         conn.commit()
         conn.close()
 
+    def _migrate(self, conn):
+        """Add columns introduced after a table was first created"""
+        self._ensure_columns(conn, 'connections', {
+            'pool_min_size': 'INTEGER DEFAULT 1',
+            'pool_max_size': 'INTEGER DEFAULT 10',
+            'statement_timeout_ms': 'INTEGER DEFAULT 0',
+            'lock_timeout_ms': 'INTEGER DEFAULT 0'
+        })
+        self._ensure_columns(conn, 'query_history', {
+            'statement_timings': 'TEXT'
+        })
+        self._ensure_columns(conn, 'schema_cache', {
+            'fingerprint': 'TEXT',
+            'relation_signatures': 'TEXT'
+        })
+
+    def _ensure_columns(self, conn, table: str, columns: Dict[str, str]):
+        """Add any missing columns to an existing table"""
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for name, definition in columns.items():
+            if name not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
     # Connection methods
     def save_connection(self, data: Dict[str, Any]) -> int:
         """Save a new connection"""
@@ -33,8 +60,9 @@ class Database:
         encrypted_password = encryption.encrypt(data['password'])
 
         cursor.execute('''
-            INSERT INTO connections (name, host, port, database, username, password, ssl_enabled, color)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO connections (name, host, port, database, username, password, ssl_enabled, color,
+                                     pool_min_size, pool_max_size, statement_timeout_ms, lock_timeout_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             data['name'],
             data['host'],
@@ -43,7 +71,11 @@ class Database:
             data['username'],
             encrypted_password,
             data.get('ssl_enabled', False),
-            data.get('color', '#3b82f6')
+            data.get('color', '#3b82f6'),
+            data.get('pool_min_size', 1),
+            data.get('pool_max_size', 10),
+            data.get('statement_timeout_ms', 0),
+            data.get('lock_timeout_ms', 0)
         ))
 
         conn.commit()
@@ -91,7 +123,9 @@ class Database:
         cursor.execute('''
             UPDATE connections
             SET name = ?, host = ?, port = ?, database = ?, username = ?,
-                password = ?, ssl_enabled = ?, color = ?
+                password = ?, ssl_enabled = ?, color = ?,
+                pool_min_size = COALESCE(?, pool_min_size), pool_max_size = COALESCE(?, pool_max_size),
+                statement_timeout_ms = COALESCE(?, statement_timeout_ms), lock_timeout_ms = COALESCE(?, lock_timeout_ms)
             WHERE id = ?
         ''', (
             data['name'],
@@ -102,6 +136,11 @@ class Database:
             encrypted_password,
             data.get('ssl_enabled', False),
             data.get('color', '#3b82f6'),
+            # Pool sizes and timeouts are only set through the API; edits that omit them keep the stored values
+            data.get('pool_min_size'),
+            data.get('pool_max_size'),
+            data.get('statement_timeout_ms'),
+            data.get('lock_timeout_ms'),
             connection_id
         ))
 
@@ -130,14 +169,16 @@ class Database:
         conn.close()
 
     # Query history methods
-    def save_query_history(self, connection_id: int, query: str, execution_time: float):
-        """Save query to history"""
+    def save_query_history(self, connection_id: int, query: str, execution_time: float,
+                           statement_timings: Optional[List[Dict[str, Any]]] = None):
+        """Save query to history, with per-statement timings for scripts"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO query_history (connection_id, query, execution_time)
-            VALUES (?, ?, ?)
-        ''', (connection_id, query, execution_time))
+            INSERT INTO query_history (connection_id, query, execution_time, statement_timings)
+            VALUES (?, ?, ?, ?)
+        ''', (connection_id, query, execution_time,
+              json.dumps(statement_timings) if statement_timings is not None else None))
         conn.commit()
         conn.close()
 
@@ -153,7 +194,14 @@ class Database:
         ''', (connection_id, limit))
         rows = cursor.fetchall()
         conn.close()
-        return [dict(row) for row in rows]
+
+        history = []
+        for row in rows:
+            item = dict(row)
+            if item.get('statement_timings'):
+                item['statement_timings'] = json.loads(item['statement_timings'])
+            history.append(item)
+        return history
 
     def get_slow_queries(self, connection_id: int, min_execution_time: float = 1.0, limit: int = 50) -> List[Dict[str, Any]]:
         """Get slow queries filtered by minimum execution time"""
@@ -180,6 +228,263 @@ class Database:
         conn.close()
         return affected > 0
 
+    # Query plan history methods
+    def save_query_plan(self, connection_id: int, fingerprint: str, query: str, shape_hash: str,
+                        total_cost: float, execution_time: float, plan_json: Any,
+                        regression: Optional[Dict[str, Any]] = None) -> int:
+        """Store a captured plan, with the regression it shows against the previous capture if any"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO query_plans (connection_id, fingerprint, query, shape_hash, total_cost,
+                                     execution_time, plan_json, regression, captured_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (connection_id, fingerprint, query, shape_hash, total_cost, execution_time,
+              json.dumps(plan_json), json.dumps(regression) if regression else None, datetime.now()))
+        conn.commit()
+        plan_id = cursor.lastrowid
+        conn.close()
+        return plan_id
+
+    def _plan_row(self, row, include_plan: bool = True) -> Dict[str, Any]:
+        item = dict(row)
+        if item.get('regression'):
+            item['regression'] = json.loads(item['regression'])
+        if include_plan and item.get('plan_json'):
+            item['plan_json'] = json.loads(item['plan_json'])
+        else:
+            item.pop('plan_json', None)
+        return item
+
+    def get_latest_query_plan(self, connection_id: int, fingerprint: str) -> Optional[Dict[str, Any]]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM query_plans
+            WHERE connection_id = ? AND fingerprint = ?
+            ORDER BY captured_at DESC, id DESC
+            LIMIT 1
+        ''', (connection_id, fingerprint))
+        row = cursor.fetchone()
+        conn.close()
+        return self._plan_row(row, include_plan=False) if row else None
+
+    def get_query_plans(self, connection_id: int, fingerprint: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Plan history of one fingerprint, newest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM query_plans
+            WHERE connection_id = ? AND fingerprint = ?
+            ORDER BY captured_at DESC, id DESC
+            LIMIT ?
+        ''', (connection_id, fingerprint, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return [self._plan_row(row) for row in rows]
+
+    def get_plan_fingerprints(self, connection_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """One summary row per fingerprint: capture count, distinct shapes, cost range and latest query text"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT fingerprint,
+                   COUNT(*) AS captures,
+                   COUNT(DISTINCT shape_hash) AS shapes,
+                   MIN(total_cost) AS min_cost,
+                   MAX(total_cost) AS max_cost,
+                   MAX(execution_time) AS max_execution_time,
+                   SUM(regression IS NOT NULL) AS regressions,
+                   MAX(captured_at) AS last_captured_at,
+                   (SELECT query FROM query_plans p2
+                    WHERE p2.connection_id = p.connection_id AND p2.fingerprint = p.fingerprint
+                    ORDER BY captured_at DESC, id DESC LIMIT 1) AS query
+            FROM query_plans p
+            WHERE connection_id = ?
+            GROUP BY fingerprint
+            ORDER BY last_captured_at DESC
+            LIMIT ?
+        ''', (connection_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def get_plan_regressions(self, connection_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """Captures flagged as regressions, newest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM query_plans
+            WHERE connection_id = ? AND regression IS NOT NULL
+            ORDER BY captured_at DESC, id DESC
+            LIMIT ?
+        ''', (connection_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return [self._plan_row(row, include_plan=False) for row in rows]
+
+    # pg_stat_statements sample methods
+    def save_statement_samples(self, connection_id: int, sampled_at: float, samples: List[tuple],
+                               texts: Dict[int, str], statement_count: int):
+        """Record one snapshot: (queryid, calls, total_time, rows) for statements that changed, and new query texts"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO statement_snapshots (connection_id, sampled_at, statement_count) VALUES (?, ?, ?)
+        ''', (connection_id, sampled_at, statement_count))
+        cursor.executemany('''
+            INSERT INTO statement_samples (connection_id, queryid, sampled_at, calls, total_time, rows)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(connection_id, queryid, sampled_at, calls, total_time, rows) for queryid, calls, total_time, rows in samples])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO statement_texts (connection_id, queryid, query) VALUES (?, ?, ?)
+        ''', [(connection_id, queryid, query) for queryid, query in texts.items()])
+        conn.commit()
+        conn.close()
+
+    def get_statement_snapshot_time(self, connection_id: int, at_or_before: Optional[float] = None,
+                                    earliest: bool = False) -> Optional[float]:
+        """Time of the latest snapshot (at or before a time if given), or of the earliest one"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        if earliest:
+            cursor.execute('SELECT MIN(sampled_at) FROM statement_snapshots WHERE connection_id = ?', (connection_id,))
+        elif at_or_before is not None:
+            cursor.execute('''
+                SELECT MAX(sampled_at) FROM statement_snapshots WHERE connection_id = ? AND sampled_at <= ?
+            ''', (connection_id, at_or_before))
+        else:
+            cursor.execute('SELECT MAX(sampled_at) FROM statement_snapshots WHERE connection_id = ?', (connection_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def get_statement_counters(self, connection_id: int, at: float) -> Dict[int, tuple]:
+        """Each statement's counters as of a time: its latest sample at or before it"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT s.queryid, s.calls, s.total_time, s.rows
+            FROM statement_samples s
+            JOIN (
+                SELECT queryid, MAX(id) AS id FROM statement_samples
+                WHERE connection_id = ? AND sampled_at <= ?
+                GROUP BY queryid
+            ) latest ON latest.id = s.id
+        ''', (connection_id, at))
+        rows = cursor.fetchall()
+        conn.close()
+        return {row['queryid']: (row['calls'], row['total_time'], row['rows']) for row in rows}
+
+    def get_statement_texts(self, connection_id: int, queryids: List[int]) -> Dict[int, str]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        texts = {}
+        for start in range(0, len(queryids), TEXT_LOOKUP_BATCH):
+            batch = queryids[start:start + TEXT_LOOKUP_BATCH]
+            cursor.execute(
+                f"SELECT queryid, query FROM statement_texts WHERE connection_id = ? AND queryid IN ({', '.join('?' * len(batch))})",
+                (connection_id, *batch)
+            )
+            texts.update({row['queryid']: row['query'] for row in cursor.fetchall()})
+        conn.close()
+        return texts
+
+    def get_statement_series(self, connection_id: int, queryid: int, since: float) -> List[tuple]:
+        """(sampled_at, calls, total_time, rows) of one statement from its last sample before since onwards"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT sampled_at, calls, total_time, rows FROM statement_samples
+            WHERE connection_id = ? AND queryid = ?
+            AND id >= COALESCE((SELECT MAX(id) FROM statement_samples
+                                WHERE connection_id = ? AND queryid = ? AND sampled_at <= ?), 0)
+            ORDER BY id
+        ''', (connection_id, queryid, connection_id, queryid, since))
+        rows = cursor.fetchall()
+        conn.close()
+        return [tuple(row) for row in rows]
+
+    def prune_statement_samples(self, connection_id: int, cutoff: float):
+        """Drop samples and snapshots older than cutoff, keeping each statement's latest older sample as its baseline"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            DELETE FROM statement_samples
+            WHERE connection_id = ? AND sampled_at < ?
+            AND id NOT IN (SELECT MAX(id) FROM statement_samples
+                           WHERE connection_id = ? AND sampled_at < ? GROUP BY queryid)
+        ''', (connection_id, cutoff, connection_id, cutoff))
+        cursor.execute('DELETE FROM statement_snapshots WHERE connection_id = ? AND sampled_at < ?',
+                       (connection_id, cutoff))
+        conn.commit()
+        conn.close()
+
+    # Lock sample methods
+    def save_lock_sample(self, connection_id: int, sampled_at: float, tree: Dict[str, Any], interval_seconds: float):
+        """Record one blocking-tree sample and extend or open an episode for each root blocker"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO lock_samples (connection_id, sampled_at, waiting_count, root_count, max_wait_seconds, deadlock)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (connection_id, sampled_at, tree['waiting_count'], tree['root_count'], tree['max_wait_seconds'],
+              int(tree['deadlock'])))
+        # Prepared transactions have no backend; '' keeps them under one key
+        cursor.executemany('''
+            INSERT INTO lock_episodes (connection_id, pid, backend_start, xact_start, username, application_name,
+                                       state, query, first_seen, last_seen, samples, max_blocked, max_wait_seconds,
+                                       blocked_session_seconds)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (connection_id, pid, backend_start, xact_start) DO UPDATE SET
+                state = excluded.state,
+                query = excluded.query,
+                last_seen = excluded.last_seen,
+                samples = samples + 1,
+                max_blocked = MAX(max_blocked, excluded.max_blocked),
+                max_wait_seconds = MAX(max_wait_seconds, excluded.max_wait_seconds),
+                blocked_session_seconds = blocked_session_seconds + excluded.blocked_session_seconds
+        ''', [(connection_id, root['pid'], root['backend_start'] or '', root.get('xact_start') or '',
+               root.get('username'), root.get('application_name'), root['state'], root['query'],
+               sampled_at, sampled_at, root['blocked_count'], root['max_wait_seconds'],
+               root['blocked_count'] * interval_seconds) for root in tree['roots']])
+        conn.commit()
+        conn.close()
+
+    def get_lock_samples(self, connection_id: int, since: float) -> List[Dict[str, Any]]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT sampled_at, waiting_count, root_count, max_wait_seconds, deadlock FROM lock_samples
+            WHERE connection_id = ? AND sampled_at >= ?
+            ORDER BY sampled_at
+        ''', (connection_id, since))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def get_lock_episodes(self, connection_id: int, since: float, limit: int = 50) -> List[Dict[str, Any]]:
+        """Root blockers active since a time, the ones that held up the most session time first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM lock_episodes
+            WHERE connection_id = ? AND last_seen >= ?
+            ORDER BY blocked_session_seconds DESC, max_blocked DESC
+            LIMIT ?
+        ''', (connection_id, since, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def prune_lock_samples(self, connection_id: int, cutoff: float):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM lock_samples WHERE connection_id = ? AND sampled_at < ?', (connection_id, cutoff))
+        cursor.execute('DELETE FROM lock_episodes WHERE connection_id = ? AND last_seen < ?', (connection_id, cutoff))
+        conn.commit()
+        conn.close()
+
     # Favorite queries methods
     def save_favorite(self, data: Dict[str, Any]) -> int:
         """Save favorite query"""
@@ -333,15 +638,23 @@ class Database:
         return affected > 0
 
     # Schema cache methods
-    def save_schema_cache(self, connection_id: int, schema_data: Dict[str, Any]):
-        """Cache schema for a connection"""
+    def save_schema_cache(self, connection_id: int, schema_data: Dict[str, Any],
+                          fingerprint: Optional[Dict[str, str]] = None,
+                          relation_signatures: Optional[Dict[str, List[str]]] = None):
+        """Cache schema for a connection along with the catalog fingerprint it was built from"""
         conn = self.get_connection()
         cursor = conn.cursor()
         schema_json = json.dumps(schema_data)
         cursor.execute('''
-            INSERT OR REPLACE INTO schema_cache (connection_id, schema_data, cached_at)
-            VALUES (?, ?, ?)
-        ''', (connection_id, schema_json, datetime.now()))
+            INSERT OR REPLACE INTO schema_cache (connection_id, schema_data, fingerprint, relation_signatures, cached_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            connection_id,
+            schema_json,
+            json.dumps(fingerprint) if fingerprint is not None else None,
+            json.dumps(relation_signatures) if relation_signatures is not None else None,
+            datetime.now()
+        ))
         conn.commit()
         conn.close()
 
@@ -350,7 +663,8 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT schema_data, cached_at FROM schema_cache WHERE connection_id = ?
+            SELECT schema_data, fingerprint, relation_signatures, cached_at
+            FROM schema_cache WHERE connection_id = ?
         ''', (connection_id,))
         row = cursor.fetchone()
         conn.close()
@@ -358,6 +672,8 @@ class Database:
         if row:
             return {
                 'schema': json.loads(row['schema_data']),
+                'fingerprint': json.loads(row['fingerprint']) if row['fingerprint'] else None,
+                'relation_signatures': json.loads(row['relation_signatures']) if row['relation_signatures'] else None,
                 'cached_at': row['cached_at']
             }
         return None
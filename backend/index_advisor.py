@@ -0,0 +1,445 @@
+import re
+import sqlparse
+from sqlparse import tokens as T
+from typing import Dict, Any, List, Optional, Tuple
+from sql_utils import split_statements, fingerprint_sql
+from postgres_client import PostgresClient
+
+# Widest composite index proposed; later columns rarely pay for their write and space cost
+MAX_INDEX_COLUMNS = 3
+DEFAULT_RECOMMENDATIONS = 10
+# How much of each workload source is analyzed: recent history rows, and top statements by total time
+WORKLOAD_HISTORY_ROWS = 1000
+WORKLOAD_STATEMENTS = 500
+# Example statements kept per recommendation, and how much of their text
+EXAMPLE_QUERIES = 3
+EXAMPLE_QUERY_TEXT = 300
+
+# Keywords that start a clause; everything up to the next one belongs to it
+CLAUSES = {
+    'SELECT': 'select', 'FROM': 'from', 'UPDATE': 'from', 'WHERE': 'where', 'ON': 'on', 'USING': 'using',
+    'GROUP BY': 'other', 'HAVING': 'other', 'ORDER BY': 'order', 'LIMIT': 'other', 'OFFSET': 'other',
+    'FETCH': 'other', 'INTO': 'other', 'SET': 'other', 'VALUES': 'other', 'RETURNING': 'other',
+    'UNION': 'other', 'UNION ALL': 'other', 'INTERSECT': 'other', 'EXCEPT': 'other', 'WINDOW': 'other'
+}
+RANGE_OPERATORS = {'<', '>', '<=', '>='}
+# Keywords that may sit between a table and its alias, or before a table, in a FROM list
+FROM_NOISE = {'AS', 'ONLY', 'LATERAL'}
+
+SIMPLE_IDENTIFIER = re.compile(r'[a-z_][a-z0-9_$]*')
+
+
+def _items(statement: sqlparse.sql.Statement) -> List[Tuple[str, Any]]:
+    """Significant tokens as (kind, value) pairs, with dotted names merged into one reference"""
+    items: List[Tuple[str, Any]] = []
+    for token in statement.flatten():
+        if token.is_whitespace or token.ttype in T.Comment:
+            continue
+        dotted = len(items) >= 2 and items[-1] == ('punct', '.') and items[-2][0] == 'ref'
+        if token.ttype in T.Name.Placeholder or (token.ttype in T.Literal and token.ttype not in T.Literal.String.Symbol):
+            items.append(('value', token.value))
+        elif token.ttype in T.Name or token.ttype in T.Literal.String.Symbol or (dotted and token.ttype in T.Keyword):
+            # Unquoted identifiers fold to lower case like the server does; quoted ones keep theirs
+            name = token.value[1:-1] if token.ttype in T.Literal.String.Symbol else token.value.lower()
+            if dotted:
+                items.pop()
+                items[-1] = ('ref', items[-1][1] + (name,))
+            else:
+                items.append(('ref', (name,)))
+        elif token.ttype in T.Punctuation:
+            if token.value == '(' and items and items[-1][0] == 'ref':
+                items[-1] = ('func', items[-1][1])
+            items.append(('punct', token.value))
+        elif token.ttype in T.Operator.Comparison:
+            items.append(('op', token.normalized.upper()))
+        elif token.ttype in T.Keyword:
+            items.append(('kw', token.normalized))
+        else:
+            items.append(('other', token.value))
+    return items
+
+
+def _predicate(items: List[Tuple[str, Any]], i: int) -> List[Dict[str, Any]]:
+    """Column usages from the comparison at items[i]: equality, range, or a join between two columns"""
+    kind, value = items[i]
+    left = items[i - 1] if i > 0 else ('', None)
+    right = items[i + 1] if i + 1 < len(items) else ('', None)
+    # The left operand must stand alone; "a + b = 1" or "lower(a) = 1" is not a plain column test
+    before = items[i - 2] if i > 1 else ('', None)
+    left_alone = left[0] == 'ref' and before[0] != 'other' and before != ('punct', '::')
+
+    if kind == 'kw':
+        if not left_alone or before == ('kw', 'NOT'):
+            return []
+        if value == 'IN' or (value == 'IS' and right == ('kw', 'NULL')):
+            return [{'kind': 'equality', 'ref': left[1]}]
+        if value == 'BETWEEN':
+            return [{'kind': 'range', 'ref': left[1]}]
+        return []
+
+    if value == 'LIKE':
+        # Only a literal without a leading wildcard can use a btree range
+        prefix = right[0] == 'value' and right[1].startswith("'") and right[1][1:2] not in ('%', '_')
+        return [{'kind': 'range', 'ref': left[1]}] if left_alone and prefix else []
+    if value not in RANGE_OPERATORS and value != '=':
+        return []
+
+    after = items[i + 2] if i + 2 < len(items) else ('', None)
+    right_alone = right[0] == 'ref' and after[0] != 'other' and after != ('punct', '::')
+    usage = 'equality' if value == '=' else 'range'
+    if left_alone and right_alone:
+        if value == '=' and left[1][:-1] != right[1][:-1]:
+            return [{'kind': 'join', 'ref': left[1]}, {'kind': 'join', 'ref': right[1]}]
+        return []
+    if left_alone:
+        return [{'kind': usage, 'ref': left[1]}]
+    if right_alone and left[0] != 'ref':
+        return [{'kind': usage, 'ref': right[1]}]
+    return []
+
+
+def extract_column_usage(query: str) -> Optional[Dict[str, Any]]:
+    """Tables a statement reads and the columns it filters, joins and sorts on, as written (aliases unresolved)
+
+    Returns None for text that is not a single statement. Subqueries share the statement's alias map, which is
+    enough for correlated references; ORDER BY inside parentheses (windows, aggregates) is ignored.
+    """
+    statements = [s for s in sqlparse.parse(query) if s.token_first(skip_cm=True, skip_ws=True) is not None]
+    if len(statements) != 1:
+        return None
+    items = _items(statements[0])
+
+    tables: List[Dict[str, Any]] = []
+    usages: List[Dict[str, Any]] = []
+    clause, stack = 'other', []
+    expect_table = False
+    # Index in tables of the entry a following bare name would be the alias of
+    alias_for: Optional[int] = None
+    has_limit = False
+
+    for i, (kind, value) in enumerate(items):
+        if kind == 'punct' and value == '(':
+            derived = None
+            if clause == 'from' and expect_table:
+                # Derived table; the alias after its closing parenthesis maps to no catalog table
+                tables.append({'parts': None, 'alias': None})
+                derived, expect_table = len(tables) - 1, False
+            stack.append((clause, derived))
+            continue
+        if kind == 'punct' and value == ')':
+            clause, alias_for = stack.pop() if stack else ('other', None)
+            continue
+
+        if kind == 'kw' and (value in CLAUSES or value.endswith('JOIN')):
+            clause = 'from' if value.endswith('JOIN') else CLAUSES[value]
+            expect_table, alias_for = clause == 'from', None
+            has_limit = has_limit or (value in ('LIMIT', 'FETCH') and not stack)
+            continue
+
+        if clause == 'from':
+            if kind == 'ref' and expect_table:
+                tables.append({'parts': value, 'alias': value[-1]})
+                expect_table, alias_for = False, len(tables) - 1
+            elif kind == 'func' and expect_table:
+                tables.append({'parts': None, 'alias': None})
+                expect_table, alias_for = False, len(tables) - 1
+            elif kind == 'ref' and alias_for is not None and len(value) == 1:
+                tables[alias_for]['alias'] = value[0]
+                alias_for = None
+            elif kind == 'punct' and value == ',':
+                expect_table, alias_for = True, None
+            elif not (kind == 'kw' and value in FROM_NOISE):
+                alias_for = None
+
+        elif clause == 'using' and kind == 'ref':
+            # USING (col) joins the new table to whichever earlier one has the column; resolution drops the rest
+            for table in tables:
+                if table['alias']:
+                    usages.append({'kind': 'join', 'ref': (table['alias'], value[-1])})
+
+        elif clause in ('where', 'on') and (kind == 'op' or (kind == 'kw' and value in ('IN', 'IS', 'BETWEEN'))):
+            usages.extend(_predicate(items, i))
+
+        elif clause == 'order' and not stack and kind == 'ref':
+            previous = items[i - 1]
+            if previous in (('punct', ','),) or previous == ('kw', 'ORDER BY'):
+                following = items[i + 1] if i + 1 < len(items) else ('', None)
+                usages.append({
+                    'kind': 'sort',
+                    'ref': value,
+                    'descending': following[0] == 'kw' and following[1] == 'DESC'
+                })
+
+    return {'tables': tables, 'usages': usages, 'limit': has_limit}
+
+
+def build_workload(history: List[Dict[str, Any]], statements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge query history and pg_stat_statements rows into one entry per query fingerprint, weighted by total time
+
+    Scripts in history are split into their statements, each weighted by its own timing when one was recorded.
+    """
+    by_fingerprint: Dict[str, Dict[str, Any]] = {}
+
+    def add(query: str, seconds: float, calls: int, source: str):
+        try:
+            fingerprint = fingerprint_sql(query)
+        except Exception:
+            return
+        entry = by_fingerprint.setdefault(fingerprint, {
+            'fingerprint': fingerprint, 'query': query.strip(), 'total_time': 0.0, 'calls': 0, 'sources': set()
+        })
+        entry['total_time'] += seconds or 0.0
+        entry['calls'] += calls or 0
+        entry['sources'].add(source)
+
+    for row in history:
+        parts = split_statements(row.get('query') or '')
+        timings = {t.get('index'): t.get('execution_time') for t in row.get('statement_timings') or []}
+        for index, part in enumerate(parts):
+            seconds = timings.get(index)
+            if seconds is None:
+                seconds = (row.get('execution_time') or 0.0) / len(parts)
+            add(part['sql'], seconds, 1, 'history')
+
+    for row in statements:
+        add(row['query'], float(row.get('total_time_seconds') or 0.0), row.get('calls') or 0, 'pg_stat_statements')
+
+    workload = sorted(by_fingerprint.values(), key=lambda e: (-e['total_time'], e['fingerprint']))
+    for entry in workload:
+        entry['sources'] = sorted(entry['sources'])
+    return workload
+
+
+def _resolve_tables(tables: List[Dict[str, Any]], catalog: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Map each alias (or bare table name) in a statement to its catalog key; CTEs and derived tables map to None"""
+    by_name: Dict[str, List[str]] = {}
+    for table in catalog['tables']:
+        by_name.setdefault(table['name'], []).append(PostgresClient.catalog_key(table['schema'], table['name']))
+
+    aliases: Dict[str, Optional[str]] = {}
+    for table in tables:
+        parts, key = table['parts'], None
+        if parts and len(parts) == 2:
+            key = PostgresClient.catalog_key(parts[0], parts[1])
+        elif parts and len(parts) == 1:
+            # Unqualified names resolve to public first, then to the only schema having the table
+            matches = by_name.get(parts[0], [])
+            key = parts[0] if parts[0] in matches else (matches[0] if len(matches) == 1 else None)
+        if key not in catalog['columns']:
+            key = None
+        if table['alias']:
+            aliases[table['alias']] = key
+        if parts and table['alias'] != parts[-1]:
+            aliases.setdefault(parts[-1], key)
+    return aliases
+
+
+def _resolve_column(ref: Tuple[str, ...], aliases: Dict[str, Optional[str]],
+                    columns: Dict[str, set]) -> Optional[Tuple[str, str]]:
+    """(table key, column) for a reference, or None if it is not a column of a catalog table"""
+    column = ref[-1]
+    if len(ref) > 1:
+        key = aliases.get(ref[-2])
+        return (key, column) if key and column in columns[key] else None
+    owners = {key for key in aliases.values() if key and column in columns[key]}
+    return (owners.pop(), column) if len(owners) == 1 else None
+
+
+def _candidates(usage: Dict[str, Any], catalog: Dict[str, Any], columns: Dict[str, set],
+                column_weight: Dict[Tuple[str, str], float]) -> List[Dict[str, Any]]:
+    """Index candidates for one statement: equality columns, then sort columns, then one range column per table,
+    plus the join columns of each table on their own"""
+    aliases = _resolve_tables(usage['tables'], catalog)
+    per_table: Dict[str, Dict[str, List]] = {}
+    sort_tables = set()
+    sort_columns: List[Tuple[str, bool]] = []
+    for u in usage['usages']:
+        resolved = _resolve_column(u['ref'], aliases, columns)
+        if u['kind'] == 'sort':
+            sort_tables.add(resolved[0] if resolved else None)
+            if resolved:
+                sort_columns.append((resolved[1], u['descending']))
+            continue
+        if not resolved:
+            continue
+        key, column = resolved
+        bucket = per_table.setdefault(key, {'equality': [], 'range': [], 'join': []})
+        if column not in bucket[u['kind']]:
+            bucket[u['kind']].append(column)
+
+    # An index can only return rows in ORDER BY order when every sort column comes from one table
+    sort_table = sort_tables.pop() if len(sort_tables) == 1 else None
+    if sort_table and sort_table not in per_table and usage['limit']:
+        per_table[sort_table] = {'equality': [], 'range': [], 'join': []}
+
+    candidates = []
+    for key, bucket in per_table.items():
+        # Columns filtered on across more of the workload lead, so one index serves more statements
+        equality = sorted(bucket['equality'], key=lambda c: (-column_weight.get((key, c), 0), c))
+        sort = [(c, d) for c, d in dict.fromkeys(sort_columns) if c not in equality] if key == sort_table else []
+        if len({d for _, d in sort}) < 2:
+            sort = [(c, False) for c, _ in sort]
+        key_columns = [(c, False) for c in equality] + sort
+        taken = {c for c, _ in key_columns}
+        key_columns += [(c, False) for c in bucket['range'] if c not in taken][:1]
+        if key_columns:
+            candidates.append({
+                'table': key,
+                'columns': tuple(key_columns[:MAX_INDEX_COLUMNS]),
+                'equality_count': min(len(equality), MAX_INDEX_COLUMNS),
+                'usage': {'equality': equality, 'range': bucket['range'], 'sort': [c for c, _ in sort]}
+            })
+        joins = [c for c in bucket['join'] if c not in equality]
+        if joins:
+            candidates.append({
+                'table': key,
+                'columns': tuple((c, False) for c in sorted(joins)[:MAX_INDEX_COLUMNS]),
+                'equality_count': min(len(joins), MAX_INDEX_COLUMNS),
+                'usage': {'join': joins}
+            })
+    return candidates
+
+
+def _unquote(column: str) -> str:
+    return column[1:-1].replace('""', '"') if column.startswith('"') and column.endswith('"') else column
+
+
+def _quote(identifier: str) -> str:
+    return identifier if SIMPLE_IDENTIFIER.fullmatch(identifier) else '"' + identifier.replace('"', '""') + '"'
+
+
+def _covering_index(candidate: Dict[str, Any], indexes: List[Dict[str, Any]]) -> Optional[str]:
+    """Name of an existing btree index whose leading columns already serve the candidate: equality columns
+    in any order, then the rest in order"""
+    names = [c for c, _ in candidate['columns']]
+    split = candidate['equality_count']
+    for index in indexes:
+        if index.get('method') != 'btree' or index.get('is_partial'):
+            continue
+        existing = [_unquote(c) for c in index['columns']]
+        if len(existing) < len(names):
+            continue
+        if set(existing[:split]) == set(names[:split]) and existing[split:len(names)] == names[split:]:
+            return index['name']
+    return None
+
+
+def advise_indexes(workload: List[Dict[str, Any]], catalog: Dict[str, Any],
+                   limit: int = DEFAULT_RECOMMENDATIONS) -> Dict[str, Any]:
+    """Rank composite index proposals for a workload against the catalog's existing indexes
+
+    Every candidate is credited with the total time of the statements it would serve. A candidate that is a
+    prefix of a wider one is folded into it, since the wider index serves both. Candidates an existing index
+    already serves are reported separately instead of recommended.
+    """
+    columns = {key: {c['name'] for c in cols} for key, cols in catalog['columns'].items()}
+    tables = {PostgresClient.catalog_key(t['schema'], t['name']): t for t in catalog['tables']}
+    workload_time = sum(entry['total_time'] for entry in workload) or 0.0
+
+    parsed = []
+    for entry in workload:
+        try:
+            usage = extract_column_usage(entry['query'])
+        except Exception:
+            usage = None
+        if usage and usage['usages']:
+            parsed.append((entry, usage))
+
+    # Equality columns are ordered by how much of the workload filters on them
+    column_weight: Dict[Tuple[str, str], float] = {}
+    for entry, usage in parsed:
+        aliases = _resolve_tables(usage['tables'], catalog)
+        for u in usage['usages']:
+            resolved = _resolve_column(u['ref'], aliases, columns) if u['kind'] == 'equality' else None
+            if resolved:
+                column_weight[resolved] = column_weight.get(resolved, 0) + entry['total_time']
+
+    proposals: Dict[Tuple[str, tuple], Dict[str, Any]] = {}
+    for entry, usage in parsed:
+        for candidate in _candidates(usage, catalog, columns, column_weight):
+            proposal = proposals.setdefault((candidate['table'], candidate['columns']), {
+                **candidate, 'statements': {}, 'usage': {}
+            })
+            proposal['statements'][entry['fingerprint']] = entry
+            for kind, names in candidate['usage'].items():
+                merged = proposal['usage'].setdefault(kind, [])
+                merged.extend(n for n in names if n not in merged)
+
+    # Fold each candidate into the widest retained candidate it is a prefix of
+    retained: List[Dict[str, Any]] = []
+    for proposal in sorted(proposals.values(), key=lambda p: (-len(p['columns']), p['table'], p['columns'])):
+        names = [c for c, _ in proposal['columns']]
+        wider = next((r for r in retained if r['table'] == proposal['table']
+                      and [c for c, _ in r['columns']][:len(names)] == names), None)
+        if wider:
+            wider['statements'].update(proposal['statements'])
+            for kind, merged in proposal['usage'].items():
+                target = wider['usage'].setdefault(kind, [])
+                target.extend(n for n in merged if n not in target)
+        else:
+            retained.append(proposal)
+
+    recommendations, covered = [], []
+    for proposal in retained:
+        indexes = catalog['indexes'].get(proposal['table'], [])
+        statements = sorted(proposal['statements'].values(), key=lambda e: (-e['total_time'], e['fingerprint']))
+        benefit = sum(e['total_time'] for e in statements)
+        names = [c for c, _ in proposal['columns']]
+        result = {
+            'table': proposal['table'],
+            'columns': names,
+            'benefit_seconds': round(benefit, 3),
+            'workload_percent': round(benefit / workload_time * 100, 1) if workload_time else 0.0,
+            'query_count': len(statements),
+            'calls': sum(e['calls'] for e in statements),
+            'usage': {kind: kind_names for kind, kind_names in proposal['usage'].items() if kind_names},
+            'example_queries': [e['query'][:EXAMPLE_QUERY_TEXT] for e in statements[:EXAMPLE_QUERIES]]
+        }
+
+        existing = _covering_index(proposal, indexes)
+        if existing:
+            result['index'] = existing
+            covered.append(result)
+            continue
+
+        table = tables[proposal['table']]
+        target = _quote(table['name']) if table['schema'] == 'public' else f"{_quote(table['schema'])}.{_quote(table['name'])}"
+        column_list = ', '.join(_quote(c) + (' DESC' if d else '') for c, d in proposal['columns'])
+        usage_text = '; '.join(f"{kind} on {', '.join(kind_names)}" for kind, kind_names in result['usage'].items())
+        result.update({
+            'create_statement': f"CREATE INDEX CONCURRENTLY ON {target} ({column_list});",
+            # Existing plain indexes that are a prefix of the proposal become redundant once it exists
+            'replaces': [i['name'] for i in indexes
+                         if i.get('method') == 'btree' and not (i.get('is_unique') or i.get('is_primary') or i.get('is_partial'))
+                         and [_unquote(c) for c in i['columns']] == names[:len(i['columns'])]],
+            'reason': f"{usage_text} in {len(statements)} statement(s) taking {benefit:.2f}s "
+                      f"({result['workload_percent']}% of analyzed time)"
+        })
+        recommendations.append(result)
+
+    recommendations.sort(key=lambda r: (-r['benefit_seconds'], r['table'], r['columns']))
+    covered.sort(key=lambda r: (-r['benefit_seconds'], r['table'], r['columns']))
+
+    return {
+        'success': True,
+        'source': 'local',
+        'recommendations': recommendations[:limit],
+        'covered': covered[:limit],
+        'analyzed_queries': len(workload),
+        'parsed_queries': len(parsed),
+        'workload_seconds': round(workload_time, 3),
+        'sources': sorted({s for entry in workload for s in entry['sources']})
+    }
+
+
+def format_advice(advice: Dict[str, Any]) -> str:
+    """Recommendations and already-covered patterns as compact lines for an LLM prompt"""
+    lines = [f"Workload: {advice['analyzed_queries']} distinct statements, {advice['workload_seconds']}s total, "
+             f"from {', '.join(advice['sources']) or 'nothing'}"]
+    for i, r in enumerate(advice['recommendations'], 1):
+        lines.append(f"{i}. {r['create_statement']} -- {r['reason']}"
+                     + (f"; makes {', '.join(r['replaces'])} redundant" if r['replaces'] else ''))
+        lines.extend(f"   e.g. {q[:150]}" for q in r['example_queries'][:1])
+    for r in advice['covered']:
+        lines.append(f"- already served by {r['index']}: {r['table']}({', '.join(r['columns'])}), {r['benefit_seconds']}s")
+    return '\n'.join(lines)
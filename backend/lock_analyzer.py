@@ -0,0 +1,88 @@
+from typing import Dict, Any, List, Set
+
+
+def _placeholder(pid: int) -> Dict[str, Any]:
+    """A blocker with no pg_stat_activity row; pid 0 is a prepared transaction"""
+    return {
+        'pid': pid,
+        'backend_start': None,
+        'state': 'prepared transaction' if pid == 0 else None,
+        'query': None,
+        'blocked_by': [],
+        'wait_seconds': None,
+        'xact_seconds': None
+    }
+
+
+def _descendants(pid: int, waiters_of: Dict[int, List[int]]) -> Set[int]:
+    """Every session waiting on pid directly or through a chain; cycles are visited once"""
+    seen: Set[int] = set()
+    stack = list(waiters_of.get(pid, []))
+    while stack:
+        waiter = stack.pop()
+        if waiter in seen or waiter == pid:
+            continue
+        seen.add(waiter)
+        stack.extend(waiters_of.get(waiter, []))
+    return seen
+
+
+def build_blocking_tree(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Turn lock waiters and their blockers into trees under root blockers, ranked by how much they hold up.
+
+    A root blocker blocks others without waiting itself. A waiter blocked by several sessions appears under each.
+    Waiters with no root above them are in a lock cycle the deadlock detector has not broken yet.
+    """
+    by_pid = {s['pid']: s for s in sessions}
+    waiters_of: Dict[int, List[int]] = {}
+    for session in sessions:
+        for blocker in session['blocked_by']:
+            waiters_of.setdefault(blocker, []).append(session['pid'])
+            if blocker not in by_pid:
+                by_pid[blocker] = _placeholder(blocker)
+
+    waiting = {pid for pid, s in by_pid.items() if s['blocked_by']}
+    root_pids = [pid for pid in waiters_of if not by_pid[pid]['blocked_by']]
+    reachable: Set[int] = set()
+    for pid in root_pids:
+        reachable |= _descendants(pid, waiters_of)
+    # Break each remaining cycle at its lowest pid so every waiter shows up under some root
+    cycle_pids = []
+    for pid in sorted(waiting - reachable):
+        if pid not in reachable:
+            cycle_pids.append(pid)
+            reachable |= _descendants(pid, waiters_of) | {pid}
+
+    def subtree(pid: int, path: Set[int]) -> Dict[str, Any]:
+        node = dict(by_pid[pid])
+        node['blocking'] = [subtree(waiter, path | {pid}) for waiter in waiters_of.get(pid, []) if waiter not in path]
+        return node
+
+    roots = []
+    for pid in root_pids + cycle_pids:
+        blocked = _descendants(pid, waiters_of) - {pid}
+        waits = [by_pid[w]['wait_seconds'] or 0 for w in blocked]
+        root = subtree(pid, set())
+        root.update({
+            'deadlock': pid in cycle_pids,
+            'directly_blocked': len(waiters_of.get(pid, [])),
+            'blocked_count': len(blocked),
+            'blocked_wait_seconds': sum(waits),
+            'max_wait_seconds': max(waits, default=0),
+            'depth': _depth(root)
+        })
+        roots.append(root)
+    roots.sort(key=lambda r: (-r['blocked_count'], -r['blocked_wait_seconds']))
+
+    return {
+        'roots': roots,
+        'waiting_count': len(waiting),
+        'root_count': len(roots),
+        'max_wait_seconds': max((by_pid[pid]['wait_seconds'] or 0 for pid in waiting), default=0),
+        'deadlock': bool(cycle_pids)
+    }
+
+
+def _depth(node: Dict[str, Any]) -> int:
+    """Longest chain below a node, counted in waiters"""
+    return max((1 + _depth(child) for child in node['blocking']), default=0)
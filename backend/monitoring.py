@@ -0,0 +1,695 @@
+import queue
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from psycopg2.extras import RealDictCursor
+from database import db
+from postgres_client import pg_client
+from async_runtime import runtime
+from sql_utils import fingerprint_sql
+
+DEFAULT_SAMPLE_INTERVAL_SECONDS = 60
+DEFAULT_RETENTION_HOURS = 24
+# Statement texts are stored once per queryid, cut to this length
+MAX_QUERY_TEXT = 4000
+
+# Counters per statement in the current database, summed over users
+STATEMENT_COUNTERS_SQL = """
+    SELECT queryid,
+           SUM(calls)::bigint AS calls,
+           SUM(total_exec_time) AS total_time,
+           SUM(rows)::bigint AS rows,
+           MIN(LEFT(query, %s)) AS query
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+    AND queryid IS NOT NULL
+    GROUP BY queryid
+"""
+
+# Lock chains often last seconds, so the blocking tree is sampled far more often than statement counters
+DEFAULT_LOCK_SAMPLE_INTERVAL_SECONDS = 5
+
+DEFAULT_ACTIVITY_INTERVAL_SECONDS = 2
+MIN_ACTIVITY_INTERVAL_SECONDS = 0.5
+# Events buffered per subscriber; a subscriber that falls further behind is resynced with a full snapshot
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Wait-event profiles sample at PROFILE_HZ_RANGE times per second for at most MAX_PROFILE_SECONDS
+DEFAULT_PROFILE_SECONDS = 10
+MAX_PROFILE_SECONDS = 300
+DEFAULT_PROFILE_HZ = 20
+PROFILE_HZ_RANGE = (10, 100)
+DEFAULT_PROFILE_TOP_K = 20
+# Space-Saving tracks this many times more keys than it reports, which keeps the reported counts close to exact
+TOP_K_CAPACITY_FACTOR = 5
+# Query text fetched per sample; enough to label a statement without shipping whole queries 100 times a second
+PROFILE_QUERY_TEXT = 300
+# Distinct statement texts whose fingerprint is remembered during a profile
+FINGERPRINT_CACHE_SIZE = 10000
+
+# Sessions doing work right now, ASH-style: active ones, whether on CPU or waiting; query_id needs PostgreSQL 14
+WAIT_SAMPLE_SQL = """
+    SELECT backend_type,
+           wait_event_type,
+           wait_event,
+           {query_id} AS query_id,
+           LEFT(query, %s) AS query
+    FROM pg_stat_activity
+    WHERE state = 'active'
+    AND pid != pg_backend_pid()
+"""
+
+# Client sessions; the monitor's own connection is left out
+ACTIVITY_SQL = """
+    SELECT pid,
+           backend_start,
+           datname AS database,
+           usename AS username,
+           application_name,
+           client_addr::text AS client_addr,
+           state,
+           wait_event_type,
+           wait_event,
+           backend_xid::text AS backend_xid,
+           xact_start,
+           query_start,
+           state_change,
+           LEFT(query, %s) AS query,
+           now() AS server_time
+    FROM pg_stat_activity
+    WHERE backend_type = 'client backend'
+    AND pid != pg_backend_pid()
+"""
+# Session fields whose change is reported; durations are derived by clients from server_time
+ACTIVITY_DIFF_FIELDS = ('state', 'wait_event_type', 'wait_event', 'backend_xid', 'xact_start',
+                        'query_start', 'state_change', 'query')
+
+ORDER_COLUMNS = {
+    'total_time': 'total_time_ms',
+    'mean_time': 'mean_time_ms',
+    'calls': 'calls',
+    'rows': 'rows'
+}
+
+
+class WatchedSampler(ABC):
+    """Samples every watched connection on a background thread; a connection nobody has asked about for a
+    retention period stops being sampled"""
+
+    thread_name = 'pgai-sampler'
+
+    def __init__(self, interval_seconds: float, retention_hours: float):
+        self.interval_seconds = interval_seconds
+        self.retention_hours = retention_hours
+        # connection_id -> time it was last asked for
+        self.watched: Dict[int, float] = {}
+        self.errors: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        # connection_id -> lock held while that connection is sampled, by the loop or by a first watch()
+        self.sample_locks: Dict[int, threading.Lock] = {}
+        self._thread = None
+
+    def watch(self, connection_id: int):
+        """Keep sampling a connection; the first call samples right away so history starts accruing"""
+        with self.lock:
+            first = connection_id not in self.watched
+            self.watched[connection_id] = time.time()
+        if first:
+            self._sample(connection_id)
+        self._start()
+
+    def _sample(self, connection_id: int):
+        with self.lock:
+            sample_lock = self.sample_locks.setdefault(connection_id, threading.Lock())
+        with sample_lock:
+            self.sample_connection(connection_id)
+
+    def _start(self):
+        if not self.interval_seconds:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._sample_loop, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _sample_loop(self):
+        while self.interval_seconds:
+            time.sleep(self.interval_seconds)
+            cutoff = time.time() - self.retention_hours * 3600
+            with self.lock:
+                for connection_id in [c for c, seen in self.watched.items() if seen < cutoff]:
+                    del self.watched[connection_id]
+                    self.forget(connection_id)
+                connection_ids = list(self.watched)
+            for connection_id in connection_ids:
+                self._sample(connection_id)
+                self.prune(connection_id, cutoff)
+
+    @abstractmethod
+    def sample_connection(self, connection_id: int):
+        """Take one sample of a connection and store it"""
+
+    def prune(self, connection_id: int, cutoff: float):
+        """Drop stored samples older than cutoff"""
+
+    def forget(self, connection_id: int):
+        """Drop in-memory state of a connection that is no longer watched"""
+
+
+class StatementSampler(WatchedSampler):
+    """Periodically snapshots pg_stat_statements counters into SQLite so activity can be ranked over a recent window.
+
+    Only statements whose counters moved since the previous snapshot are written, so the series stays compact;
+    a statement's value at any time is its latest sample at or before that time.
+    """
+
+    thread_name = 'pgai-stat-sampler'
+
+    def __init__(self, interval_seconds: float = DEFAULT_SAMPLE_INTERVAL_SECONDS,
+                 retention_hours: float = DEFAULT_RETENTION_HOURS):
+        super().__init__(interval_seconds, retention_hours)
+        # connection_id -> {queryid: (calls, total_time, rows)} from the previous snapshot
+        self.last_counters: Dict[int, Dict[int, Tuple[int, float, int]]] = {}
+
+    def prune(self, connection_id: int, cutoff: float):
+        db.prune_statement_samples(connection_id, cutoff)
+
+    def forget(self, connection_id: int):
+        self.last_counters.pop(connection_id, None)
+
+    def fetch_counters(self, conn_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        conn_pool = pg_client.get_pool(conn_data['id'], conn_data)
+        conn = conn_pool.getconn()
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(STATEMENT_COUNTERS_SQL, (MAX_QUERY_TEXT,))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn_pool.putconn(conn)
+
+    def sample_connection(self, connection_id: int) -> Optional[int]:
+        """Take one snapshot and store the statements that changed; returns how many were stored"""
+        try:
+            conn_data = db.get_connection_by_id(connection_id)
+            if not conn_data:
+                return None
+            rows = self.fetch_counters(conn_data)
+        except Exception as e:
+            self.errors[connection_id] = str(e)
+            return None
+        self.errors.pop(connection_id, None)
+
+        sampled_at = time.time()
+        previous = self.last_counters.get(connection_id, {})
+        current = {row['queryid']: (row['calls'], float(row['total_time']), row['rows']) for row in rows}
+        changed = [row for row in rows if previous.get(row['queryid']) != current[row['queryid']]]
+        # Only text for statements not seen before in this process; existing texts are kept
+        texts = {row['queryid']: row['query'] for row in changed if row['queryid'] not in previous}
+
+        db.save_statement_samples(connection_id, sampled_at, [
+            (row['queryid'], row['calls'], float(row['total_time']), row['rows']) for row in changed
+        ], texts, len(rows))
+        self.last_counters[connection_id] = current
+        return len(changed)
+
+    def get_window_stats(self, connection_id: int, window_seconds: float, order: str = 'total_time',
+                         min_mean_ms: float = 0, limit: int = 50) -> Dict[str, Any]:
+        """Per-statement activity between the latest snapshot and the one closest to window_seconds earlier"""
+        end_at = db.get_statement_snapshot_time(connection_id)
+        if end_at is None:
+            return {'success': False, 'error': self.errors.get(connection_id, 'No snapshots yet'), 'queries': []}
+        start_at = db.get_statement_snapshot_time(connection_id, at_or_before=end_at - window_seconds) \
+            or db.get_statement_snapshot_time(connection_id, earliest=True)
+        if start_at >= end_at:
+            return {'success': False, 'error': 'Not enough snapshots yet; deltas need two samples', 'queries': []}
+
+        start = db.get_statement_counters(connection_id, start_at)
+        end = db.get_statement_counters(connection_id, end_at)
+        texts = db.get_statement_texts(connection_id, list(end))
+        elapsed = end_at - start_at
+
+        queries = []
+        for queryid, (calls, total_time, rows) in end.items():
+            base_calls, base_time, base_rows = start.get(queryid, (0, 0.0, 0))
+            # Counters going backwards mean a stats reset in between; count from zero
+            if calls < base_calls:
+                base_calls, base_time, base_rows = 0, 0.0, 0
+            delta_calls = calls - base_calls
+            if delta_calls <= 0:
+                continue
+            delta_time = total_time - base_time
+            mean_time = delta_time / delta_calls
+            if mean_time < min_mean_ms:
+                continue
+            queries.append({
+                'queryid': queryid,
+                'query': texts.get(queryid, ''),
+                'calls': delta_calls,
+                'total_time_ms': delta_time,
+                'mean_time_ms': mean_time,
+                'rows': rows - base_rows,
+                'calls_per_second': delta_calls / elapsed,
+                'rows_per_second': (rows - base_rows) / elapsed
+            })
+
+        key = ORDER_COLUMNS.get(order, 'total_time_ms')
+        queries.sort(key=lambda q: q[key], reverse=True)
+        return {
+            'success': True,
+            'from': start_at,
+            'to': end_at,
+            'window_seconds': elapsed,
+            'requested_window_seconds': window_seconds,
+            'queries': queries[:limit]
+        }
+
+    def get_series(self, connection_id: int, queryid: int, since: float) -> List[Dict[str, Any]]:
+        """Per-interval deltas of one statement between consecutive stored samples"""
+        samples = db.get_statement_series(connection_id, queryid, since)
+        series = []
+        for (prev_at, prev_calls, prev_time, prev_rows), (at, calls, total_time, rows) in zip(samples, samples[1:]):
+            if calls < prev_calls:
+                prev_calls, prev_time, prev_rows = 0, 0.0, 0
+            elapsed = at - prev_at
+            delta_calls = calls - prev_calls
+            series.append({
+                'from': prev_at,
+                'to': at,
+                'calls': delta_calls,
+                'calls_per_second': delta_calls / elapsed if elapsed else None,
+                'mean_time_ms': (total_time - prev_time) / delta_calls if delta_calls else None,
+                'rows_per_second': (rows - prev_rows) / elapsed if elapsed else None
+            })
+        return series
+
+    def get_status(self, connection_id: int) -> Dict[str, Any]:
+        with self.lock:
+            watched_since = self.watched.get(connection_id)
+        return {
+            'sampling': watched_since is not None and bool(self.interval_seconds),
+            'interval_seconds': self.interval_seconds,
+            'retention_hours': self.retention_hours,
+            'error': self.errors.get(connection_id),
+            'first_snapshot': db.get_statement_snapshot_time(connection_id, earliest=True),
+            'last_snapshot': db.get_statement_snapshot_time(connection_id)
+        }
+
+
+class LockSampler(WatchedSampler):
+    """Periodically samples the blocking tree so lock pileups between looks are still on record.
+
+    Each root blocker transaction becomes one episode, extended while it keeps blocking; its blocked
+    session-seconds approximate how much waiting it caused.
+    """
+
+    thread_name = 'pgai-lock-sampler'
+
+    def __init__(self, interval_seconds: float = DEFAULT_LOCK_SAMPLE_INTERVAL_SECONDS,
+                 retention_hours: float = DEFAULT_RETENTION_HOURS):
+        super().__init__(interval_seconds, retention_hours)
+
+    def sample_connection(self, connection_id: int) -> Optional[Dict[str, Any]]:
+        """Take one blocking-tree sample and record it; returns the tree"""
+        conn_data = db.get_connection_by_id(connection_id)
+        if not conn_data:
+            return None
+        tree = pg_client.get_lock_tree(conn_data)
+        if not tree.get('success'):
+            self.errors[connection_id] = tree.get('error')
+            return tree
+        self.errors.pop(connection_id, None)
+        db.save_lock_sample(connection_id, time.time(), tree, self.interval_seconds or DEFAULT_LOCK_SAMPLE_INTERVAL_SECONDS)
+        return tree
+
+    def prune(self, connection_id: int, cutoff: float):
+        db.prune_lock_samples(connection_id, cutoff)
+
+    def get_history(self, connection_id: int, window_seconds: float, limit: int = 50) -> Dict[str, Any]:
+        """Waiting sessions over time and the root blockers that held up the most session time in the window"""
+        since = time.time() - window_seconds
+        return {
+            'samples': db.get_lock_samples(connection_id, since),
+            'episodes': db.get_lock_episodes(connection_id, since, limit),
+            'sampler': {
+                'sampling': connection_id in self.watched and bool(self.interval_seconds),
+                'interval_seconds': self.interval_seconds,
+                'retention_hours': self.retention_hours,
+                'error': self.errors.get(connection_id)
+            }
+        }
+
+
+def _json_ready(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+class ActivitySubscriber:
+    """One listener of a connection's activity feed"""
+
+    def __init__(self, connection_id: int, interval_seconds: float):
+        self.connection_id = connection_id
+        self.interval_seconds = max(MIN_ACTIVITY_INTERVAL_SECONDS, interval_seconds)
+        self.events: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def send(self, event: Dict[str, Any], snapshot: Optional[Dict[str, Any]] = None):
+        """Queue an event; when the subscriber is too far behind, replace its backlog with the current snapshot"""
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            while True:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    break
+            if snapshot is not None:
+                self.events.put_nowait(snapshot)
+
+
+class ActivitySampler(threading.Thread):
+    """Polls pg_stat_activity for one connection on a pinned pool connection and fans diffs out to subscribers"""
+
+    def __init__(self, conn_data: Dict[str, Any]):
+        super().__init__(name=f"pgai-activity-{conn_data['id']}", daemon=True)
+        self.conn_data = conn_data
+        self.subscribers: List[ActivitySubscriber] = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        # (pid, backend_start) -> session row from the last poll
+        self.sessions: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self.server_time: Optional[str] = None
+        self.polled = False
+
+    def add(self, subscriber: ActivitySubscriber):
+        with self.lock:
+            self.subscribers.append(subscriber)
+            if self.polled:
+                subscriber.send(self.snapshot_event())
+
+    def remove(self, subscriber: ActivitySubscriber) -> int:
+        """Drop a subscriber and return how many remain"""
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            return len(self.subscribers)
+
+    def interval(self) -> float:
+        with self.lock:
+            return min([s.interval_seconds for s in self.subscribers], default=DEFAULT_ACTIVITY_INTERVAL_SECONDS)
+
+    def snapshot_event(self) -> Dict[str, Any]:
+        return {'type': 'snapshot', 'server_time': self.server_time, 'sessions': list(self.sessions.values())}
+
+    def broadcast(self, event: Dict[str, Any]):
+        with self.lock:
+            snapshot = self.snapshot_event() if self.polled else None
+            for subscriber in self.subscribers:
+                subscriber.send(event, snapshot)
+
+    def run(self):
+        conn_pool = pg_client.get_pool(self.conn_data['id'], self.conn_data)
+        conn = None
+        try:
+            while not self.stopped.is_set():
+                try:
+                    if conn is None:
+                        conn = conn_pool.getconn()
+                        # Statistics views are frozen for the length of a transaction
+                        conn.autocommit = True
+                    cursor = conn.cursor(cursor_factory=RealDictCursor)
+                    cursor.execute(ACTIVITY_SQL, (MAX_QUERY_TEXT,))
+                    rows = [_json_ready(dict(row)) for row in cursor.fetchall()]
+                    cursor.close()
+                    self.apply(rows)
+                except Exception as e:
+                    self.broadcast({'type': 'error', 'error': str(e)})
+                    if conn is not None:
+                        conn_pool.putconn(conn, close=True)
+                        conn = None
+                self.stopped.wait(self.interval())
+        finally:
+            if conn is not None:
+                conn.autocommit = False
+                conn_pool.putconn(conn)
+
+    def apply(self, rows: List[Dict[str, Any]]):
+        """Diff a poll against the previous one and broadcast what changed"""
+        server_time = rows[0].pop('server_time') if rows else datetime.now().astimezone().isoformat()
+        for row in rows:
+            row.pop('server_time', None)
+        current = {(row['pid'], row['backend_start']): row for row in rows}
+
+        if not self.polled:
+            with self.lock:
+                self.sessions, self.server_time, self.polled = current, server_time, True
+            self.broadcast(self.snapshot_event())
+            return
+
+        added = [row for key, row in current.items() if key not in self.sessions]
+        removed = [{'pid': key[0], 'backend_start': key[1]} for key in self.sessions if key not in current]
+        changed = [row for key, row in current.items() if key in self.sessions
+                   and any(row[f] != self.sessions[key][f] for f in ACTIVITY_DIFF_FIELDS)]
+        with self.lock:
+            self.sessions, self.server_time = current, server_time
+
+        # Every poll is sent, even without changes, so clients can tick durations and streams notice dead clients
+        self.broadcast({'type': 'diff', 'server_time': server_time, 'added': added, 'removed': removed, 'changed': changed})
+
+
+class ActivityMonitor:
+    """One pg_stat_activity sampler per connection, shared by all its subscribers and stopped when the last leaves"""
+
+    def __init__(self):
+        self.samplers: Dict[int, ActivitySampler] = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, conn_data: Dict[str, Any], interval_seconds: float = DEFAULT_ACTIVITY_INTERVAL_SECONDS) -> ActivitySubscriber:
+        subscriber = ActivitySubscriber(conn_data['id'], interval_seconds)
+        with self.lock:
+            sampler = self.samplers.get(conn_data['id'])
+            if sampler is None or sampler.stopped.is_set():
+                sampler = ActivitySampler(conn_data)
+                self.samplers[conn_data['id']] = sampler
+                sampler.add(subscriber)
+                sampler.start()
+            else:
+                sampler.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: ActivitySubscriber):
+        with self.lock:
+            sampler = self.samplers.get(subscriber.connection_id)
+            if sampler is not None and sampler.remove(subscriber) == 0:
+                sampler.stopped.set()
+                del self.samplers[subscriber.connection_id]
+
+    def get_stats(self) -> Dict[int, int]:
+        """Subscriber count per connection with a running sampler"""
+        with self.lock:
+            return {connection_id: len(sampler.subscribers) for connection_id, sampler in self.samplers.items()}
+
+
+class SpaceSaving:
+    """Streaming top-k counter (Metwally et al.): at most `capacity` keys, each count over by at most its error"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1):
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            # The newcomer takes over the smallest counter and inherits its count as possible overestimate
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[key] = floor + count
+            self.errors[key] = floor
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """(key, count, error) for the k largest counters"""
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])[:k]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+
+def _frame(text: str) -> str:
+    """A collapsed-stack frame: one line, no ';' separators"""
+    return ' '.join(text.split()).replace(';', ',')
+
+
+class WaitEventProfiler:
+    """Samples what active sessions are waiting on at a high rate for a bounded window and aggregates the samples
+    into an Active Session History breakdown and collapsed stacks for a flame graph"""
+
+    def __init__(self):
+        # Connections with a profile in progress; each holds a pool connection for its whole window
+        self.running: set = set()
+        self.lock = threading.Lock()
+
+    def start(self, conn_data: Dict[str, Any], seconds: float = DEFAULT_PROFILE_SECONDS,
+              hz: float = DEFAULT_PROFILE_HZ, top_k: int = DEFAULT_PROFILE_TOP_K) -> str:
+        """Start a profile as a background job and return its id; one profile runs per connection at a time"""
+        with self.lock:
+            if conn_data['id'] in self.running:
+                raise ValueError('A wait-event profile is already running for this connection')
+            self.running.add(conn_data['id'])
+        job_id = runtime.create_job('wait_profile')
+        runtime.start_job(job_id, self.profile, job_id, conn_data, seconds, hz, top_k)
+        return job_id
+
+    def profile(self, job_id: Optional[str], conn_data: Dict[str, Any], seconds: float, hz: float,
+                top_k: int) -> Dict[str, Any]:
+        seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+        hz = min(max(hz, PROFILE_HZ_RANGE[0]), PROFILE_HZ_RANGE[1])
+        top_k = max(1, top_k)
+        capacity = top_k * TOP_K_CAPACITY_FACTOR
+        profile = {
+            'wait_types': {},
+            'wait_events': SpaceSaving(capacity),
+            'queries': SpaceSaving(capacity),
+            'stacks': SpaceSaving(capacity * 2),
+            # second of the window -> {wait type: samples}, and the ticks taken in that second
+            'timeline': {},
+            'timeline_ticks': {},
+            'query_texts': {},
+            'fingerprints': {},
+            'samples': 0
+        }
+
+        try:
+            conn_pool = pg_client.get_pool(conn_data['id'], conn_data)
+            conn = conn_pool.getconn()
+            try:
+                ticks, missed, elapsed = self.sample(conn, profile, job_id, seconds, hz)
+            finally:
+                conn.autocommit = False
+                conn_pool.putconn(conn)
+        finally:
+            with self.lock:
+                self.running.discard(conn_data['id'])
+
+        return self.summarize(profile, ticks, missed, elapsed, hz, top_k)
+
+    def sample(self, conn, profile: Dict[str, Any], job_id: Optional[str], seconds: float,
+               hz: float) -> Tuple[int, int, float]:
+        """Sample on a fixed schedule; returns ticks taken, ticks skipped because a sample overran, and elapsed time"""
+        # Statistics views are frozen for the length of a transaction
+        conn.autocommit = True
+        sql = WAIT_SAMPLE_SQL.format(query_id='query_id' if conn.server_version >= 140000 else 'NULL::bigint')
+        cursor = conn.cursor()
+        period = 1.0 / hz
+        ticks = missed = 0
+        started = time.monotonic()
+        next_tick = started
+        while True:
+            now = time.monotonic()
+            if now - started >= seconds:
+                break
+            if now < next_tick:
+                time.sleep(next_tick - now)
+            elif now - next_tick >= period:
+                # Skip the ticks a slow sample overran rather than bursting to catch up
+                skipped = int((now - next_tick) / period)
+                missed += skipped
+                next_tick += skipped * period
+            cursor.execute(sql, (PROFILE_QUERY_TEXT,))
+            self.record(profile, cursor.fetchall(), int(next_tick - started))
+            ticks += 1
+            next_tick += period
+            if job_id and ticks % int(hz) == 0:
+                runtime.update_job(job_id, progress={'elapsed_seconds': round(time.monotonic() - started, 1),
+                                                     'seconds': seconds, 'samples': profile['samples']})
+        cursor.close()
+        return ticks, missed, time.monotonic() - started
+
+    @staticmethod
+    def record(profile: Dict[str, Any], rows: List[tuple], second: int):
+        """Fold one tick's active sessions into the aggregates; a session not waiting is on CPU"""
+        bucket = profile['timeline'].setdefault(second, {})
+        profile['timeline_ticks'][second] = profile['timeline_ticks'].get(second, 0) + 1
+        fingerprints = profile['fingerprints']
+        for backend_type, wait_type, wait_event, query_id, query in rows:
+            wait_type = wait_type or 'CPU'
+            event = f'{wait_type}:{wait_event}' if wait_event else wait_type
+            if query_id:
+                query_key = str(query_id)
+            elif query:
+                # Without query_id (before PostgreSQL 14, or compute_query_id off) statements group by fingerprint
+                if query not in fingerprints:
+                    if len(fingerprints) >= FINGERPRINT_CACHE_SIZE:
+                        fingerprints.clear()
+                    fingerprints[query] = fingerprint_sql(query)
+                query_key = fingerprints[query]
+            else:
+                query_key = backend_type
+
+            profile['samples'] += 1
+            profile['wait_types'][wait_type] = profile['wait_types'].get(wait_type, 0) + 1
+            bucket[wait_type] = bucket.get(wait_type, 0) + 1
+            profile['wait_events'].add(event)
+            profile['queries'].add(query_key)
+            if query_key not in profile['query_texts']:
+                texts = profile['query_texts']
+                if len(texts) >= profile['queries'].capacity * 2:
+                    # Keep texts only for statements still counted
+                    for key in [key for key in texts if key not in profile['queries'].counts]:
+                        del texts[key]
+                texts[query_key] = query or backend_type
+            label = _frame(query or backend_type)[:80]
+            frames = [_frame(backend_type), f'{query_key} {label}', wait_type] + ([_frame(wait_event)] if wait_event else [])
+            profile['stacks'].add(';'.join(frames))
+
+    @staticmethod
+    def summarize(profile: Dict[str, Any], ticks: int, missed: int, elapsed: float, hz: float,
+                  top_k: int) -> Dict[str, Any]:
+        samples = profile['samples']
+
+        def share(count: int) -> Dict[str, Any]:
+            # Average active sessions: samples per tick, the ASH measure of load
+            return {'samples': count,
+                    'percent': count / samples * 100 if samples else 0.0,
+                    'average_active_sessions': count / ticks if ticks else 0.0}
+
+        wait_types = [{'wait_type': wait_type, **share(count)}
+                      for wait_type, count in sorted(profile['wait_types'].items(), key=lambda item: -item[1])]
+        wait_events = [{'wait_event_type': key.split(':', 1)[0],
+                        'wait_event': key.split(':', 1)[1] if ':' in key else None,
+                        'error': error, **share(count)}
+                       for key, count, error in profile['wait_events'].top(top_k)]
+        queries = [{'query_id': key, 'query': profile['query_texts'].get(key), 'error': error, **share(count)}
+                   for key, count, error in profile['queries'].top(top_k)]
+        stacks = profile['stacks'].top(len(profile['stacks'].counts))
+        timeline_ticks = profile['timeline_ticks']
+        timeline = [{'second': second,
+                     'average_active_sessions': {wait_type: count / timeline_ticks[second]
+                                                 for wait_type, count in bucket.items()}}
+                    for second, bucket in sorted(profile['timeline'].items())]
+
+        return {
+            'success': True,
+            'duration_seconds': elapsed,
+            'requested_hz': hz,
+            'achieved_hz': ticks / elapsed if elapsed else 0.0,
+            'ticks': ticks,
+            'missed_ticks': missed,
+            'samples': samples,
+            'average_active_sessions': samples / ticks if ticks else 0.0,
+            'wait_types': wait_types,
+            'wait_events': wait_events,
+            'queries': queries,
+            'timeline': timeline,
+            'stacks': [{'stack': stack, 'samples': count} for stack, count, _ in stacks],
+            # Brendan Gregg's collapsed format, ready for flamegraph.pl or speedscope
+            'collapsed': '\n'.join(f'{stack} {count}' for stack, count, _ in stacks)
+        }
+
+# Global instances
+statement_sampler = StatementSampler()
+lock_sampler = LockSampler()
+activity_monitor = ActivityMonitor()
+wait_profiler = WaitEventProfiler()
@@ -0,0 +1,196 @@
+from typing import Dict, Any, List
+from plan_model import Plan, PlanNode
+
+# Sequential scans reading fewer rows than this are cheap enough to ignore
+SEQ_SCAN_MIN_ROWS = 10000
+# A filter keeping less than this fraction of scanned rows suggests an index would help
+SEQ_SCAN_SELECTIVE_FRACTION = 0.1
+# Row estimates off by this factor are flagged; by the second one they are severe
+MISESTIMATE_FACTOR = 10
+MISESTIMATE_SEVERE_FACTOR = 1000
+# Misestimates on nodes producing fewer rows than this rarely change the plan
+MISESTIMATE_MIN_ROWS = 100
+# Nested loops whose inner side runs this many times are flagged
+NESTED_LOOP_MIN_LOOPS = 1000
+# Buffer hit ratio below which reads are reported, once enough blocks were touched to matter
+LOW_HIT_RATIO = 0.9
+LOW_HIT_MIN_BLOCKS = 1000
+# Share of execution time above which a finding is treated as a bottleneck
+BOTTLENECK_TIME_PERCENT = 20
+
+SEVERITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def _finding(rule: str, severity: str, node: PlanNode, message: str, recommendation: str,
+             **metrics) -> Dict[str, Any]:
+    return {
+        'rule': rule,
+        'severity': severity,
+        'node': node.label(),
+        'message': message,
+        'recommendation': recommendation,
+        'metrics': metrics
+    }
+
+
+def _time_share(node: PlanNode, execution_time: float) -> float:
+    return node.exclusive_time / execution_time * 100 if execution_time else 0.0
+
+
+def check_seq_scan(node: PlanNode, execution_time: float) -> List[Dict[str, Any]]:
+    if node.node_type not in ('Seq Scan', 'Parallel Seq Scan') or not node.executed:
+        return []
+    removed = node.data.get('Rows Removed by Filter', 0) * node.loops
+    scanned = node.total_rows + removed
+    if scanned < SEQ_SCAN_MIN_ROWS:
+        return []
+
+    share = _time_share(node, execution_time)
+    kept = node.total_rows / scanned
+    if node.data.get('Filter') and kept < SEQ_SCAN_SELECTIVE_FRACTION:
+        severity = 'high' if share >= BOTTLENECK_TIME_PERCENT else 'medium'
+        return [_finding(
+            'seq_scan', severity, node,
+            f"Sequential scan of {node.relation} read {scanned:,} rows to keep {node.total_rows:,} "
+            f"({kept:.1%}), taking {share:.0f}% of execution time",
+            f"Consider an index supporting the filter {node.data['Filter']}",
+            rows_scanned=scanned, rows_kept=node.total_rows, time_percent=share
+        )]
+    if node.loops > 1 and node.parallel_processes < node.loops:
+        return [_finding(
+            'seq_scan', 'medium', node,
+            f"Sequential scan of {node.relation} ran {node.loops:,} times, reading {scanned:,} rows in total",
+            'Repeated full scans usually come from a nested loop; an index on the join key avoids them',
+            rows_scanned=scanned, loops=node.loops, time_percent=share
+        )]
+    if share >= BOTTLENECK_TIME_PERCENT:
+        return [_finding(
+            'seq_scan', 'low', node,
+            f"Sequential scan of {node.relation} read {scanned:,} rows, {share:.0f}% of execution time",
+            'Expected when most of the table is needed; otherwise add a selective filter or index',
+            rows_scanned=scanned, time_percent=share
+        )]
+    return []
+
+
+def check_misestimate(node: PlanNode, execution_time: float) -> List[Dict[str, Any]]:
+    factor = node.misestimate_factor
+    if factor is None or factor < MISESTIMATE_FACTOR or node.under_limit:
+        return []
+    if max(node.actual_rows, node.plan_rows) < MISESTIMATE_MIN_ROWS:
+        return []
+    # Pass-through nodes such as Hash repeat their child's estimate; report it once, at the source
+    if len(node.children) == 1 and (node.children[0].plan_rows, node.children[0].actual_rows) == (node.plan_rows, node.actual_rows):
+        return []
+
+    direction = 'underestimated' if node.row_estimate_ratio > 1 else 'overestimated'
+    target = f' on {node.relation}' if node.relation else ''
+    return [_finding(
+        'row_misestimate', 'high' if factor >= MISESTIMATE_SEVERE_FACTOR else 'medium', node,
+        f"Rows {direction} {factor:,.0f}x at {node.label()}: estimated {node.plan_rows:,}, actual {node.actual_rows:,} per loop",
+        f"Run ANALYZE{target}; for correlated columns consider CREATE STATISTICS",
+        plan_rows=node.plan_rows, actual_rows=node.actual_rows, factor=factor
+    )]
+
+
+def check_spill(node: PlanNode, execution_time: float) -> List[Dict[str, Any]]:
+    data = node.data
+    spilled = None
+    if data.get('Sort Space Type') == 'Disk' or str(data.get('Sort Method', '')).startswith('external'):
+        spilled = f"sort spilled {data.get('Sort Space Used', 0):,} kB to disk ({data.get('Sort Method')})"
+    elif data.get('Hash Batches', 1) > 1:
+        spilled = f"hash table split into {data['Hash Batches']} batches"
+    elif data.get('HashAgg Batches', 1) > 1 or data.get('Disk Usage', 0) > 0:
+        spilled = f"hash aggregate spilled {data.get('Disk Usage', 0):,} kB to disk"
+    if not spilled:
+        return []
+
+    share = _time_share(node, execution_time)
+    return [_finding(
+        'disk_spill', 'high' if share >= BOTTLENECK_TIME_PERCENT else 'medium', node,
+        f"{node.label()}: {spilled}",
+        'Raise work_mem for this query (SET LOCAL work_mem) or reduce the rows reaching this node',
+        temp_written_blocks=node.exclusive_buffers['Temp Written Blocks'], time_percent=share
+    )]
+
+
+def check_nested_loop(node: PlanNode, execution_time: float) -> List[Dict[str, Any]]:
+    if node.node_type != 'Nested Loop' or len(node.children) < 2:
+        return []
+    inner = node.children[1]
+    if inner.loops < NESTED_LOOP_MIN_LOOPS:
+        return []
+
+    share = node.total_time / execution_time * 100 if execution_time else 0.0
+    outer = node.children[0]
+    return [_finding(
+        'nested_loop', 'high' if share >= BOTTLENECK_TIME_PERCENT else 'medium', node,
+        f"Nested loop ran its inner side ({inner.label()}) {inner.loops:,} times, "
+        f"{share:.0f}% of execution time",
+        'An index on the inner join key, or fresh statistics on the outer side '
+        f"(estimated {outer.plan_rows:,} rows, got {outer.actual_rows:,}) may allow a hash or merge join",
+        inner_loops=inner.loops, time_percent=share
+    )]
+
+
+def check_buffer_hits(plan: Plan) -> List[Dict[str, Any]]:
+    """Whole-plan shared buffer hit ratio, pointing at the node doing the most reads"""
+    totals = plan.buffer_totals
+    hits, reads = totals['Shared Hit Blocks'], totals['Shared Read Blocks']
+    if hits + reads < LOW_HIT_MIN_BLOCKS or hits / (hits + reads) >= LOW_HIT_RATIO:
+        return []
+
+    reader = max(plan.nodes(), key=lambda n: n.exclusive_buffers['Shared Read Blocks'])
+    ratio = hits / (hits + reads)
+    return [_finding(
+        'low_buffer_hits', 'medium' if ratio >= 0.5 else 'high', reader,
+        f"Only {ratio:.0%} of {hits + reads:,} shared buffers were cache hits; "
+        f"{reader.label()} read {reader.exclusive_buffers['Shared Read Blocks']:,} blocks from disk or OS cache",
+        'Reduce the data read with a more selective index, or check whether shared_buffers fits the working set',
+        hit_ratio=ratio, blocks_read=reads
+    )]
+
+
+NODE_RULES = [check_seq_scan, check_misestimate, check_spill, check_nested_loop]
+
+
+def analyze_plan(plan: Plan) -> Dict[str, Any]:
+    """Run every rule over a plan and return findings, most severe first, in the analyze-explain response shape"""
+    execution_time = plan.execution_time or plan.root.total_time
+    findings = []
+    for node in plan.nodes():
+        for rule in NODE_RULES:
+            findings.extend(rule(node, execution_time))
+    findings.extend(check_buffer_hits(plan))
+    findings.sort(key=lambda f: (SEVERITY_ORDER[f['severity']], -f['metrics'].get('time_percent', 0)))
+
+    hottest = max(plan.nodes(), key=lambda n: n.exclusive_time)
+    insights = [
+        f"Execution took {execution_time:.1f} ms (planning {plan.planning_time or 0:.1f} ms) over {len(plan.nodes())} plan nodes",
+        f"Most time is spent in {hottest.label()}: {hottest.exclusive_time:.1f} ms "
+        f"({_time_share(hottest, execution_time):.0f}%)"
+    ]
+
+    if findings:
+        high = sum(1 for f in findings if f['severity'] == 'high')
+        summary = f"{len(findings)} issue(s) found" + (f", {high} severe" if high else '') + f": {findings[0]['message']}"
+    else:
+        summary = 'No common plan problems detected.'
+
+    return {
+        'success': True,
+        'source': 'local',
+        'findings': findings,
+        'summary': summary,
+        'bottlenecks': [f['message'] for f in findings if f['severity'] == 'high'],
+        'insights': insights,
+        'recommendations': list(dict.fromkeys(f['recommendation'] for f in findings))
+    }
+
+
+def format_hints(analysis: Dict[str, Any]) -> str:
+    """Findings as compact one-line hints for an LLM prompt"""
+    return '\n'.join(
+        f"- [{f['severity']}] {f['rule']} @ {f['node']}: {f['message']}"
+        for f in analysis['findings']
+    ) or '- none'
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from database import db
+from postgres_client import pg_client
+from async_runtime import runtime
+from plan_model import Plan
+from sql_utils import parse_single, fingerprint_sql
+
+# Queries running at least this long get their plan captured; 0 turns capture off
+DEFAULT_THRESHOLD_MS = 1000
+# A fingerprint is re-captured at most this often, however often it runs slowly
+MIN_CAPTURE_INTERVAL_SECONDS = 300
+# A capture whose estimated cost or observed run time is this many times the previous one's is a regression
+REGRESSION_FACTOR = 2.0
+
+# Statements EXPLAIN accepts; plain EXPLAIN does not execute them, so capturing DML is safe
+EXPLAINABLE_TYPES = {'SELECT', 'INSERT', 'UPDATE', 'DELETE'}
+
+
+class PlanCapture:
+    """Captures EXPLAIN plans of slow app-executed queries in the background and flags plan regressions"""
+
+    def __init__(self, threshold_ms: float = DEFAULT_THRESHOLD_MS):
+        self.threshold_ms = threshold_ms
+        # (connection_id, fingerprint) -> time of the last capture started
+        self.last_capture: Dict[Tuple[int, str], float] = {}
+        self.lock = threading.Lock()
+
+    def maybe_capture(self, conn_data: Dict[str, Any], query: str, execution_time: float) -> Optional[str]:
+        """Schedule a capture if the query was slow enough and not captured recently; returns the job id"""
+        if not self.threshold_ms or execution_time * 1000 < self.threshold_ms:
+            return None
+        statement = parse_single(query)
+        if statement is None or statement.get_type() not in EXPLAINABLE_TYPES:
+            return None
+
+        fingerprint = fingerprint_sql(query)
+        key = (conn_data['id'], fingerprint)
+        now = time.time()
+        with self.lock:
+            if now - self.last_capture.get(key, 0) < MIN_CAPTURE_INTERVAL_SECONDS:
+                return None
+            self.last_capture[key] = now
+
+        return runtime.submit('plan_capture', self.capture, conn_data, query, fingerprint, execution_time)
+
+    def capture(self, conn_data: Dict[str, Any], query: str, fingerprint: str, execution_time: float) -> Dict[str, Any]:
+        """EXPLAIN the query, compare with the fingerprint's previous plan and store the result"""
+        plan_json = pg_client.explain_plan(conn_data, query)
+        plan = Plan(plan_json)
+        shape_hash = plan.shape_hash()
+        previous = db.get_latest_query_plan(conn_data['id'], fingerprint)
+        regression = self.detect_regression(previous, shape_hash, plan.total_cost, execution_time)
+
+        plan_id = db.save_query_plan(conn_data['id'], fingerprint, query, shape_hash, plan.total_cost,
+                                     execution_time, plan_json, regression)
+        if regression:
+            print(f"Plan regression for connection {conn_data['id']} fingerprint {fingerprint}: {regression['reasons']}")
+        return {'plan_id': plan_id, 'fingerprint': fingerprint, 'shape_hash': shape_hash, 'regression': regression}
+
+    @staticmethod
+    def detect_regression(previous: Optional[Dict[str, Any]], shape_hash: str, total_cost: float,
+                          execution_time: float) -> Optional[Dict[str, Any]]:
+        """Compare a new capture with the previous one: a worse new shape, a jump in estimated cost or a slower run"""
+        if previous is None:
+            return None
+
+        reasons = []
+        previous_cost = previous.get('total_cost') or 0
+        previous_time = previous.get('execution_time') or 0
+        slower = bool(previous_time) and execution_time >= previous_time * REGRESSION_FACTOR
+        # A new shape the planner expects to be cheaper is an improvement unless the query actually got slower
+        if previous['shape_hash'] != shape_hash and (total_cost >= previous_cost or slower):
+            reasons.append('shape_changed')
+        if previous_cost and total_cost >= previous_cost * REGRESSION_FACTOR:
+            reasons.append('cost_increased')
+        if slower:
+            reasons.append('slower')
+        if not reasons:
+            return None
+
+        return {
+            'reasons': reasons,
+            'previous_plan_id': previous['id'],
+            'previous_shape_hash': previous['shape_hash'],
+            'previous_cost': previous_cost,
+            'cost': total_cost,
+            'cost_ratio': total_cost / previous_cost if previous_cost else None,
+            'previous_execution_time': previous.get('execution_time'),
+            'execution_time': execution_time
+        }
+
+# Global instance
+plan_capture = PlanCapture()
@@ -0,0 +1,272 @@
+import hashlib
+import json
+from typing import Dict, Any, List, Optional
+
+# EXPLAIN (BUFFERS) counters, reported per node including its children
+BUFFER_KEYS = [
+    'Shared Hit Blocks', 'Shared Read Blocks', 'Shared Dirtied Blocks', 'Shared Written Blocks',
+    'Local Hit Blocks', 'Local Read Blocks', 'Local Dirtied Blocks', 'Local Written Blocks',
+    'Temp Read Blocks', 'Temp Written Blocks'
+]
+
+# Node properties shown under a node in the text rendering, in EXPLAIN's order
+DETAIL_KEYS = [
+    'Output', 'Group Key', 'Sort Key', 'Sort Method', 'Sort Space Used', 'Hash Cond', 'Merge Cond',
+    'Join Filter', 'Rows Removed by Join Filter', 'Index Cond', 'Recheck Cond', 'Rows Removed by Index Recheck',
+    'Filter', 'Rows Removed by Filter', 'Heap Fetches', 'Hash Buckets', 'Hash Batches', 'Peak Memory Usage',
+    'Workers Planned', 'Workers Launched'
+]
+
+# Row estimates off by at least this factor are called out in the annotated text
+MISESTIMATE_NOTE_FACTOR = 10
+
+
+class PlanNode:
+    """One node of an EXPLAIN (ANALYZE, FORMAT JSON) plan with derived timing, row and buffer figures"""
+
+    def __init__(self, data: Dict[str, Any], parent: Optional['PlanNode'] = None):
+        self.data = data
+        self.parent = parent
+        self.node_type = data.get('Node Type', '')
+        self.relation = data.get('Relation Name')
+        self.schema = data.get('Schema')
+        self.alias = data.get('Alias')
+        self.index_name = data.get('Index Name')
+        self.parent_relationship = data.get('Parent Relationship')
+        self.subplan_name = data.get('Subplan Name')
+
+        self.startup_cost = data.get('Startup Cost', 0.0)
+        self.total_cost = data.get('Total Cost', 0.0)
+        self.plan_rows = data.get('Plan Rows', 0)
+        self.plan_width = data.get('Plan Width', 0)
+
+        # Actual figures are per loop; a node that never ran has zero loops
+        self.actual_startup_time = data.get('Actual Startup Time', 0.0)
+        self.actual_total_time = data.get('Actual Total Time', 0.0)
+        self.actual_rows = data.get('Actual Rows', 0)
+        self.loops = data.get('Actual Loops', 0)
+
+        self.buffers = {key: data.get(key, 0) for key in BUFFER_KEYS}
+        # Below a Gather, loops count every participating process and run side by side
+        if data.get('Workers Launched') is not None:
+            self.parallel_processes = data['Workers Launched'] + 1
+        elif self.parent_relationship == 'InitPlan' and parent and parent.data.get('Workers Launched') is not None:
+            # A Gather's init plans run once, in the leader
+            self.parallel_processes = 1
+        else:
+            self.parallel_processes = parent.parallel_processes if parent else 1
+        self.children = [PlanNode(child, self) for child in data.get('Plans', [])]
+
+    @property
+    def executed(self) -> bool:
+        return self.loops > 0
+
+    @property
+    def total_time(self) -> float:
+        """Inclusive wall time in ms across all loops, with parallel loops counted once per process"""
+        processes = self.parallel_processes if self.data.get('Workers Launched') is None else 1
+        return self.actual_total_time * self.loops / processes
+
+    @property
+    def exclusive_time(self) -> float:
+        """Time in ms spent in this node itself; clamped because per-loop averages are rounded"""
+        return max(0.0, self.total_time - sum(child.total_time for child in self.children))
+
+    @property
+    def total_rows(self) -> int:
+        """Rows produced across all loops"""
+        return self.actual_rows * self.loops
+
+    @property
+    def row_estimate_ratio(self) -> Optional[float]:
+        """Actual over estimated rows per loop; above 1 is an underestimate, below 1 an overestimate"""
+        if not self.executed:
+            return None
+        return max(self.actual_rows, 1) / max(self.plan_rows, 1)
+
+    @property
+    def misestimate_factor(self) -> Optional[float]:
+        """How many times off the row estimate was, in either direction"""
+        ratio = self.row_estimate_ratio
+        return None if ratio is None else max(ratio, 1 / ratio)
+
+    @property
+    def under_limit(self) -> bool:
+        """A Limit above this node may have stopped it early, so its row counts say little about estimates"""
+        node = self.parent
+        while node is not None:
+            if node.node_type == 'Limit':
+                return True
+            node = node.parent
+        return False
+
+    @property
+    def exclusive_buffers(self) -> Dict[str, int]:
+        return {key: max(0, value - sum(child.buffers[key] for child in self.children))
+                for key, value in self.buffers.items()}
+
+    def label(self) -> str:
+        """Node heading as EXPLAIN's text format writes it"""
+        label = self.data['Operation'] if self.node_type == 'ModifyTable' and self.data.get('Operation') else self.node_type
+        if self.data.get('Strategy') in ('Hashed', 'Sorted', 'Mixed') and self.node_type == 'Aggregate':
+            label = {'Hashed': 'HashAggregate', 'Sorted': 'GroupAggregate', 'Mixed': 'MixedAggregate'}[self.data['Strategy']]
+        if self.data.get('Join Type') and self.data['Join Type'] != 'Inner':
+            label = label.replace('Join', f"{self.data['Join Type']} Join") if 'Join' in label \
+                else f"{label} {self.data['Join Type']} Join"
+        if self.data.get('Scan Direction') == 'Backward':
+            label += ' Backward'
+        if self.index_name:
+            label += f' using {self.index_name}'
+        if self.relation:
+            label += f" on {self.relation}"
+            if self.alias and self.alias != self.relation:
+                label += f' {self.alias}'
+        elif self.data.get('CTE Name'):
+            label += f" on {self.data['CTE Name']}"
+        return label
+
+    def shape(self) -> List[Any]:
+        """The node's structure without costs or timings: operators, relations, indexes and join types"""
+        return [self.node_type, self.data.get('Operation'), self.relation, self.index_name,
+                self.data.get('Join Type'), self.data.get('Strategy'), self.parent_relationship,
+                [child.shape() for child in self.children]]
+
+    def walk(self):
+        """This node and all its descendants, depth first"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self, execution_time: Optional[float] = None) -> Dict[str, Any]:
+        exclusive_time = self.exclusive_time
+        return {
+            'node_type': self.node_type,
+            'label': self.label(),
+            'relation': self.relation,
+            'schema': self.schema,
+            'alias': self.alias,
+            'index_name': self.index_name,
+            'parent_relationship': self.parent_relationship,
+            'subplan_name': self.subplan_name,
+            'startup_cost': self.startup_cost,
+            'total_cost': self.total_cost,
+            'plan_rows': self.plan_rows,
+            'actual_rows': self.actual_rows,
+            'loops': self.loops,
+            'total_rows': self.total_rows,
+            'row_estimate_ratio': self.row_estimate_ratio,
+            'misestimate_factor': self.misestimate_factor,
+            'under_limit': self.under_limit,
+            'total_time_ms': self.total_time,
+            'exclusive_time_ms': exclusive_time,
+            'exclusive_time_percent': (exclusive_time / execution_time * 100) if execution_time else None,
+            'buffers': self.buffers,
+            'exclusive_buffers': self.exclusive_buffers,
+            'details': {key: self.data[key] for key in DETAIL_KEYS if key in self.data},
+            'children': [child.to_dict(execution_time) for child in self.children]
+        }
+
+
+class Plan:
+    """A parsed EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) result"""
+
+    def __init__(self, explain_json: Any):
+        # EXPLAIN returns a one-element array holding the plan and its top-level timings
+        document = explain_json[0] if isinstance(explain_json, list) else explain_json
+        self.root = PlanNode(document['Plan'])
+        self.planning_time = document.get('Planning Time')
+        self.execution_time = document.get('Execution Time')
+        self.triggers = document.get('Triggers', [])
+        self.jit = document.get('JIT')
+
+    def nodes(self) -> List[PlanNode]:
+        return list(self.root.walk())
+
+    @property
+    def total_cost(self) -> float:
+        return self.root.total_cost
+
+    def shape_hash(self) -> str:
+        """Hash of the plan's structure; equal hashes mean the planner chose the same strategy"""
+        return hashlib.sha1(json.dumps(self.root.shape()).encode()).hexdigest()[:16]
+
+    @property
+    def buffer_totals(self) -> Dict[str, int]:
+        """Whole-plan buffer counts; the root's figures already include every descendant"""
+        return dict(self.root.buffers)
+
+    def to_dict(self) -> Dict[str, Any]:
+        execution_time = self.execution_time or self.root.total_time
+        return {
+            'planning_time_ms': self.planning_time,
+            'execution_time_ms': self.execution_time,
+            'buffer_totals': self.buffer_totals,
+            'node_count': len(self.nodes()),
+            'triggers': self.triggers,
+            'root': self.root.to_dict(execution_time)
+        }
+
+    def render_text(self, annotate: bool = True) -> str:
+        """Render the plan in EXPLAIN's text layout; annotate adds exclusive time and misestimates for the AI prompt"""
+        execution_time = self.execution_time or self.root.total_time
+        lines: List[str] = []
+
+        def render(node: PlanNode, depth: int):
+            indent = '      ' * (depth - 1) + '  ' if depth else ''
+            arrow = '->  ' if depth else ''
+            if node.subplan_name and depth:
+                lines.append(f"{'      ' * (depth - 1)}  {node.subplan_name}")
+
+            heading = f"{indent}{arrow}{node.label()}  (cost={node.startup_cost:.2f}..{node.total_cost:.2f} " \
+                      f"rows={node.plan_rows} width={node.plan_width})"
+            if node.executed:
+                heading += f" (actual time={node.actual_startup_time:.3f}..{node.actual_total_time:.3f} " \
+                           f"rows={node.actual_rows} loops={node.loops})"
+            else:
+                heading += ' (never executed)'
+            lines.append(heading)
+
+            detail_indent = ' ' * (len(indent) + len(arrow) + 2)
+            for key in DETAIL_KEYS:
+                if key in node.data:
+                    value = node.data[key]
+                    if isinstance(value, list):
+                        value = ', '.join(str(v) for v in value)
+                    lines.append(f'{detail_indent}{key}: {value}')
+
+            buffers = _format_buffers(node.buffers)
+            if buffers:
+                lines.append(f'{detail_indent}Buffers: {buffers}')
+
+            if annotate and node.executed:
+                notes = [f'exclusive {node.exclusive_time:.3f} ms'
+                         + (f' ({node.exclusive_time / execution_time * 100:.1f}%)' if execution_time else '')]
+                factor = node.misestimate_factor
+                if factor and factor >= MISESTIMATE_NOTE_FACTOR and not node.under_limit:
+                    direction = 'under' if node.row_estimate_ratio > 1 else 'over'
+                    notes.append(f'rows {direction}estimated {factor:.0f}x')
+                lines.append(f"{detail_indent}[{'; '.join(notes)}]")
+
+            for child in node.children:
+                render(child, depth + 1)
+
+        render(self.root, 0)
+        if self.planning_time is not None:
+            lines.append(f'Planning Time: {self.planning_time:.3f} ms')
+        for trigger in self.triggers:
+            lines.append(f"Trigger {trigger.get('Trigger Name')}: time={trigger.get('Time', 0):.3f} calls={trigger.get('Calls', 0)}")
+        if self.execution_time is not None:
+            lines.append(f'Execution Time: {self.execution_time:.3f} ms')
+        return '\n'.join(lines)
+
+
+def _format_buffers(buffers: Dict[str, int]) -> str:
+    """Buffers line in EXPLAIN's text style, e.g. 'shared hit=10 read=2, temp written=5'"""
+    groups = []
+    for scope in ('Shared', 'Local', 'Temp'):
+        parts = [f"{kind.lower()}={buffers[f'{scope} {kind} Blocks']}"
+                 for kind in ('Hit', 'Read', 'Dirtied', 'Written')
+                 if buffers.get(f'{scope} {kind} Blocks')]
+        if parts:
+            groups.append(f"{scope.lower()} {' '.join(parts)}")
+    return ', '.join(groups)
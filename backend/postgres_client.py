@@ -1,18 +1,268 @@
 import psycopg2
-from psycopg2 import pool, sql
-from psycopg2.extras import RealDictCursor
-from typing import Dict, List, Any, Optional, Tuple
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, register_default_json, register_default_jsonb
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+import base64
+import csv
+import hashlib
 import time
+import io
+import json
+import queue
+import re
+import threading
+import uuid
+from connection_pool import PoolManager
+from result_cache import ResultCache
+from sql_utils import normalize_sql, is_select, is_plain_select, split_statements
+from plan_model import Plan
+from lock_analyzer import build_blocking_tree
+from data_import import check_column_types
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+RESULT_FORMATS = ('objects', 'arrays', 'columnar')
+
+# Server-side export formats: COPY CSV, one JSON object per line, or INSERT statements
+EXPORT_FORMATS = ('csv', 'jsonl', 'sql')
+# COPY output is handed to the consumer in chunks of about this size...
+EXPORT_CHUNK_BYTES = 256 * 1024
+# ...with at most this many chunks buffered, so exports run in constant memory
+EXPORT_QUEUE_CHUNKS = 16
+# Rows per generated INSERT statement
+EXPORT_INSERT_BATCH = 500
+# Default result budgets for execute_query; the max_rows/max_bytes settings override them
+DEFAULT_MAX_ROWS = 100000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Rows fetched per round trip while materializing a result
+FETCH_BATCH_ROWS = 2000
+
+# Rows of each statement's result included in script output
+SCRIPT_PREVIEW_ROWS = 100
+
+# Rows per COPY FROM STDIN batch during imports
+IMPORT_BATCH_ROWS = 5000
+
+# Filter operators accepted by browse_table, as SQL templates over one column
+BROWSE_FILTER_OPERATORS = {
+    '=': '{col} = %s',
+    '!=': '{col} <> %s',
+    '<': '{col} < %s',
+    '<=': '{col} <= %s',
+    '>': '{col} > %s',
+    '>=': '{col} >= %s',
+    'like': '{col}::text LIKE %s',
+    'ilike': '{col}::text ILIKE %s',
+    'in': '{col} = ANY(%s)',
+    'is_null': '{col} IS NULL',
+    'not_null': '{col} IS NOT NULL'
+}
+
+# pg_type.typcategory -> how the results grid should render a column
+TYPE_CATEGORIES = {
+    'N': 'number',
+    'S': 'string',
+    'E': 'string',
+    'B': 'boolean',
+    'D': 'datetime',
+    'T': 'interval',
+    'A': 'array',
+    'I': 'network',
+    'G': 'geometric',
+    'V': 'bit'
+}
+
+# One signature per user table, derived from the xmin of every catalog row that describes it.
+# Any DDL that touches the table, its columns, defaults, indexes or constraints rewrites one
+# of those rows and therefore changes the signature; VACUUM/ANALYZE update pg_class in place
+# and leave it alone.
+RELATION_SIGNATURES_SQL = """
+    SELECT
+        c.oid,
+        n.nspname as schema,
+        md5(concat_ws('|',
+            c.relname,
+            c.xmin::text,
+            (SELECT string_agg(a.attnum || ':' || a.xmin::text, ',' ORDER BY a.attnum)
+             FROM pg_catalog.pg_attribute a WHERE a.attrelid = c.oid AND a.attnum > 0),
+            (SELECT string_agg(d.adnum || ':' || d.xmin::text, ',' ORDER BY d.adnum)
+             FROM pg_catalog.pg_attrdef d WHERE d.adrelid = c.oid),
+            (SELECT string_agg(i.indexrelid || ':' || ic.xmin::text || ':' || i.xmin::text, ',' ORDER BY i.indexrelid)
+             FROM pg_catalog.pg_index i JOIN pg_catalog.pg_class ic ON ic.oid = i.indexrelid
+             WHERE i.indrelid = c.oid),
+            (SELECT string_agg(co.oid || ':' || co.xmin::text, ',' ORDER BY co.oid)
+             FROM pg_catalog.pg_constraint co WHERE co.conrelid = c.oid)
+        )) as signature
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+    AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+    AND n.nspname NOT LIKE 'pg_toast%%'
+    AND n.nspname NOT LIKE 'pg_temp%%'
+"""
+
+# Expected versus actual pages for every heap (with its TOAST table) and btree index, from catalog
+# statistics alone: the average row width from pg_stats, padded to the platform's alignment, tells
+# how many rows fit in a page at the relation's fillfactor, and reltuples how many pages that takes.
+# Pages beyond the estimate are bloat. Estimates are as fresh as the last ANALYZE; relations with
+# columns missing from pg_stats are flagged because their widths are guesses.
+BLOAT_ESTIMATE_SQL = """
+    WITH constants AS (
+        SELECT current_setting('block_size')::numeric AS bs,
+               CASE WHEN version() ~ 'mingw32|64-bit|x86_64|ppc64|ia64|amd64|aarch64|arm64' THEN 8 ELSE 4 END::numeric AS ma
+    ),
+    heap_widths AS (
+        SELECT tbl.oid AS relid,
+               23 + CASE WHEN MAX(COALESCE(s.null_frac, 0)) > 0 THEN (7 + COUNT(*)) / 8 ELSE 0 END AS hdr_width,
+               SUM((1 - COALESCE(s.null_frac, 0)) * COALESCE(s.avg_width, 0)) AS data_width,
+               COUNT(*) <> COUNT(s.attname) AS stats_missing
+        FROM pg_class tbl
+        JOIN pg_namespace ns ON ns.oid = tbl.relnamespace
+        JOIN pg_attribute att ON att.attrelid = tbl.oid AND att.attnum > 0 AND NOT att.attisdropped
+        LEFT JOIN pg_stats s ON s.schemaname = ns.nspname AND s.tablename = tbl.relname
+            AND s.attname = att.attname AND NOT s.inherited
+        WHERE tbl.relkind IN ('r', 'm')
+        AND ns.nspname NOT IN ('pg_catalog', 'information_schema') AND ns.nspname !~ '^pg_(toast|temp)'
+        GROUP BY tbl.oid
+    ),
+    heap_estimates AS (
+        SELECT 'table' AS kind, tbl.oid AS relid, tbl.oid AS table_relid, NULL::text AS indexname,
+               tbl.relpages + COALESCE(toast.relpages, 0) AS actual_pages,
+               -- 4-byte line pointer plus the MAXALIGNed tuple header and data
+               (CEIL(GREATEST(tbl.reltuples, 0) / GREATEST(FLOOR((c.bs - 24) * f.fillfactor
+                    / (100 * (4 + CEIL(w.hdr_width / c.ma) * c.ma + CEIL(w.data_width / c.ma) * c.ma))), 1))
+               -- Out-of-line values are stored in chunks of about 2kB, four to a page
+               + CEIL(GREATEST(COALESCE(toast.reltuples, 0), 0) / 4))::numeric AS expected_pages,
+               f.fillfactor,
+               w.stats_missing OR tbl.reltuples < 0 AS stats_missing
+        FROM heap_widths w
+        JOIN pg_class tbl ON tbl.oid = w.relid
+        LEFT JOIN pg_class toast ON toast.oid = tbl.reltoastrelid
+        CROSS JOIN constants c
+        CROSS JOIN LATERAL (SELECT COALESCE(substring(array_to_string(tbl.reloptions, ' ')
+                                            FROM 'fillfactor=([0-9]+)')::int, 100) AS fillfactor) f
+    ),
+    index_widths AS (
+        SELECT i.indexrelid AS relid,
+               -- 8-byte IndexTupleData header, plus a null bitmap when any key column has nulls
+               8 + CASE WHEN MAX(COALESCE(s.null_frac, 0)) > 0 THEN 4 ELSE 0 END AS hdr_width,
+               SUM((1 - COALESCE(s.null_frac, 0)) * COALESCE(s.avg_width, 1024)) AS data_width,
+               COUNT(*) <> COUNT(s.attname) AS stats_missing
+        FROM pg_index i
+        JOIN pg_class ci ON ci.oid = i.indexrelid
+        JOIN pg_class ct ON ct.oid = i.indrelid
+        JOIN pg_namespace ns ON ns.oid = ci.relnamespace
+        CROSS JOIN LATERAL generate_series(1, i.indnatts) AS attpos
+        -- Plain key columns have their statistics on the table, expressions on the index itself
+        LEFT JOIN pg_attribute a_tbl ON i.indkey[attpos - 1] <> 0
+            AND a_tbl.attrelid = i.indrelid AND a_tbl.attnum = i.indkey[attpos - 1]
+        LEFT JOIN pg_attribute a_idx ON i.indkey[attpos - 1] = 0
+            AND a_idx.attrelid = i.indexrelid AND a_idx.attnum = attpos
+        LEFT JOIN pg_stats s ON s.schemaname = ns.nspname
+            AND s.tablename = CASE WHEN a_tbl.attnum IS NULL THEN ci.relname ELSE ct.relname END
+            AND s.attname = COALESCE(a_tbl.attname, a_idx.attname) AND NOT s.inherited
+        WHERE ci.relam = (SELECT oid FROM pg_am WHERE amname = 'btree')
+        AND ct.relkind IN ('r', 'm')
+        AND ns.nspname NOT IN ('pg_catalog', 'information_schema') AND ns.nspname !~ '^pg_(toast|temp)'
+        GROUP BY i.indexrelid
+    ),
+    index_estimates AS (
+        SELECT 'index' AS kind, ci.oid AS relid, i.indrelid AS table_relid, ci.relname::text AS indexname,
+               ci.relpages AS actual_pages,
+               -- One metapage, then 24-byte page header and 16-byte btree special space per page
+               (1 + CEIL(GREATEST(ci.reltuples, 0) / GREATEST(FLOOR((c.bs - 24 - 16) * f.fillfactor
+                    / (100 * (4 + CEIL(w.hdr_width / c.ma) * c.ma + CEIL(w.data_width / c.ma) * c.ma))), 1)))::numeric
+                   AS expected_pages,
+               f.fillfactor,
+               w.stats_missing OR ci.reltuples < 0 AS stats_missing
+        FROM index_widths w
+        JOIN pg_class ci ON ci.oid = w.relid
+        JOIN pg_index i ON i.indexrelid = ci.oid
+        CROSS JOIN constants c
+        CROSS JOIN LATERAL (SELECT COALESCE(substring(array_to_string(ci.reloptions, ' ')
+                                            FROM 'fillfactor=([0-9]+)')::int, 90) AS fillfactor) f
+    )
+    SELECT
+        e.kind,
+        ns.nspname AS schemaname,
+        tbl.relname AS tablename,
+        e.indexname,
+        e.relid,
+        pg_size_pretty(CASE WHEN e.kind = 'table' THEN pg_total_relation_size(e.relid) ELSE pg_relation_size(e.relid) END) AS total_size,
+        CASE WHEN e.kind = 'table' THEN pg_total_relation_size(e.relid) ELSE pg_relation_size(e.relid) END AS total_bytes,
+        e.actual_pages,
+        e.expected_pages::bigint AS expected_pages,
+        e.fillfactor,
+        e.stats_missing,
+        (c.bs * e.actual_pages)::bigint AS actual_bytes,
+        (c.bs * GREATEST(e.actual_pages - e.expected_pages, 0))::bigint AS bloat_bytes,
+        CASE WHEN e.actual_pages > 0
+             THEN round(100 * GREATEST(e.actual_pages - e.expected_pages, 0) / e.actual_pages, 2)
+             ELSE 0
+        END AS bloat_percent,
+        st.n_live_tup,
+        st.n_dead_tup,
+        CASE
+            WHEN st.n_live_tup + st.n_dead_tup > 0
+            THEN round(100.0 * st.n_dead_tup / (st.n_live_tup + st.n_dead_tup), 2)
+            ELSE 0
+        END AS dead_tuple_percent,
+        st.last_vacuum,
+        st.last_autovacuum,
+        st.last_analyze,
+        st.last_autoanalyze,
+        st.vacuum_count,
+        st.autovacuum_count,
+        st.analyze_count,
+        st.autoanalyze_count
+    FROM (SELECT * FROM heap_estimates UNION ALL SELECT * FROM index_estimates) e
+    JOIN pg_class tbl ON tbl.oid = e.table_relid
+    JOIN pg_namespace ns ON ns.oid = tbl.relnamespace
+    CROSS JOIN constants c
+    LEFT JOIN pg_stat_user_tables st ON st.relid = e.relid
+    ORDER BY bloat_bytes DESC, total_bytes DESC
+"""
+
+# Exact heap figures from pgstattuple_approx, which reads only pages the visibility map cannot vouch for
+PGSTATTUPLE_APPROX_SQL = """
+    SELECT c.oid AS relid, a.table_len, a.scanned_percent, a.dead_tuple_len, a.approx_free_space
+    FROM pg_class c
+    JOIN pg_namespace ns ON ns.oid = c.relnamespace
+    CROSS JOIN LATERAL {schema}.pgstattuple_approx(c.oid) a
+    WHERE c.relkind IN ('r', 'm')
+    AND ns.nspname NOT IN ('pg_catalog', 'information_schema') AND ns.nspname !~ '^pg_(toast|temp)'
+"""
 
 class PostgresClient:
     def __init__(self):
-        self.connection_pools = {}
+        self.pool_manager = PoolManager()
+        # connection_id -> {type oid: type info}; built-in OIDs are stable, user types are per database
+        self.type_cache: Dict[int, Dict[int, Dict[str, str]]] = {}
+        # query_id -> running statement and the pooled connection executing it
+        self.active_queries: Dict[str, Dict[str, Any]] = {}
+        self.active_lock = threading.Lock()
+        self.result_cache = ResultCache()
+        self.max_rows = DEFAULT_MAX_ROWS
+        self.max_bytes = DEFAULT_MAX_BYTES
 
     def get_connection_string(self, conn_data: Dict[str, Any]) -> str:
         """Build PostgreSQL connection string"""
         ssl_mode = 'require' if conn_data.get('ssl_enabled') else 'prefer'
-        return f"host={conn_data['host']} port={conn_data['port']} dbname={conn_data['database']} " \
-               f"user={conn_data['username']} password={conn_data['password']} sslmode={ssl_mode}"
+        conn_string = f"host={conn_data['host']} port={conn_data['port']} dbname={conn_data['database']} " \
+                      f"user={conn_data['username']} password={conn_data['password']} sslmode={ssl_mode}"
+
+        # Per-connection timeout defaults become session settings on every pooled connection
+        options = []
+        if conn_data.get('statement_timeout_ms'):
+            options.append(f"-c statement_timeout={int(conn_data['statement_timeout_ms'])}")
+        if conn_data.get('lock_timeout_ms'):
+            options.append(f"-c lock_timeout={int(conn_data['lock_timeout_ms'])}")
+        if options:
+            conn_string += f" options='{' '.join(options)}'"
+        return conn_string
 
     def test_connection(self, conn_data: Dict[str, Any]) -> Tuple[bool, str]:
         """Test PostgreSQL connection"""
@@ -26,53 +276,205 @@ class PostgresClient:
 
     def get_pool(self, connection_id: int, conn_data: Dict[str, Any]):
         """Get or create connection pool for a connection"""
-        if connection_id not in self.connection_pools:
-            conn_string = self.get_connection_string(conn_data)
-            self.connection_pools[connection_id] = pool.SimpleConnectionPool(
-                1, 10, conn_string
-            )
-        return self.connection_pools[connection_id]
+        conn_string = self.get_connection_string(conn_data)
+        return self.pool_manager.get_pool(
+            connection_id,
+            conn_string,
+            min_size=conn_data.get('pool_min_size') or 1,
+            max_size=conn_data.get('pool_max_size') or 10
+        )
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool utilization counters"""
+        return self.pool_manager.get_stats()
+
+    def register_query(self, query_id: Optional[str], connection_id: int, conn, query: str) -> str:
+        """Record a running statement so it can be listed and cancelled by its query id"""
+        query_id = query_id or uuid.uuid4().hex
+        with self.active_lock:
+            if query_id in self.active_queries:
+                raise ValueError(f'Query id {query_id} is already running')
+            self.active_queries[query_id] = {
+                'query_id': query_id,
+                'connection_id': connection_id,
+                'pid': conn.get_backend_pid(),
+                'conn': conn,
+                'query': query,
+                'started_at': time.time(),
+                'cancelled': False
+            }
+        return query_id
+
+    def unregister_query(self, query_id: str) -> Dict[str, Any]:
+        with self.active_lock:
+            return self.active_queries.pop(query_id, None) or {}
+
+    def get_active_queries(self, connection_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """List statements currently running through the pools"""
+        now = time.time()
+        with self.active_lock:
+            entries = list(self.active_queries.values())
+        return [
+            {
+                'query_id': entry['query_id'],
+                'connection_id': entry['connection_id'],
+                'pid': entry['pid'],
+                'query': entry['query'],
+                'started_at': entry['started_at'],
+                'duration': round(now - entry['started_at'], 3)
+            }
+            for entry in entries
+            if connection_id is None or entry['connection_id'] == connection_id
+        ]
+
+    def cancel_query(self, query_id: str, connection_id: Optional[int] = None) -> bool:
+        """Cancel a running statement; returns False if no such query is running"""
+        with self.active_lock:
+            entry = self.active_queries.get(query_id)
+            if not entry or (connection_id is not None and entry['connection_id'] != connection_id):
+                return False
+            entry['cancelled'] = True
+
+        try:
+            # Sends a cancel request on a separate socket, like pg_cancel_backend(pid)
+            entry['conn'].cancel()
+        except Exception:
+            # Fall back to cancelling from another pooled connection of the same database
+            conn_pool = self.pool_manager.pools.get(entry['connection_id'])
+            if conn_pool is None:
+                return False
+            conn = conn_pool.getconn()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT pg_cancel_backend(%s)", (entry['pid'],))
+                conn.commit()
+            finally:
+                conn_pool.putconn(conn)
+        return True
+
+    @staticmethod
+    def get_data_version(cursor) -> str:
+        """Token that changes whenever rows in the current database are written
 
-    def execute_query(self, conn_data: Dict[str, Any], query: str, limit: Optional[int] = None) -> Dict[str, Any]:
-        """Execute SQL query and return results"""
+        Built from the cumulative tuple counters in pg_stat_database. Other sessions publish
+        their counters after their transactions end, batched by PostgreSQL for up to ~10s,
+        so the cache TTL bounds staleness for writes made outside pgai.
+        """
+        cursor.execute("""
+            SELECT tup_inserted, tup_updated, tup_deleted, stats_reset
+            FROM pg_catalog.pg_stat_database
+            WHERE datname = current_database()
+        """)
+        return ':'.join(str(value) for value in cursor.fetchone() or ())
+
+    def execute_query(self, conn_data: Dict[str, Any], query: str, limit: Optional[int] = None,
+                      result_format: str = 'objects', query_id: Optional[str] = None,
+                      timeout_ms: Optional[int] = None, cache: bool = False,
+                      schema_version: Optional[str] = None, max_rows: Optional[int] = None,
+                      max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Execute SQL query and return results as row objects, row arrays or column arrays
+
+        Rows are fetched in batches until the row budget (the smaller of limit and max_rows)
+        or the byte budget is used up; the result is then marked truncated. SELECTs run on a
+        server-side cursor so PostgreSQL stops producing rows once the budget is hit.
+
+        With cache=True, plain SELECTs are answered from the result cache while the schema
+        version and the database's data version are unchanged; other statements bypass it.
+        """
         connection_id = conn_data['id']
         start_time = time.time()
+        entry = {}
+        cache_key = None
+        cache_status = 'bypass' if cache else None
+        registered = False
+
+        # Requests may tighten the configured budgets but not exceed them
+        max_rows = min(int(max_rows), self.max_rows) if max_rows else self.max_rows
+        if limit:
+            max_rows = min(int(limit), max_rows)
+        max_bytes = min(int(max_bytes), self.max_bytes) if max_bytes else self.max_bytes
 
         try:
             conn_pool = self.get_pool(connection_id, conn_data)
             conn = conn_pool.getconn()
 
             try:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-                # Apply limit if provided
-                if limit and 'limit' not in query.lower():
-                    query = f"{query.rstrip(';')} LIMIT {limit}"
+                cursor = conn.cursor()
+
+                if cache and is_plain_select(query):
+                    cache_key = (connection_id, normalize_sql(query), max_rows, max_bytes, result_format,
+                                 schema_version, self.get_data_version(cursor))
+                    cached = self.result_cache.get(cache_key)
+                    if cached is not None:
+                        return dict(cached, query_id=query_id, cache='hit',
+                                    execution_time=round(time.time() - start_time, 3))
+                    cache_status = 'miss'
+
+                query_id = self.register_query(query_id, connection_id, conn, query)
+                registered = True
+
+                # Per-query timeout overrides the connection default for this transaction only
+                if timeout_ms is not None:
+                    cursor.execute("SELECT set_config('statement_timeout', %s, true)", (str(int(timeout_ms)),))
+
+                if is_select(query):
+                    cursor = conn.cursor(name=f"pgai_query_{uuid.uuid4().hex}")
+                    cursor.execute(query.strip().rstrip(';'))
+                    rows, truncated = self.fetch_within_budget(cursor, max_rows, max_bytes)
+                else:
+                    cursor.execute(query)
+                    rows, truncated = self.fetch_within_budget(cursor, max_rows, max_bytes) \
+                        if cursor.description else ([], None)
 
-                cursor.execute(query)
+                entry = self.unregister_query(query_id)
+                registered = False
 
                 # Check if query returns rows (SELECT, etc.)
                 if cursor.description:
                     columns = [desc[0] for desc in cursor.description]
-                    rows = cursor.fetchall()
-                    rows_data = [dict(row) for row in rows]
+                    column_types = self.describe_columns(connection_id, conn, cursor.description)
+                    if cursor.name:
+                        cursor.close()
+                    # RETURNING, setval() and writing functions return rows too; commit so putconn's
+                    # rollback cannot discard them, which also ends a read-only SELECT's transaction
+                    conn.commit()
+                    if not is_plain_select(query):
+                        self.result_cache.invalidate(connection_id)
 
                     execution_time = time.time() - start_time
 
-                    return {
+                    result = {
                         'success': True,
+                        'query_id': query_id,
                         'columns': columns,
-                        'rows': rows_data,
-                        'row_count': len(rows_data),
-                        'execution_time': round(execution_time, 3)
+                        'column_types': column_types,
+                        'row_count': len(rows),
+                        'execution_time': round(execution_time, 3),
+                        'format': result_format,
+                        'truncated': truncated is not None
                     }
+                    if truncated:
+                        result['truncated_reason'] = truncated
+                        if not cursor.name:
+                            # Only the returned rows were cut; the statement itself ran to completion
+                            result['message'] = f'{cursor.rowcount} rows affected; showing the first {len(rows)} returned rows'
+                    result.update(self.encode_rows(columns, rows, result_format))
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, result)
+                    if cache_status:
+                        result = dict(result, cache=cache_status)
+                    return result
                 else:
                     # For INSERT, UPDATE, DELETE, etc.
                     conn.commit()
                     execution_time = time.time() - start_time
 
+                    # Our own writes invalidate right away instead of waiting for the stats counters
+                    self.result_cache.invalidate(connection_id)
+
                     return {
                         'success': True,
+                        'query_id': query_id,
                         'columns': [],
                         'rows': [],
                         'row_count': cursor.rowcount,
@@ -80,15 +482,514 @@ class PostgresClient:
                         'message': f'{cursor.rowcount} rows affected'
                     }
             finally:
+                if registered:
+                    entry = self.unregister_query(query_id)
                 conn_pool.putconn(conn)
 
         except Exception as e:
             execution_time = time.time() - start_time
-            return {
+            result = {
                 'success': False,
+                'query_id': query_id,
                 'error': str(e),
                 'execution_time': round(execution_time, 3)
             }
+            if isinstance(e, psycopg2.errors.QueryCanceled) and entry.get('cancelled'):
+                result['cancelled'] = True
+                result['error'] = 'Query cancelled'
+            return result
+
+    @staticmethod
+    def estimate_row_bytes(row: tuple) -> int:
+        """Rough in-memory/serialized size of a fetched row, for enforcing byte budgets"""
+        size = 0
+        for value in row:
+            if value is None:
+                size += 4
+            elif isinstance(value, (str, bytes, memoryview)):
+                size += len(value) + 2
+            elif isinstance(value, (dict, list)):
+                size += len(json.dumps(value, default=str))
+            else:
+                size += 16
+        return size
+
+    def fetch_within_budget(self, cursor, max_rows: int, max_bytes: int) -> Tuple[List[tuple], Optional[str]]:
+        """Fetch rows in batches until the result ends or a budget is exhausted
+
+        Returns the rows and None, or 'max_rows'/'max_bytes' when more rows remained unfetched.
+        """
+        rows: List[tuple] = []
+        used_bytes = 0
+        while True:
+            batch = cursor.fetchmany(min(FETCH_BATCH_ROWS, max_rows - len(rows) + 1))
+            for row in batch:
+                if len(rows) >= max_rows:
+                    return rows, 'max_rows'
+                used_bytes += self.estimate_row_bytes(row)
+                if used_bytes > max_bytes:
+                    return rows, 'max_bytes'
+                rows.append(row)
+            if not batch:
+                return rows, None
+
+    @staticmethod
+    def encode_rows(columns: List[str], rows: List[tuple], result_format: str) -> Dict[str, Any]:
+        """Shape fetched tuples for the response: dict per row, array per row, or array per column"""
+        if result_format == 'arrays':
+            return {'rows': rows}
+        if result_format == 'columnar':
+            return {'column_data': [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]}
+        return {'rows': [dict(zip(columns, row)) for row in rows]}
+
+    def describe_columns(self, connection_id: int, conn, description) -> List[Dict[str, Any]]:
+        """Resolve cursor.description type OIDs to PostgreSQL type names and render categories"""
+        types = self.type_cache.setdefault(connection_id, {})
+        missing = list({desc.type_code for desc in description if desc.type_code not in types})
+
+        if missing:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT oid, format_type(oid, NULL), typname, typcategory
+                FROM pg_catalog.pg_type
+                WHERE oid = ANY(%s::oid[])
+            """, (missing,))
+            for oid, type_name, typname, category in cursor.fetchall():
+                if typname in ('json', 'jsonb'):
+                    render = 'json'
+                elif typname == 'bytea':
+                    render = 'binary'
+                else:
+                    render = TYPE_CATEGORIES.get(category, 'other')
+                types[oid] = {'type': type_name, 'category': render}
+
+        return [
+            {
+                'name': desc.name,
+                'type_oid': desc.type_code,
+                'type': types.get(desc.type_code, {}).get('type', 'unknown'),
+                'category': types.get(desc.type_code, {}).get('category', 'other')
+            }
+            for desc in description
+        ]
+
+    @staticmethod
+    def encode_arrow(result: Dict[str, Any]) -> bytes:
+        """Encode an 'arrays' query result as an Apache Arrow IPC stream"""
+        if pa is None:
+            raise RuntimeError('pyarrow is not installed')
+
+        columns = result['columns']
+        column_values = [list(values) for values in zip(*result['rows'])] if result['rows'] else [[] for _ in columns]
+
+        fields = []
+        arrays = []
+        for name, values, column_type in zip(columns, column_values, result['column_types']):
+            try:
+                array = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                # Values Arrow cannot infer a single type for (mixed JSON, ranges, ...) are sent as text
+                array = pa.array([
+                    None if v is None else json.dumps(v, default=str) if isinstance(v, (dict, list)) else str(v)
+                    for v in values
+                ], type=pa.string())
+            fields.append(pa.field(name, array.type, metadata={'pg_type': column_type['type']}))
+            arrays.append(array)
+
+        table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+
+    def stream_query(self, conn_data: Dict[str, Any], query: str, batch_size: int = 1000,
+                     query_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Execute a query on a server-side named cursor and yield columns, row batches and a summary"""
+        connection_id = conn_data['id']
+        start_time = time.time()
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+        except Exception as e:
+            yield {'type': 'error', 'error': str(e), 'execution_time': round(time.time() - start_time, 3)}
+            return
+
+        cursor = None
+        registered = False
+        try:
+            query_id = self.register_query(query_id, connection_id, conn, query)
+            registered = True
+            cursor = conn.cursor(name=f"pgai_stream_{uuid.uuid4().hex}")
+            cursor.itersize = batch_size
+            cursor.execute(query.strip().rstrip(';'))
+
+            # A named cursor only has a description after the first FETCH
+            rows = cursor.fetchmany(batch_size)
+            columns = [desc[0] for desc in cursor.description]
+            yield {'type': 'columns', 'query_id': query_id, 'columns': columns}
+
+            row_count = 0
+            while rows:
+                row_count += len(rows)
+                yield {'type': 'rows', 'rows': rows}
+                rows = cursor.fetchmany(batch_size)
+
+            yield {
+                'type': 'done',
+                'row_count': row_count,
+                'execution_time': round(time.time() - start_time, 3)
+            }
+        except Exception as e:
+            entry = self.unregister_query(query_id) if registered else {}
+            registered = False
+            event = {'type': 'error', 'error': str(e), 'execution_time': round(time.time() - start_time, 3)}
+            if isinstance(e, psycopg2.errors.QueryCanceled) and entry.get('cancelled'):
+                event.update({'error': 'Query cancelled', 'cancelled': True})
+            yield event
+        finally:
+            if registered:
+                self.unregister_query(query_id)
+            try:
+                if cursor is not None:
+                    cursor.close()
+                # End the read transaction that owns the portal before handing the connection back
+                conn.rollback()
+            except Exception:
+                pass
+            conn_pool.putconn(conn)
+
+    def execute_script(self, conn_data: Dict[str, Any], script: str, mode: str = 'transaction',
+                       stop_on_error: bool = True, query_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Run a multi-statement script statement by statement on one pinned connection
+
+        In 'transaction' mode every statement runs in a single transaction that is rolled back
+        at the first error; in 'autocommit' mode each statement commits on its own and later
+        statements still run after an error unless stop_on_error is set. Yields a 'start' event,
+        one 'statement' event per statement with its timing, and a closing 'done' event.
+        """
+        connection_id = conn_data['id']
+        start_time = time.time()
+        statements = split_statements(script)
+        autocommit = mode == 'autocommit'
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+        except Exception as e:
+            yield {'type': 'error', 'error': str(e), 'execution_time': round(time.time() - start_time, 3)}
+            return
+
+        timings = []
+        failed = False
+        committed = False
+        query_id = query_id or uuid.uuid4().hex
+        try:
+            conn.autocommit = autocommit
+            self.register_query(query_id, connection_id, conn, script)
+            yield {'type': 'start', 'query_id': query_id, 'statement_count': len(statements), 'mode': mode}
+
+            cursor = conn.cursor()
+            for index, statement in enumerate(statements):
+                with self.active_lock:
+                    if query_id in self.active_queries:
+                        self.active_queries[query_id]['query'] = statement['sql']
+                statement_start = time.time()
+                event = {'type': 'statement', 'index': index, 'line': statement['line'], 'statement': statement['sql']}
+                try:
+                    cursor.execute(statement['sql'])
+                    event['success'] = True
+                    event['row_count'] = cursor.rowcount
+                    event['status'] = cursor.statusmessage
+                    if cursor.description:
+                        event['columns'] = [desc[0] for desc in cursor.description]
+                        event['rows'] = cursor.fetchmany(SCRIPT_PREVIEW_ROWS)
+                except psycopg2.Error as e:
+                    failed = True
+                    event['success'] = False
+                    event['error'] = str(e).strip()
+                    with self.active_lock:
+                        cancelled = self.active_queries.get(query_id, {}).get('cancelled')
+                    if cancelled:
+                        event['cancelled'] = True
+                event['execution_time'] = round(time.time() - statement_start, 3)
+                timings.append({key: event.get(key) for key in ('index', 'line', 'success', 'row_count', 'execution_time', 'error')})
+                yield event
+
+                if failed and (not autocommit or stop_on_error or event.get('cancelled')):
+                    break
+
+            if not autocommit:
+                if failed:
+                    conn.rollback()
+                else:
+                    conn.commit()
+                    committed = True
+            self.result_cache.invalidate(connection_id)
+
+            yield {
+                'type': 'done',
+                'success': not failed,
+                'committed': committed if not autocommit else None,
+                'statement_count': len(statements),
+                'executed': len(timings),
+                'execution_time': round(time.time() - start_time, 3),
+                'statements': timings
+            }
+        finally:
+            self.unregister_query(query_id)
+            try:
+                if not autocommit and not committed:
+                    conn.rollback()
+                conn.autocommit = False
+            except Exception:
+                pass
+            conn_pool.putconn(conn)
+
+    def export_query(self, conn_data: Dict[str, Any], query: str, export_format: str = 'csv',
+                     table_name: Optional[str] = None, batch_size: int = 5000,
+                     query_id: Optional[str] = None) -> Iterator[bytes]:
+        """Stream a query result as CSV (via COPY), JSON Lines or INSERT statements, in bounded chunks"""
+        connection_id = conn_data['id']
+        query = query.strip().rstrip(';')
+        conn_pool = self.get_pool(connection_id, conn_data)
+        conn = conn_pool.getconn()
+        close_conn = False
+
+        try:
+            query_id = self.register_query(query_id, connection_id, conn, query)
+            if export_format == 'csv':
+                chunks = self._export_csv(conn, query)
+            elif export_format == 'jsonl':
+                chunks = self._export_jsonl(conn, query, batch_size)
+            elif export_format == 'sql':
+                chunks = self._export_inserts(conn, query, table_name or 'export', batch_size)
+            else:
+                raise ValueError(f'Unsupported export format: {export_format}')
+            yield from chunks
+        except BaseException:
+            # An abandoned COPY may leave the connection mid-protocol; don't return it to the pool
+            close_conn = export_format == 'csv'
+            raise
+        finally:
+            self.unregister_query(query_id)
+            conn_pool.putconn(conn, close=close_conn)
+
+    def _export_csv(self, conn, query: str) -> Iterator[bytes]:
+        """Run COPY (query) TO STDOUT on a producer thread and yield its output through a bounded queue"""
+        chunks: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+            raise IOError('export aborted')
+
+        class ChunkWriter:
+            """File-like target for copy_expert that batches COPY rows into chunks"""
+            def __init__(self):
+                self.buffer = bytearray()
+
+            def write(self, data):
+                self.buffer += data
+                if len(self.buffer) >= EXPORT_CHUNK_BYTES:
+                    self.flush()
+
+            def flush(self):
+                if self.buffer:
+                    put(bytes(self.buffer))
+                    self.buffer = bytearray()
+
+        def produce():
+            try:
+                writer = ChunkWriter()
+                cursor = conn.cursor()
+                cursor.copy_expert(
+                    sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.SQL(query)),
+                    writer
+                )
+                writer.flush()
+                put(done)
+            except Exception as e:
+                if not stop.is_set():
+                    put(e)
+
+        producer = threading.Thread(target=produce, name='pgai-copy-export', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if producer.is_alive():
+                stop.set()
+                try:
+                    conn.cancel()
+                except Exception:
+                    pass
+                producer.join(timeout=10)
+
+    def _export_jsonl(self, conn, query: str, batch_size: int) -> Iterator[bytes]:
+        """Yield one JSON object per row, serialized by PostgreSQL with row_to_json"""
+        cursor = conn.cursor(name=f"pgai_export_{uuid.uuid4().hex}")
+        cursor.itersize = batch_size
+        cursor.execute(sql.SQL("SELECT row_to_json(q)::text FROM ({}) q").format(sql.SQL(query)))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield ''.join(row[0] + '\n' for row in rows).encode()
+        cursor.close()
+
+    def _export_inserts(self, conn, query: str, table_name: str, batch_size: int) -> Iterator[bytes]:
+        """Yield multi-row INSERT statements for the query's rows, quoted by psycopg2"""
+        cursor = conn.cursor(name=f"pgai_export_{uuid.uuid4().hex}")
+        cursor.itersize = batch_size
+        # Keep JSON values as their text so they are re-quoted as literals rather than adapted as dicts
+        register_default_json(cursor, loads=lambda value: value)
+        register_default_jsonb(cursor, loads=lambda value: value)
+        cursor.execute(query)
+
+        quoter = conn.cursor()
+        schema, name = self.split_table_name(table_name)
+        target = sql.Identifier(schema, name) if '.' in table_name else sql.Identifier(name)
+        rows = cursor.fetchmany(EXPORT_INSERT_BATCH)
+        header = None
+        while rows:
+            if header is None:
+                header = sql.SQL("INSERT INTO {} ({}) VALUES\n").format(
+                    target, sql.SQL(', ').join(sql.Identifier(desc[0]) for desc in cursor.description)
+                ).as_string(conn).encode()
+                placeholders = '(' + ', '.join(['%s'] * len(cursor.description)) + ')'
+            values = b',\n'.join(b'  ' + quoter.mogrify(placeholders, row) for row in rows)
+            yield header + values + b';\n'
+            rows = cursor.fetchmany(EXPORT_INSERT_BATCH)
+        cursor.close()
+
+    def get_column_types(self, conn, table_name: str) -> Dict[str, str]:
+        """Column name -> type name (without modifiers) for an existing table"""
+        schema, name = self.split_table_name(table_name)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT a.attname, format_type(a.atttypid, NULL)
+            FROM pg_catalog.pg_attribute a
+            JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relname = %s AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum
+        """, (schema, name))
+        return dict(cursor.fetchall())
+
+    def import_rows(self, conn_data: Dict[str, Any], table_name: str, columns: List[str], types: List[str],
+                    rows: Iterator[List[Optional[str]]], create_table: bool = False,
+                    validate_row=None, on_progress=None, on_reject=None,
+                    query_id: Optional[str] = None) -> Dict[str, Any]:
+        """Load rows into a table with COPY FROM STDIN in batches, all in one transaction
+
+        Rows failing validate_row(row, types) are passed to on_reject(row, error) without being
+        sent. A batch PostgreSQL refuses is split in halves under savepoints until the offending
+        rows are isolated and rejected, so one bad row does not fail the import.
+        """
+        connection_id = conn_data['id']
+        start_time = time.time()
+        conn_pool = self.get_pool(connection_id, conn_data)
+        conn = conn_pool.getconn()
+        counts = {'imported': 0, 'rejected': 0, 'read': 0}
+        registered = False
+
+        try:
+            query_id = self.register_query(query_id, connection_id, conn, f'COPY {table_name} FROM STDIN')
+            registered = True
+            cursor = conn.cursor()
+            schema, name = self.split_table_name(table_name)
+            target = sql.Identifier(schema, name)
+
+            if create_table:
+                types = check_column_types(types)
+                cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(
+                    target,
+                    sql.SQL(', ').join(
+                        sql.SQL("{} {}").format(sql.Identifier(column), sql.SQL(column_type))
+                        for column, column_type in zip(columns, types)
+                    )
+                ))
+            else:
+                existing = self.get_column_types(conn, table_name)
+                if not existing:
+                    raise ValueError(f'Table {table_name} does not exist')
+                missing = [column for column in columns if column not in existing]
+                if missing:
+                    raise ValueError(f"Columns not in {table_name}: {', '.join(missing)}")
+                # Validate against the table's real types, not the inferred ones
+                types = [re.sub(r'\(.*\)', '', existing[column]) for column in columns]
+
+            copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+                target, sql.SQL(', ').join(sql.Identifier(column) for column in columns)
+            ).as_string(conn)
+
+            def reject(row, error):
+                counts['rejected'] += 1
+                if on_reject:
+                    on_reject(row, error)
+
+            def copy_batch(batch):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in batch:
+                    # None is written as an unquoted empty field, which COPY reads as NULL
+                    writer.writerow(['' if value is None else value for value in row])
+                buffer.seek(0)
+                cursor.execute("SAVEPOINT pgai_import")
+                try:
+                    cursor.copy_expert(copy_sql, buffer)
+                    cursor.execute("RELEASE SAVEPOINT pgai_import")
+                    counts['imported'] += len(batch)
+                except psycopg2.errors.QueryCanceled:
+                    raise
+                except psycopg2.DatabaseError as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT pgai_import")
+                    if len(batch) == 1:
+                        reject(batch[0], str(e).strip().splitlines()[0])
+                    else:
+                        copy_batch(batch[:len(batch) // 2])
+                        copy_batch(batch[len(batch) // 2:])
+
+            batch = []
+            for row in rows:
+                counts['read'] += 1
+                if validate_row:
+                    checked, error = validate_row(row, types)
+                    if error:
+                        reject(row, error)
+                        continue
+                    row = checked
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_ROWS:
+                    copy_batch(batch)
+                    batch = []
+                    if on_progress:
+                        on_progress(dict(counts))
+            if batch:
+                copy_batch(batch)
+
+            conn.commit()
+            counts['execution_time'] = round(time.time() - start_time, 3)
+            if on_progress:
+                on_progress(dict(counts))
+            return counts
+        finally:
+            if registered:
+                self.unregister_query(query_id)
+            conn_pool.putconn(conn)
 
     def get_tables(self, conn_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get all tables in database"""
@@ -213,32 +1114,333 @@ class PostgresClient:
 
         return ddl
 
+    @staticmethod
+    def split_table_name(table_name: str) -> Tuple[str, str]:
+        """Split 'schema.table' into its parts, defaulting to the public schema"""
+        if '.' in table_name:
+            schema, name = table_name.split('.', 1)
+            return schema, name
+        return 'public', table_name
+
+    @staticmethod
+    def encode_cursor_token(state: Dict[str, Any]) -> str:
+        """Serialize keyset state into an opaque continuation token"""
+        payload = json.dumps(state, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor_token(token: str) -> Dict[str, Any]:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+    def browse_table(self, conn_data: Dict[str, Any], table_name: str, page_size: int = 100,
+                     sort: Optional[str] = None, direction: str = 'asc',
+                     filters: Optional[List[Dict[str, Any]]] = None,
+                     cursor_token: Optional[str] = None) -> Dict[str, Any]:
+        """Page through a table by keyset (sort column, then primary key or ctid) instead of OFFSET"""
+        connection_id = conn_data['id']
+        start_time = time.time()
+        direction = 'desc' if str(direction).lower() == 'desc' else 'asc'
+        filters = filters or []
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor()
+                schema, name = self.split_table_name(table_name)
+                table = sql.Identifier(schema, name)
+
+                # Columns and primary key positions of the table
+                cursor.execute("""
+                    SELECT
+                        a.attname,
+                        (
+                            SELECT array_position(i.indkey::int2[], a.attnum)
+                            FROM pg_catalog.pg_index i
+                            WHERE i.indrelid = a.attrelid AND i.indisprimary
+                        ) as pk_position
+                    FROM pg_catalog.pg_attribute a
+                    WHERE a.attrelid = to_regclass(%s)
+                    AND a.attnum > 0
+                    AND NOT a.attisdropped
+                    ORDER BY a.attnum
+                """, (table.as_string(conn),))
+                table_columns = cursor.fetchall()
+                if not table_columns:
+                    raise ValueError(f'Table not found: {table_name}')
+
+                column_names = [c[0] for c in table_columns]
+                primary_key = [c[0] for c in sorted((c for c in table_columns if c[1] is not None), key=lambda c: c[1])]
+
+                if sort and sort not in column_names:
+                    raise ValueError(f'Unknown sort column: {sort}')
+
+                # Key columns: optional sort column, then a unique tiebreaker
+                unique_key = primary_key or ['ctid']
+                key_columns = ([sort] if sort and sort not in unique_key else []) + unique_key
+                nullable_sort = bool(sort) and sort not in unique_key
+
+                select_list = [sql.SQL('t.*')]
+                if not primary_key:
+                    select_list.append(sql.SQL('t.ctid AS __pgai_ctid'))
+
+                conditions = []
+                params: List[Any] = []
+
+                # Filters are pushed into SQL against validated column names
+                for f in filters:
+                    column = f.get('column')
+                    op = f.get('op', '=')
+                    if column not in column_names:
+                        raise ValueError(f'Unknown filter column: {column}')
+                    if op not in BROWSE_FILTER_OPERATORS:
+                        raise ValueError(f'Unsupported filter operator: {op}')
+                    conditions.append(sql.SQL(BROWSE_FILTER_OPERATORS[op]).format(col=sql.Identifier('t', column)))
+                    if op not in ('is_null', 'not_null'):
+                        params.append(list(f.get('value') or []) if op == 'in' else f.get('value'))
+
+                filter_signature = hashlib.md5(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+                # Continue after the last row of the previous page
+                if cursor_token:
+                    state = self.decode_cursor_token(cursor_token)
+                    if state.get('k') != key_columns or state.get('d') != direction or state.get('f') != filter_signature:
+                        raise ValueError('Continuation token does not match the current sort or filters')
+                    conditions.append(self._keyset_condition(key_columns, state['v'], direction, nullable_sort))
+                    params.extend(self._keyset_params(state['v'], nullable_sort))
+
+                order = sql.SQL(' DESC NULLS LAST' if direction == 'desc' else ' ASC NULLS LAST')
+                query = sql.SQL("SELECT {select} FROM {table} t{where} ORDER BY {order} LIMIT %s").format(
+                    select=sql.SQL(', ').join(select_list),
+                    table=table,
+                    where=sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions) if conditions else sql.SQL(''),
+                    order=sql.SQL(', ').join(sql.Identifier('t', k) + order for k in key_columns)
+                )
+                params.append(page_size + 1)
+                cursor.execute(query, params)
+
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+                has_more = len(rows) > page_size
+                rows = rows[:page_size]
+
+                next_cursor = None
+                if has_more:
+                    last = dict(zip(columns, rows[-1]))
+                    last_values = [last['__pgai_ctid'] if k == 'ctid' else last[k] for k in key_columns]
+                    next_cursor = self.encode_cursor_token({
+                        'k': key_columns,
+                        'd': direction,
+                        'f': filter_signature,
+                        'v': last_values
+                    })
+
+                visible = [i for i, c in enumerate(columns) if c != '__pgai_ctid']
+                description = [cursor.description[i] for i in visible]
+                visible_columns = [columns[i] for i in visible]
+
+                return {
+                    'success': True,
+                    'columns': visible_columns,
+                    'column_types': self.describe_columns(connection_id, conn, description),
+                    'rows': [dict(zip(visible_columns, (row[i] for i in visible))) for row in rows],
+                    'row_count': len(rows),
+                    'key_columns': key_columns,
+                    'has_more': has_more,
+                    'next_cursor': next_cursor,
+                    'execution_time': round(time.time() - start_time, 3)
+                }
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'execution_time': round(time.time() - start_time, 3)
+            }
+
+    @staticmethod
+    def _keyset_condition(key_columns: List[str], last_values: List[Any], direction: str, nullable_sort: bool):
+        """Build the WHERE clause selecting rows strictly after last_values in key order"""
+        op = sql.SQL('<' if direction == 'desc' else '>')
+
+        def row_compare(columns):
+            return sql.SQL('({}) {} ({})').format(
+                sql.SQL(', ').join(sql.Identifier('t', c) for c in columns),
+                op,
+                sql.SQL(', ').join(sql.Placeholder() * len(columns))
+            )
+
+        if not nullable_sort:
+            return row_compare(key_columns)
+
+        # The sort column can be NULL, and NULLs sort last: compare it separately from the unique key
+        sort_col = sql.Identifier('t', key_columns[0])
+        if last_values[0] is None:
+            return sql.SQL('({} IS NULL AND {})').format(sort_col, row_compare(key_columns[1:]))
+        return sql.SQL('({sort} {op} %s OR ({sort} = %s AND {rest}) OR {sort} IS NULL)').format(
+            sort=sort_col, op=op, rest=row_compare(key_columns[1:])
+        )
+
+    @staticmethod
+    def _keyset_params(last_values: List[Any], nullable_sort: bool) -> List[Any]:
+        if not nullable_sort:
+            return list(last_values)
+        if last_values[0] is None:
+            return list(last_values[1:])
+        return [last_values[0], last_values[0]] + list(last_values[1:])
+
     def get_table_stats(self, conn_data: Dict[str, Any], table_name: str) -> Dict[str, Any]:
-        """Get statistics for a table"""
-        query = f"""
-            SELECT
-                COUNT(*) as row_count
-            FROM {table_name}
-        """
-        result = self.execute_query(conn_data, query)
+        """Get estimated row count and size breakdown for a table without scanning it"""
+        result = self.get_table_size_stats(conn_data, table_name)
+        tables = result.get('tables', [])
 
-        size_query = f"""
-            SELECT pg_size_pretty(pg_total_relation_size('{table_name}'::regclass)) as size
-        """
-        size_result = self.execute_query(conn_data, size_query)
+        if not tables:
+            return {
+                'row_count': 0,
+                'row_count_estimated': True,
+                'size': 'Unknown',
+                'error': result.get('error')
+            }
 
-        return {
-            'row_count': result['rows'][0]['row_count'] if result.get('rows') else 0,
-            'size': size_result['rows'][0]['size'] if size_result.get('rows') else 'Unknown'
-        }
+        return tables[0]
+
+    def get_table_size_stats(self, conn_data: Dict[str, Any], table_name: Optional[str] = None) -> Dict[str, Any]:
+        """Get planner row estimates and heap/TOAST/index sizes for one table or every table in one query"""
+        connection_id = conn_data['id']
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                relation = sql.Identifier(*self.split_table_name(table_name)).as_string(conn) if table_name else None
+
+                # reltuples/relpages is scaled to the current number of pages, as the planner does;
+                # reltuples is -1 for tables that have never been vacuumed or analyzed (PG 14+)
+                cursor.execute("""
+                    SELECT
+                        n.nspname as schema,
+                        c.relname as name,
+                        COALESCE(
+                            CASE
+                                WHEN c.reltuples < 0 THEN NULL
+                                WHEN c.relpages > 0 THEN round(
+                                    c.reltuples / c.relpages
+                                    * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+                                )
+                                ELSE c.reltuples
+                            END,
+                            s.n_live_tup,
+                            0
+                        )::bigint as row_count,
+                        true as row_count_estimated,
+                        c.relpages,
+                        pg_size_pretty(pg_total_relation_size(c.oid)) as size,
+                        pg_total_relation_size(c.oid) as total_bytes,
+                        pg_relation_size(c.oid) as heap_bytes,
+                        COALESCE(pg_total_relation_size(NULLIF(c.reltoastrelid, 0)), 0) as toast_bytes,
+                        pg_indexes_size(c.oid) as index_bytes,
+                        GREATEST(s.last_analyze, s.last_autoanalyze) as last_analyzed
+                    FROM pg_catalog.pg_class c
+                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                    LEFT JOIN pg_catalog.pg_stat_user_tables s ON s.relid = c.oid
+                    WHERE c.relkind IN ('r', 'p', 'm')
+                    AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+                    AND n.nspname NOT LIKE 'pg_toast%%'
+                    AND (%s::text IS NULL OR c.oid = to_regclass(%s))
+                    ORDER BY pg_total_relation_size(c.oid) DESC
+                """, (relation, relation))
+
+                return {
+                    'success': True,
+                    'tables': [dict(t) for t in cursor.fetchall()]
+                }
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'tables': []
+            }
 
-    def get_autocomplete_data(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
+    def count_table_rows(self, conn_data: Dict[str, Any], table_name: str, sample_percent: Optional[float] = None,
+                         timeout_seconds: float = 60, query_id: Optional[str] = None) -> Dict[str, Any]:
+        """Count rows exactly, or extrapolate from a TABLESAMPLE SYSTEM sample, under a statement timeout"""
+        connection_id = conn_data['id']
+        start_time = time.time()
+        registered = False
+        entry = {}
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                table = sql.Identifier(*self.split_table_name(table_name))
+                query_id = self.register_query(query_id, connection_id, conn, f'count rows of {table_name}')
+                registered = True
+                cursor = conn.cursor()
+
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", (f"{int(timeout_seconds * 1000)}ms",))
+
+                if sample_percent:
+                    cursor.execute(
+                        sql.SQL("SELECT round(count(*) * 100.0 / %s)::bigint FROM {} TABLESAMPLE SYSTEM (%s)").format(table),
+                        (sample_percent, sample_percent)
+                    )
+                else:
+                    cursor.execute(sql.SQL("SELECT count(*) FROM {}").format(table))
+
+                return {
+                    'success': True,
+                    'query_id': query_id,
+                    'row_count': cursor.fetchone()[0],
+                    'row_count_estimated': bool(sample_percent),
+                    'sample_percent': sample_percent,
+                    'execution_time': round(time.time() - start_time, 3)
+                }
+
+            finally:
+                if registered:
+                    entry = self.unregister_query(query_id)
+                conn_pool.putconn(conn)
+
+        except psycopg2.errors.QueryCanceled:
+            return {
+                'success': False,
+                'query_id': query_id,
+                'cancelled': True,
+                'error': 'Count cancelled' if entry.get('cancelled') else f'Count cancelled after {timeout_seconds}s',
+                'execution_time': round(time.time() - start_time, 3)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'query_id': query_id,
+                'error': str(e),
+                'execution_time': round(time.time() - start_time, 3)
+            }
+
+    def get_autocomplete_data(self, conn_data: Dict[str, Any], catalog: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Get autocomplete data (tables, columns, keywords)"""
-        tables = self.get_tables(conn_data)
+        if catalog is None:
+            catalog = self._load_catalog(conn_data)
 
         autocomplete_data = {
-            'tables': [t['name'] for t in tables],
-            'columns': {},
+            'tables': [self.catalog_key(t['schema'], t['name']) for t in catalog['tables']],
+            'columns': {
+                table_key: [c['name'] for c in columns]
+                for table_key, columns in catalog['columns'].items()
+            },
             'keywords': [
                 'SELECT', 'FROM', 'WHERE', 'INSERT', 'UPDATE', 'DELETE',
                 'JOIN', 'LEFT JOIN', 'RIGHT JOIN', 'INNER JOIN', 'OUTER JOIN',
@@ -248,15 +1450,10 @@ class PostgresClient:
             ]
         }
 
-        # Get columns for each table
-        for table in tables:
-            columns = self.get_table_columns(conn_data, table['name'])
-            autocomplete_data['columns'][table['name']] = [c['name'] for c in columns]
-
         return autocomplete_data
 
     def execute_explain_analyze(self, conn_data: Dict[str, Any], query: str) -> Dict[str, Any]:
-        """Execute EXPLAIN ANALYZE on a query and return the plan"""
+        """Run EXPLAIN ANALYZE once and return the JSON plan, its parsed model and a text rendering"""
         connection_id = conn_data['id']
 
         try:
@@ -264,34 +1461,28 @@ class PostgresClient:
             conn = conn_pool.getconn()
 
             try:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-                # Wrap query with EXPLAIN ANALYZE
-                explain_query = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"
-                cursor.execute(explain_query)
-
-                result = cursor.fetchall()
-
-                # Extract the JSON plan
-                if result and len(result) > 0:
-                    plan = result[0].get('QUERY PLAN', [])
-
-                    # Also get text format for AI analysis
-                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}")
-                    text_result = cursor.fetchall()
-                    text_plan = '\n'.join([row.get('QUERY PLAN', '') for row in text_result])
+                cursor = conn.cursor()
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+                result = cursor.fetchone()
+                cursor.close()
+                # ANALYZE really executes the statement; never keep what DML changed
+                conn.rollback()
 
-                    return {
-                        'success': True,
-                        'plan_json': plan,
-                        'plan_text': text_plan
-                    }
-                else:
+                if not result or not result[0]:
                     return {
                         'success': False,
                         'error': 'No execution plan returned'
                     }
 
+                plan_json = result[0] if not isinstance(result[0], str) else json.loads(result[0])
+                plan = Plan(plan_json)
+                return {
+                    'success': True,
+                    'plan_json': plan_json,
+                    'plan': plan.to_dict(),
+                    'plan_text': plan.render_text()
+                }
+
             finally:
                 conn_pool.putconn(conn)
 
@@ -301,17 +1492,273 @@ class PostgresClient:
                 'error': str(e)
             }
 
-    def get_all_indexes(self, conn_data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    def explain_plan(self, conn_data: Dict[str, Any], query: str) -> Any:
+        """Plan a query without running it and return EXPLAIN's JSON document"""
+        conn_pool = self.get_pool(conn_data['id'], conn_data)
+        conn = conn_pool.getconn()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+            result = cursor.fetchone()[0]
+            cursor.close()
+            return json.loads(result) if isinstance(result, str) else result
+        finally:
+            conn_pool.putconn(conn)
+
+    def get_all_indexes(self, conn_data: Dict[str, Any], catalog: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict[str, Any]]]:
         """Get all indexes for all tables"""
-        tables = self.get_tables(conn_data)
-        all_indexes = {}
+        if catalog is None:
+            catalog = self._load_catalog(conn_data)
+        return catalog['indexes']
+
+    @staticmethod
+    def catalog_key(schema: str, name: str) -> str:
+        """Key a table by bare name in public and by schema-qualified name elsewhere"""
+        return name if schema in (None, 'public') else f"{schema}.{name}"
+
+    def _load_catalog(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.get_catalog(conn_data)
+        if not result.get('success'):
+            raise Exception(result.get('error', 'Failed to load catalog'))
+        return result['catalog']
+
+    def get_catalog(self, conn_data: Dict[str, Any], relation_oids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Load tables, columns, primary keys, indexes and foreign keys from pg_catalog (all tables, or only relation_oids)"""
+        connection_id = conn_data['id']
 
-        for table in tables:
-            table_name = table['name']
-            indexes = self.get_table_indexes(conn_data, table_name)
-            all_indexes[table_name] = indexes
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+                cursor.execute("""
+                    SELECT
+                        c.oid,
+                        n.nspname as schema,
+                        c.relname as name,
+                        'table' as type
+                    FROM pg_catalog.pg_class c
+                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                    WHERE c.relkind IN ('r', 'p')
+                    AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+                    AND n.nspname NOT LIKE 'pg_toast%%'
+                    AND n.nspname NOT LIKE 'pg_temp%%'
+                    AND (%s::oid[] IS NULL OR c.oid = ANY(%s::oid[]))
+                    ORDER BY n.nspname, c.relname
+                """, (relation_oids, relation_oids))
+                tables = [dict(t) for t in cursor.fetchall()]
+                keys = {t['oid']: self.catalog_key(t['schema'], t['name']) for t in tables}
+                oids = list(keys.keys())
+
+                catalog = {
+                    'tables': tables,
+                    'columns': {key: [] for key in keys.values()},
+                    'primary_keys': {key: [] for key in keys.values()},
+                    'indexes': {key: [] for key in keys.values()},
+                    'foreign_keys': {key: [] for key in keys.values()}
+                }
+
+                cursor.execute("""
+                    SELECT
+                        i.indrelid as table_oid,
+                        a.attname as column_name
+                    FROM pg_catalog.pg_index i
+                    JOIN pg_catalog.pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                    WHERE i.indisprimary
+                    AND i.indrelid = ANY(%s::oid[])
+                    ORDER BY i.indrelid, array_position(i.indkey::int2[], a.attnum)
+                """, (oids,))
+                for row in cursor.fetchall():
+                    catalog['primary_keys'][keys[row['table_oid']]].append(row['column_name'])
+
+                cursor.execute("""
+                    SELECT
+                        a.attrelid as table_oid,
+                        a.attname as name,
+                        format_type(a.atttypid, NULL) as type,
+                        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END as is_nullable,
+                        pg_get_expr(d.adbin, d.adrelid) as default_value,
+                        CASE
+                            WHEN a.atttypid IN ('bpchar'::regtype, 'varchar'::regtype) AND a.atttypmod > 4
+                            THEN a.atttypmod - 4
+                        END as max_length
+                    FROM pg_catalog.pg_attribute a
+                    LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+                    WHERE a.attrelid = ANY(%s::oid[])
+                    AND a.attnum > 0
+                    AND NOT a.attisdropped
+                    ORDER BY a.attrelid, a.attnum
+                """, (oids,))
+                for row in cursor.fetchall():
+                    key = keys[row.pop('table_oid')]
+                    column = dict(row)
+                    column['is_primary_key'] = column['name'] in catalog['primary_keys'][key]
+                    catalog['columns'][key].append(column)
+
+                cursor.execute("""
+                    SELECT
+                        i.indrelid as table_oid,
+                        ic.relname as name,
+                        pg_get_indexdef(i.indexrelid) as definition,
+                        ARRAY(
+                            SELECT pg_get_indexdef(i.indexrelid, k, true)
+                            FROM generate_series(1, i.indnkeyatts) k
+                            ORDER BY k
+                        )::text[] as columns,
+                        am.amname as method,
+                        i.indisunique as is_unique,
+                        i.indisprimary as is_primary,
+                        i.indpred IS NOT NULL as is_partial
+                    FROM pg_catalog.pg_index i
+                    JOIN pg_catalog.pg_class ic ON ic.oid = i.indexrelid
+                    JOIN pg_catalog.pg_am am ON am.oid = ic.relam
+                    WHERE i.indrelid = ANY(%s::oid[])
+                    ORDER BY i.indrelid, ic.relname
+                """, (oids,))
+                for row in cursor.fetchall():
+                    key = keys[row.pop('table_oid')]
+                    catalog['indexes'][key].append(dict(row))
+
+                cursor.execute("""
+                    SELECT
+                        con.conrelid as table_oid,
+                        con.conname as constraint_name,
+                        ARRAY(
+                            SELECT a.attname
+                            FROM unnest(con.conkey) WITH ORDINALITY k(attnum, ord)
+                            JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                            ORDER BY k.ord
+                        )::text[] as columns,
+                        fn.nspname as foreign_schema,
+                        fc.relname as foreign_table_name,
+                        ARRAY(
+                            SELECT a.attname
+                            FROM unnest(con.confkey) WITH ORDINALITY k(attnum, ord)
+                            JOIN pg_catalog.pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum
+                            ORDER BY k.ord
+                        )::text[] as foreign_columns
+                    FROM pg_catalog.pg_constraint con
+                    JOIN pg_catalog.pg_class fc ON fc.oid = con.confrelid
+                    JOIN pg_catalog.pg_namespace fn ON fn.oid = fc.relnamespace
+                    WHERE con.contype = 'f'
+                    AND con.conrelid = ANY(%s::oid[])
+                    ORDER BY con.conrelid, con.conname
+                """, (oids,))
+                for row in cursor.fetchall():
+                    key = keys[row.pop('table_oid')]
+                    catalog['foreign_keys'][key].append(dict(row))
+
+                return {
+                    'success': True,
+                    'catalog': catalog
+                }
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    def merge_catalog(base: Dict[str, Any], partial: Dict[str, Any], removed_oids: List[int]) -> Dict[str, Any]:
+        """Replace the tables in base that were removed or reloaded in partial, in place"""
+        replaced = set(removed_oids) | {t['oid'] for t in partial['tables']}
+        sections = ('columns', 'primary_keys', 'indexes', 'foreign_keys')
+
+        kept_tables = []
+        for table in base['tables']:
+            if table['oid'] in replaced:
+                key = PostgresClient.catalog_key(table['schema'], table['name'])
+                for section in sections:
+                    base[section].pop(key, None)
+            else:
+                kept_tables.append(table)
+
+        base['tables'] = sorted(kept_tables + partial['tables'], key=lambda t: (t['schema'], t['name']))
+        for section in sections:
+            base[section].update(partial[section])
+
+        return base
+
+    def get_schema_fingerprint(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get one hash per schema over the signatures of its tables"""
+        connection_id = conn_data['id']
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(f"""
+                    SELECT
+                        schema,
+                        md5(string_agg(oid || ':' || signature, ',' ORDER BY oid)) as fingerprint
+                    FROM ({RELATION_SIGNATURES_SQL}) relations
+                    GROUP BY schema
+                """)
+
+                return {
+                    'success': True,
+                    'namespaces': {row['schema']: row['fingerprint'] for row in cursor.fetchall()}
+                }
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    def fingerprint_from_signatures(relations: Dict[str, List[str]]) -> Dict[str, str]:
+        """Compute per-schema fingerprints from relation signatures, matching get_schema_fingerprint"""
+        by_schema: Dict[str, List[Tuple[int, str]]] = {}
+        for oid, (schema, signature) in relations.items():
+            by_schema.setdefault(schema, []).append((int(oid), signature))
+        return {
+            schema: hashlib.md5(','.join(f"{oid}:{sig}" for oid, sig in sorted(entries)).encode()).hexdigest()
+            for schema, entries in by_schema.items()
+        }
+
+    def get_relation_signatures(self, conn_data: Dict[str, Any], schemas: Optional[List[str]]) -> Dict[str, Any]:
+        """Get the catalog signature of every table in the given schemas (all schemas if None)"""
+        connection_id = conn_data['id']
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(f"""
+                    SELECT oid, schema, signature
+                    FROM ({RELATION_SIGNATURES_SQL}) relations
+                    WHERE %s::text[] IS NULL OR schema = ANY(%s::text[])
+                """, (schemas, schemas))
 
-        return all_indexes
+                return {
+                    'success': True,
+                    'relations': {
+                        str(row['oid']): [row['schema'], row['signature']] for row in cursor.fetchall()
+                    }
+                }
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
 
     def get_slow_queries_from_pg_stat(self, conn_data: Dict[str, Any], min_execution_time: float = 1.0, limit: int = 50) -> Dict[str, Any]:
         """Get slow queries from pg_stat_statements extension"""
@@ -380,6 +1827,52 @@ class PostgresClient:
                 'queries': []
             }
 
+    def get_statement_workload(self, conn_data: Dict[str, Any], limit: int = 500) -> Dict[str, Any]:
+        """Get the statements that took the most total time from pg_stat_statements"""
+        connection_id = conn_data['id']
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements') as has_extension")
+                if not cursor.fetchone()['has_extension']:
+                    return {
+                        'success': False,
+                        'error': 'pg_stat_statements extension is not installed',
+                        'queries': []
+                    }
+
+                cursor.execute("""
+                    SELECT
+                        query,
+                        calls,
+                        total_exec_time / 1000 as total_time_seconds
+                    FROM pg_stat_statements
+                    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                    AND calls > 0
+                    ORDER BY total_exec_time DESC
+                    LIMIT %s
+                """, (limit,))
+
+                return {
+                    'success': True,
+                    'queries': [dict(q) for q in cursor.fetchall()],
+                    'source': 'pg_stat_statements'
+                }
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'queries': []
+            }
+
     def get_currently_running_queries(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
         """Get currently running queries from pg_stat_activity"""
         connection_id = conn_data['id']
@@ -426,8 +1919,8 @@ class PostgresClient:
                 'queries': []
             }
 
-    def get_table_bloat_analysis(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze table bloat and vacuum statistics"""
+    def get_lock_tree(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get sessions waiting on heavyweight locks and their blockers as trees under ranked root blockers"""
         connection_id = conn_data['id']
 
         try:
@@ -437,40 +1930,56 @@ class PostgresClient:
             try:
                 cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-                # Get bloat estimation and vacuum stats
-                query = """
+                # pg_locks.waitstart exists from PostgreSQL 14; before that a wait is timed from its query's start
+                wait_start = 'COALESCE(l.waitstart, a.query_start)' if conn.server_version >= 140000 else 'a.query_start'
+                query = f"""
+                    WITH waiting AS (
+                        SELECT pid, pg_blocking_pids(pid) AS blocked_by
+                        FROM pg_stat_activity
+                        WHERE wait_event_type = 'Lock'
+                    ),
+                    involved AS (
+                        SELECT pid FROM waiting
+                        UNION
+                        SELECT unnest(blocked_by) FROM waiting
+                    )
                     SELECT
-                        schemaname,
-                        relname as tablename,
-                        pg_size_pretty(pg_total_relation_size(schemaname||'.'||relname)) as total_size,
-                        pg_total_relation_size(schemaname||'.'||relname) as total_bytes,
-                        n_live_tup,
-                        n_dead_tup,
-                        CASE
-                            WHEN n_live_tup > 0
-                            THEN round(100.0 * n_dead_tup / (n_live_tup + n_dead_tup), 2)
-                            ELSE 0
-                        END as bloat_percent,
-                        last_vacuum,
-                        last_autovacuum,
-                        last_analyze,
-                        last_autoanalyze,
-                        vacuum_count,
-                        autovacuum_count,
-                        analyze_count,
-                        autoanalyze_count
-                    FROM pg_stat_user_tables
-                    WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
-                    ORDER BY total_bytes DESC
+                        a.pid,
+                        a.backend_start::text AS backend_start,
+                        a.xact_start::text AS xact_start,
+                        a.datname AS database,
+                        a.usename AS username,
+                        a.application_name,
+                        a.client_addr::text AS client_addr,
+                        a.state,
+                        a.wait_event_type,
+                        a.wait_event,
+                        LEFT(a.query, 1000) AS query,
+                        COALESCE(w.blocked_by, '{{}}') AS blocked_by,
+                        l.locktype,
+                        l.mode,
+                        l.relation::regclass::text AS relation,
+                        EXTRACT(EPOCH FROM (now() - a.xact_start)) AS xact_seconds,
+                        CASE WHEN w.pid IS NOT NULL THEN EXTRACT(EPOCH FROM (now() - {wait_start})) END AS wait_seconds
+                    FROM involved i
+                    JOIN pg_stat_activity a ON a.pid = i.pid
+                    LEFT JOIN waiting w ON w.pid = a.pid
+                    LEFT JOIN LATERAL (
+                        SELECT * FROM pg_locks
+                        WHERE pg_locks.pid = a.pid AND NOT granted
+                        LIMIT 1
+                    ) l ON true
                 """
 
                 cursor.execute(query)
-                tables = cursor.fetchall()
+                sessions = []
+                for row in cursor.fetchall():
+                    session = dict(row)
+                    session['xact_seconds'] = float(session['xact_seconds']) if session['xact_seconds'] is not None else None
+                    session['wait_seconds'] = float(session['wait_seconds']) if session['wait_seconds'] is not None else None
+                    sessions.append(session)
 
-                return {
-                    'success': True,
-                    'tables': [dict(t) for t in tables]
-                }
+                return dict(build_blocking_tree(sessions), success=True)
 
             finally:
                 conn_pool.putconn(conn)
@@ -479,9 +1988,80 @@ class PostgresClient:
             return {
                 'success': False,
                 'error': str(e),
-                'tables': []
+                'roots': []
             }
 
+    def get_table_bloat_analysis(self, conn_data: Dict[str, Any], exact: bool = False) -> Dict[str, Any]:
+        """Estimate wasted space in tables and btree indexes, with vacuum statistics per table.
+
+        exact replaces the table estimates with pgstattuple_approx figures when the extension is installed.
+        """
+        connection_id = conn_data['id']
+
+        try:
+            conn_pool = self.get_pool(connection_id, conn_data)
+            conn = conn_pool.getconn()
+
+            try:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(BLOAT_ESTIMATE_SQL)
+                rows = [dict(r) for r in cursor.fetchall()]
+                tables, indexes = [], []
+                for row in rows:
+                    row['bloat_percent'] = float(row['bloat_percent'])
+                    row['dead_tuple_percent'] = float(row['dead_tuple_percent'])
+                    row['estimate_source'] = 'statistics'
+                    (tables if row['kind'] == 'table' else indexes).append(row)
+
+                result = {'success': True, 'tables': tables, 'indexes': indexes}
+                if exact:
+                    try:
+                        self._apply_pgstattuple(cursor, tables)
+                    except Exception as e:
+                        conn.rollback()
+                        result['exact_error'] = str(e)
+                    tables.sort(key=lambda t: (t['bloat_bytes'], t['total_bytes']), reverse=True)
+                for row in rows:
+                    del row['relid']
+                return result
+
+            finally:
+                conn_pool.putconn(conn)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'tables': [],
+                'indexes': []
+            }
+
+    def _apply_pgstattuple(self, cursor, tables: List[Dict[str, Any]]):
+        """Overwrite statistical heap estimates with pgstattuple_approx measurements"""
+        cursor.execute("""
+            SELECT n.nspname FROM pg_extension e JOIN pg_namespace n ON n.oid = e.extnamespace
+            WHERE e.extname = 'pgstattuple'
+        """)
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError('pgstattuple is not installed; run CREATE EXTENSION pgstattuple for exact figures')
+        cursor.execute(sql.SQL(PGSTATTUPLE_APPROX_SQL).format(schema=sql.Identifier(row['nspname'])))
+        measured = {r['relid']: r for r in cursor.fetchall()}
+
+        for table in tables:
+            m = measured.get(table['relid'])
+            if not m or not m['table_len']:
+                continue
+            # Free space the fillfactor reserves on purpose is not bloat
+            reserved = m['table_len'] * (100 - table['fillfactor']) / 100
+            wasted = max(0, m['dead_tuple_len'] + m['approx_free_space'] - reserved)
+            table['bloat_bytes'] = int(wasted)
+            table['bloat_percent'] = round(100.0 * wasted / m['table_len'], 2)
+            table['actual_bytes'] = m['table_len']
+            table['scanned_percent'] = m['scanned_percent']
+            table['stats_missing'] = False
+            table['estimate_source'] = 'pgstattuple_approx'
+
     def get_index_health_analysis(self, conn_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze index health: unused, duplicate, bloated"""
         connection_id = conn_data['id']
@@ -613,9 +2193,8 @@ class PostgresClient:
 
     def close_pool(self, connection_id: int):
         """Close connection pool"""
-        if connection_id in self.connection_pools:
-            self.connection_pools[connection_id].closeall()
-            del self.connection_pools[connection_id]
+        self.pool_manager.close_pool(connection_id)
+        self.result_cache.invalidate(connection_id)
 
 # Global instance
 pg_client = PostgresClient()
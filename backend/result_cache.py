@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import json
+import threading
+import time
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Results larger than this fraction of the budget are not worth evicting everything else for
+MAX_ENTRY_FRACTION = 0.25
+
+
+class ResultCache:
+    """Thread-safe LRU cache of query results with a TTL and a total size budget in bytes"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        # key -> (stored_at, size, result); most recently used entries at the end
+        self.entries: 'OrderedDict[Tuple, Tuple[float, int, Dict[str, Any]]]' = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        with self.lock:
+            if max_bytes is not None:
+                self.max_bytes = max(0, int(max_bytes))
+            if ttl_seconds is not None:
+                self.ttl_seconds = max(0, float(ttl_seconds))
+            self._evict()
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Tuple, result: Dict[str, Any]):
+        size = len(json.dumps(result, default=str))
+        with self.lock:
+            if size > self.max_bytes * MAX_ENTRY_FRACTION:
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.time(), size, result)
+            self.total_bytes += size
+            self._evict()
+
+    def invalidate(self, connection_id: Optional[int] = None):
+        """Drop every entry, or only those of one connection (the first element of each key)"""
+        with self.lock:
+            for key in [k for k in self.entries if connection_id is None or k[0] == connection_id]:
+                self._remove(key)
+
+    def _remove(self, key: Tuple):
+        _, size, _ = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under budget; caller holds the lock"""
+        now = time.time()
+        for key in [k for k, (stored_at, _, _) in self.entries.items() if now - stored_at > self.ttl_seconds]:
+            self._remove(key)
+        while self.entries and self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -9,6 +9,10 @@ CREATE TABLE IF NOT EXISTS connections (
   password TEXT NOT NULL,
   ssl_enabled BOOLEAN DEFAULT 0,
   color TEXT,
+  pool_min_size INTEGER DEFAULT 1,
+  pool_max_size INTEGER DEFAULT 10,
+  statement_timeout_ms INTEGER DEFAULT 0,
+  lock_timeout_ms INTEGER DEFAULT 0,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   last_used TIMESTAMP
 );
@@ -19,10 +23,96 @@ CREATE TABLE IF NOT EXISTS query_history (
   connection_id INTEGER,
   query TEXT NOT NULL,
   execution_time REAL,
+  statement_timings TEXT,
   executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   FOREIGN KEY (connection_id) REFERENCES connections(id)
 );
 
+-- EXPLAIN plans captured for slow queries, keyed by query fingerprint
+CREATE TABLE IF NOT EXISTS query_plans (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  connection_id INTEGER,
+  fingerprint TEXT NOT NULL,
+  query TEXT NOT NULL,
+  shape_hash TEXT NOT NULL,
+  total_cost REAL,
+  execution_time REAL,
+  plan_json TEXT NOT NULL,
+  regression TEXT,
+  captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_query_plans_fingerprint ON query_plans (connection_id, fingerprint, captured_at);
+
+-- pg_stat_statements snapshots: one row per sampling run, plus the statements whose counters moved in it
+CREATE TABLE IF NOT EXISTS statement_snapshots (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  connection_id INTEGER,
+  sampled_at REAL NOT NULL,
+  statement_count INTEGER,
+  FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_statement_snapshots_time ON statement_snapshots (connection_id, sampled_at);
+
+CREATE TABLE IF NOT EXISTS statement_samples (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  connection_id INTEGER,
+  queryid INTEGER NOT NULL,
+  sampled_at REAL NOT NULL,
+  calls INTEGER NOT NULL,
+  total_time REAL NOT NULL,
+  rows INTEGER NOT NULL,
+  FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_statement_samples_query ON statement_samples (connection_id, queryid, sampled_at);
+
+CREATE TABLE IF NOT EXISTS statement_texts (
+  connection_id INTEGER,
+  queryid INTEGER NOT NULL,
+  query TEXT NOT NULL,
+  PRIMARY KEY (connection_id, queryid)
+);
+
+-- Blocking-tree samples taken by the lock sampler
+CREATE TABLE IF NOT EXISTS lock_samples (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  connection_id INTEGER,
+  sampled_at REAL NOT NULL,
+  waiting_count INTEGER NOT NULL,
+  root_count INTEGER NOT NULL,
+  max_wait_seconds REAL,
+  deadlock INTEGER DEFAULT 0,
+  FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_lock_samples_time ON lock_samples (connection_id, sampled_at);
+
+-- One row per root blocker transaction, extended for as long as it keeps blocking
+CREATE TABLE IF NOT EXISTS lock_episodes (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  connection_id INTEGER,
+  pid INTEGER NOT NULL,
+  backend_start TEXT NOT NULL,
+  xact_start TEXT NOT NULL,
+  username TEXT,
+  application_name TEXT,
+  state TEXT,
+  query TEXT,
+  first_seen REAL NOT NULL,
+  last_seen REAL NOT NULL,
+  samples INTEGER NOT NULL,
+  max_blocked INTEGER NOT NULL,
+  max_wait_seconds REAL,
+  blocked_session_seconds REAL NOT NULL,
+  UNIQUE (connection_id, pid, backend_start, xact_start),
+  FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_lock_episodes_seen ON lock_episodes (connection_id, last_seen);
+
 -- Favorite queries
 CREATE TABLE IF NOT EXISTS favorite_queries (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -65,6 +155,8 @@ CREATE TABLE IF NOT EXISTS query_tabs (
 CREATE TABLE IF NOT EXISTS schema_cache (
   connection_id INTEGER PRIMARY KEY,
   schema_data TEXT NOT NULL,
+  fingerprint TEXT,
+  relation_signatures TEXT,
   cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE
 );
@@ -0,0 +1,112 @@
+import hashlib
+import re
+import sqlparse
+from sqlparse import tokens as T
+from typing import Optional, List, Dict, Any
+
+# Functions whose result changes between calls or that have side effects; queries using them are never cached
+VOLATILE_FUNCTIONS = {
+    'random', 'setseed', 'nextval', 'setval', 'currval', 'lastval',
+    'now', 'clock_timestamp', 'statement_timestamp', 'transaction_timestamp', 'timeofday',
+    'current_timestamp', 'current_time', 'current_date', 'localtime', 'localtimestamp',
+    'gen_random_uuid', 'uuid_generate_v1', 'uuid_generate_v4',
+    'pg_sleep', 'pg_sleep_for', 'pg_sleep_until', 'txid_current', 'pg_current_xact_id',
+    'set_config', 'pg_notify', 'pg_cancel_backend', 'pg_terminate_backend', 'dblink', 'dblink_exec'
+}
+
+# Keywords that turn a SELECT into something that writes or locks
+WRITE_KEYWORDS = {'INTO', 'UPDATE', 'SHARE', 'NOWAIT'}
+
+
+def parse_single(query: str) -> Optional[sqlparse.sql.Statement]:
+    """Parse query and return its statement, or None if it contains zero or several statements"""
+    statements = [s for s in sqlparse.parse(query) if s.token_first(skip_cm=True, skip_ws=True) is not None]
+    return statements[0] if len(statements) == 1 else None
+
+
+def split_statements(script: str) -> List[Dict[str, Any]]:
+    """Split a script into statements (dollar quotes and comments respected), with their 1-based start line"""
+    statements = []
+    position = 0
+    for text in sqlparse.split(script):
+        parsed = sqlparse.parse(text)
+        if not parsed or parsed[0].token_first(skip_cm=True, skip_ws=True) is None:
+            # Comment-only fragment
+            continue
+        offset = max(script.find(text, position), 0)
+        position = offset + len(text)
+
+        # Report the line of the first real token rather than of leading comments
+        lead = 0
+        for token in parsed[0].flatten():
+            if not (token.is_whitespace or token.ttype in T.Comment):
+                break
+            lead += len(token.value)
+        statements.append({'sql': text, 'line': script.count('\n', 0, offset + lead) + 1})
+    return statements
+
+
+def normalize_sql(query: str) -> str:
+    """Canonical text of a query for cache keys: no comments, lower-case keywords, collapsed whitespace"""
+    parts = []
+    for token in sqlparse.parse(query.strip())[0].flatten() if query.strip() else []:
+        if token.ttype in T.Comment or token.ttype in T.Whitespace or token.ttype in T.Newline:
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        elif token.ttype in T.Keyword:
+            parts.append(token.value.lower())
+        else:
+            # Literals and quoted identifiers keep their exact text
+            parts.append(token.value)
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+def fingerprint_sql(query: str) -> str:
+    """Stable id for a query's shape: its tokens joined by single spaces with literals replaced, so runs
+    differing only in constants or spacing share one fingerprint"""
+    parts = []
+    for token in sqlparse.parse(query.strip())[0].flatten() if query.strip() else []:
+        if token.is_whitespace or token.ttype in T.Comment:
+            continue
+        if token.ttype in T.Literal.String.Symbol:
+            # Quoted identifier, not a value
+            parts.append(token.value)
+        elif token.ttype in T.Literal:
+            parts.append('?')
+        elif token.ttype in T.Keyword or token.ttype in T.Name:
+            parts.append(token.value.lower())
+        else:
+            parts.append(token.value)
+    while parts and parts[-1] == ';':
+        parts.pop()
+    # IN lists of any length are the same query
+    text = re.sub(r'\(\s*\?(\s*,\s*\?)*\s*\)', '(?)', ' '.join(parts))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def is_select(query: str) -> bool:
+    """True for a single SELECT (CTEs allowed) that can run behind a server-side cursor: no SELECT INTO
+    and no data-modifying CTEs"""
+    statement = parse_single(query)
+    if statement is None or statement.get_type() != 'SELECT':
+        return False
+
+    for token in statement.flatten():
+        if token.ttype in T.Keyword.DML and token.normalized != 'SELECT':
+            return False
+        if token.ttype in T.Keyword and token.normalized == 'INTO':
+            return False
+    return True
+
+
+def is_plain_select(query: str) -> bool:
+    """True for a single read-only SELECT (CTEs allowed) without locking, SELECT INTO or volatile calls"""
+    if not is_select(query):
+        return False
+
+    for token in parse_single(query).flatten():
+        if token.ttype in T.Keyword and token.normalized in WRITE_KEYWORDS:
+            return False
+        if token.ttype in (T.Name, T.Keyword) and token.value.lower() in VOLATILE_FUNCTIONS:
+            return False
+    return True
@@ -0,0 +1,115 @@
+import index_advisor
+from index_advisor import extract_column_usage, advise_indexes, build_workload
+
+
+def _catalog(indexes=None):
+    columns = {
+        'orders': ['id', 'customer_id', 'status', 'created_at'],
+        'customers': ['id', 'region', 'name'],
+        'items': ['order_id', 'sku']
+    }
+    return {
+        'tables': [{'schema': 'public', 'name': name} for name in columns],
+        'columns': {name: [{'name': c} for c in cols] for name, cols in columns.items()},
+        'indexes': {name: (indexes or {}).get(name, []) for name in columns}
+    }
+
+
+def _index(name, columns, **flags):
+    return dict({'name': name, 'columns': columns, 'method': 'btree', 'is_unique': False,
+                 'is_primary': False, 'is_partial': False}, **flags)
+
+
+def _usages(query):
+    return [(u['kind'], u['ref']) for u in extract_column_usage(query)['usages']]
+
+
+def test_aliases_resolve_to_tables():
+    usage = extract_column_usage(
+        "SELECT o.id FROM public.orders AS o JOIN customers c ON c.id = o.customer_id WHERE o.status = $1"
+    )
+    assert usage['tables'] == [{'parts': ('public', 'orders'), 'alias': 'o'}, {'parts': ('customers',), 'alias': 'c'}]
+    assert _usages("SELECT 1 FROM orders o JOIN customers c ON c.id = o.customer_id WHERE o.status = $1") == [
+        ('join', ('c', 'id')), ('join', ('o', 'customer_id')), ('equality', ('o', 'status'))
+    ]
+
+
+def test_derived_table_alias_does_not_rename_inner_table():
+    usage = extract_column_usage("SELECT * FROM (SELECT * FROM orders o WHERE o.status = 'x') sub")
+    assert usage['tables'] == [{'parts': None, 'alias': 'sub'}, {'parts': ('orders',), 'alias': 'o'}]
+
+
+def test_using_joins_new_table_to_earlier_ones():
+    usages = _usages("SELECT * FROM orders o JOIN items i USING (order_id)")
+    assert ('join', ('o', 'order_id')) in usages
+    assert ('join', ('i', 'order_id')) in usages
+
+
+def test_like_prefix_is_a_range_but_leading_wildcard_is_not():
+    assert _usages("SELECT * FROM customers WHERE name LIKE 'ab%'") == [('range', ('name',))]
+    assert _usages("SELECT * FROM customers WHERE name LIKE '%ab'") == []
+
+
+def test_expressions_and_negations_are_not_plain_column_tests():
+    assert _usages("SELECT * FROM customers WHERE lower(name) = 'x' AND id::text = '1' AND region NOT IN ('eu')") == []
+
+
+def test_order_by_desc_with_limit():
+    usage = extract_column_usage("SELECT * FROM orders WHERE customer_id = 1 ORDER BY created_at DESC LIMIT 10")
+    assert usage['limit'] is True
+    assert usage['usages'][-1] == {'kind': 'sort', 'ref': ('created_at',), 'descending': True}
+    assert extract_column_usage("SELECT row_number() OVER (ORDER BY created_at) FROM orders")['usages'] == []
+
+
+def test_recommends_equality_then_sort_columns():
+    workload = build_workload([
+        {'query': "SELECT * FROM orders WHERE status = 'new' AND customer_id = 3 ORDER BY created_at DESC LIMIT 20",
+         'execution_time': 4.0},
+        {'query': "SELECT * FROM orders WHERE customer_id = 9", 'execution_time': 2.0},
+    ], [])
+    advice = advise_indexes(workload, _catalog())
+    top = advice['recommendations'][0]
+    # customer_id is filtered on by more of the workload, so it leads; the single-direction sort needs no DESC
+    assert top['columns'] == ['customer_id', 'status', 'created_at']
+    assert top['create_statement'] == 'CREATE INDEX CONCURRENTLY ON orders (customer_id, status, created_at);'
+    # The customer_id-only statement is a prefix of the composite and is folded into it
+    assert top['query_count'] == 2
+    assert top['benefit_seconds'] == 6.0
+
+
+def test_sort_without_limit_or_filter_is_not_proposed():
+    workload = build_workload([{'query': "SELECT * FROM orders ORDER BY created_at", 'execution_time': 1.0}], [])
+    assert advise_indexes(workload, _catalog())['recommendations'] == []
+
+
+def test_existing_index_covers_candidate_in_any_equality_order():
+    catalog = _catalog({'orders': [_index('orders_status_customer_idx', ['status', 'customer_id', 'id'])]})
+    workload = build_workload([
+        {'query': "SELECT * FROM orders WHERE customer_id = 1 AND status = 'x'", 'execution_time': 1.0}
+    ], [])
+    advice = advise_indexes(workload, catalog)
+    assert advice['recommendations'] == []
+    assert advice['covered'][0]['index'] == 'orders_status_customer_idx'
+
+
+def test_partial_and_prefix_indexes_do_not_cover():
+    catalog = _catalog({'orders': [
+        _index('orders_status_idx', ['status']),
+        _index('orders_status_partial_idx', ['status', 'created_at'], is_partial=True),
+    ]})
+    workload = build_workload([
+        {'query': "SELECT * FROM orders WHERE status = 'x' AND created_at > now()", 'execution_time': 1.0}
+    ], [])
+    top = advise_indexes(workload, catalog)['recommendations'][0]
+    assert top['columns'] == ['status', 'created_at']
+    assert top['replaces'] == ['orders_status_idx']
+
+
+def test_unknown_tables_and_columns_are_ignored():
+    workload = build_workload([
+        {'query': "SELECT * FROM pg_class WHERE relname = 'x'", 'execution_time': 1.0},
+        {'query': "SELECT * FROM orders WHERE missing = 1", 'execution_time': 1.0},
+    ], [])
+    advice = advise_indexes(workload, _catalog())
+    assert advice['recommendations'] == [] and advice['covered'] == []
+    assert index_advisor.format_advice(advice).startswith('Workload: 2 distinct statements')
@@ -0,0 +1,70 @@
+import plan_analyzer
+from plan_analyzer import analyze_plan
+from plan_model import Plan
+from test_plan_model import PARALLEL_PLAN, NESTED_LOOP_PLAN
+
+# Sort that ran out of work_mem and merged on disk
+SPILL_PLAN = [{
+    'Plan': {
+        'Node Type': 'Sort', 'Plan Rows': 5000, 'Actual Total Time': 80.0, 'Actual Rows': 5000, 'Actual Loops': 1,
+        'Sort Key': ['created_at'], 'Sort Method': 'external merge', 'Sort Space Used': 2048,
+        'Sort Space Type': 'Disk', 'Temp Read Blocks': 256, 'Temp Written Blocks': 256,
+        'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'events', 'Parent Relationship': 'Outer',
+             'Plan Rows': 5000, 'Actual Total Time': 20.0, 'Actual Rows': 5000, 'Actual Loops': 1}
+        ]
+    },
+    'Execution Time': 80.0
+}]
+
+
+def _rules(explain_json):
+    return [(f['rule'], f['severity'], f['node']) for f in analyze_plan(Plan(explain_json))['findings']]
+
+
+def test_selective_parallel_seq_scan():
+    findings = analyze_plan(Plan(PARALLEL_PLAN))['findings']
+    assert [(f['rule'], f['severity']) for f in findings] == [('seq_scan', 'high')]
+    # Every participating process's filtered rows count, not just the per-loop average
+    assert findings[0]['metrics']['rows_scanned'] == 63000
+    assert findings[0]['metrics']['rows_kept'] == 3000
+
+
+def test_nested_loop_misestimate_and_buffer_hits():
+    assert _rules(NESTED_LOOP_PLAN) == [
+        ('nested_loop', 'high', 'Nested Loop'),
+        ('low_buffer_hits', 'high', 'Index Scan using items_pkey on items'),
+        ('row_misestimate', 'medium', 'Seq Scan on customers c'),
+    ]
+    hits = [f for f in analyze_plan(Plan(NESTED_LOOP_PLAN))['findings'] if f['rule'] == 'low_buffer_hits'][0]
+    assert hits['metrics'] == {'hit_ratio': 0.25, 'blocks_read': 1500}
+
+
+def test_sort_spill():
+    analysis = analyze_plan(Plan(SPILL_PLAN))
+    assert _rules(SPILL_PLAN) == [('disk_spill', 'high', 'Sort')]
+    assert analysis['findings'][0]['metrics'] == {'temp_written_blocks': 256, 'time_percent': 75.0}
+    assert analysis['bottlenecks'] == ['Sort: sort spilled 2,048 kB to disk (external merge)']
+
+
+def test_misestimates_under_a_limit_or_repeated_by_a_hash_are_not_reported():
+    limited = {'Plan': {'Node Type': 'Limit', 'Plan Rows': 10, 'Actual Total Time': 1.0, 'Actual Rows': 10,
+                        'Actual Loops': 1,
+                        'Plans': [{'Node Type': 'Seq Scan', 'Relation Name': 'orders', 'Plan Rows': 100000,
+                                   'Actual Total Time': 1.0, 'Actual Rows': 10, 'Actual Loops': 1}]}}
+    assert _rules(limited) == []
+    hashed = {'Plan': {'Node Type': 'Hash', 'Plan Rows': 10, 'Actual Total Time': 2.0, 'Actual Rows': 5000,
+                       'Actual Loops': 1,
+                       'Plans': [{'Node Type': 'Seq Scan', 'Relation Name': 'orders', 'Plan Rows': 10,
+                                  'Actual Total Time': 1.0, 'Actual Rows': 5000, 'Actual Loops': 1}]}}
+    assert _rules(hashed) == [('row_misestimate', 'medium', 'Seq Scan on orders')]
+
+
+def test_clean_plan_and_hints():
+    clean = {'Plan': {'Node Type': 'Index Scan', 'Relation Name': 'orders', 'Index Name': 'orders_pkey',
+                      'Plan Rows': 1, 'Actual Total Time': 0.05, 'Actual Rows': 1, 'Actual Loops': 1,
+                      'Shared Hit Blocks': 4}}
+    analysis = analyze_plan(Plan(clean))
+    assert analysis['summary'] == 'No common plan problems detected.'
+    assert plan_analyzer.format_hints(analysis) == '- none'
+    assert plan_analyzer.format_hints(analyze_plan(Plan(SPILL_PLAN))).startswith('- [high] disk_spill @ Sort: ')
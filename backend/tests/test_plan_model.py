@@ -0,0 +1,97 @@
+from plan_model import Plan
+
+# Gather over a parallel seq scan: the scan's 3 loops are the leader plus 2 workers running side by side
+PARALLEL_PLAN = [{
+    'Plan': {
+        'Node Type': 'Gather', 'Total Cost': 1500.0, 'Plan Rows': 3000, 'Plan Width': 8,
+        'Actual Total Time': 100.0, 'Actual Rows': 3000, 'Actual Loops': 1,
+        'Workers Planned': 2, 'Workers Launched': 2,
+        'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'orders', 'Alias': 'o', 'Parent Relationship': 'InitPlan',
+             'Subplan Name': 'InitPlan 1', 'Plan Rows': 1, 'Actual Total Time': 4.0, 'Actual Rows': 1,
+             'Actual Loops': 1},
+            {'Node Type': 'Seq Scan', 'Relation Name': 'orders', 'Parent Relationship': 'Outer',
+             'Plan Rows': 1000, 'Actual Total Time': 90.0, 'Actual Rows': 1000, 'Actual Loops': 3,
+             'Filter': "(status = 'new'::text)", 'Rows Removed by Filter': 20000}
+        ]
+    },
+    'Planning Time': 0.2,
+    'Execution Time': 100.5
+}]
+
+# Nested loop whose inner index scan runs once per outer row
+NESTED_LOOP_PLAN = [{
+    'Plan': {
+        'Node Type': 'Nested Loop', 'Join Type': 'Inner', 'Plan Rows': 2000, 'Actual Total Time': 50.0,
+        'Actual Rows': 2000, 'Actual Loops': 1, 'Shared Hit Blocks': 500, 'Shared Read Blocks': 1500,
+        'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'customers', 'Alias': 'c', 'Parent Relationship': 'Outer',
+             'Plan Rows': 20, 'Actual Total Time': 5.0, 'Actual Rows': 2000, 'Actual Loops': 1,
+             'Shared Hit Blocks': 100, 'Shared Read Blocks': 50},
+            {'Node Type': 'Index Scan', 'Relation Name': 'items', 'Alias': 'items', 'Index Name': 'items_pkey',
+             'Parent Relationship': 'Inner', 'Plan Rows': 1, 'Actual Total Time': 0.02, 'Actual Rows': 1,
+             'Actual Loops': 2000, 'Shared Hit Blocks': 400, 'Shared Read Blocks': 1450}
+        ]
+    },
+    'Execution Time': 50.0
+}]
+
+
+def test_parallel_loops_are_counted_once_per_process():
+    gather, init_plan, scan = Plan(PARALLEL_PLAN).nodes()
+    assert scan.parallel_processes == 3
+    assert scan.total_time == 90.0
+    assert scan.total_rows == 3000
+    # The Gather's own figures are the leader's; its init plan runs once, in the leader
+    assert gather.total_time == 100.0
+    assert init_plan.parallel_processes == 1 and init_plan.total_time == 4.0
+    assert gather.exclusive_time == 6.0
+
+
+def test_loops_multiply_per_loop_time_and_rows():
+    join, outer, inner = Plan(NESTED_LOOP_PLAN).nodes()
+    assert inner.total_time == 40.0
+    assert inner.total_rows == 2000
+    assert join.exclusive_time == 5.0
+
+
+def test_exclusive_time_is_clamped_at_zero():
+    plan = Plan({'Plan': {'Node Type': 'Limit', 'Actual Total Time': 1.0, 'Actual Rows': 1, 'Actual Loops': 1,
+                          'Plans': [{'Node Type': 'Seq Scan', 'Actual Total Time': 1.2, 'Actual Rows': 1,
+                                     'Actual Loops': 1}]}})
+    assert plan.root.exclusive_time == 0.0
+    assert plan.root.children[0].under_limit
+
+
+def test_row_estimates_and_never_executed_nodes():
+    join, outer, inner = Plan(NESTED_LOOP_PLAN).nodes()
+    assert outer.row_estimate_ratio == 100.0 and outer.misestimate_factor == 100.0
+    assert inner.misestimate_factor == 1.0
+    skipped = Plan({'Plan': {'Node Type': 'Seq Scan', 'Plan Rows': 10, 'Actual Loops': 0}}).root
+    assert not skipped.executed
+    assert skipped.row_estimate_ratio is None and skipped.misestimate_factor is None
+
+
+def test_exclusive_buffers_subtract_children():
+    plan = Plan(NESTED_LOOP_PLAN)
+    join, outer, inner = plan.nodes()
+    assert plan.buffer_totals['Shared Read Blocks'] == 1500
+    assert join.exclusive_buffers['Shared Hit Blocks'] == 0
+    assert join.exclusive_buffers['Shared Read Blocks'] == 0
+    assert inner.exclusive_buffers['Shared Read Blocks'] == 1450
+
+
+def test_labels_and_annotated_text():
+    plan = Plan(NESTED_LOOP_PLAN)
+    assert plan.root.children[1].label() == 'Index Scan using items_pkey on items'
+    assert plan.root.children[0].label() == 'Seq Scan on customers c'
+    text = plan.render_text()
+    assert '  ->  Seq Scan on customers c' in text
+    assert 'Buffers: shared hit=500 read=1500' in text
+    assert 'rows underestimated 100x' in text
+
+
+def test_shape_hash_ignores_timings():
+    faster = [{'Plan': dict(NESTED_LOOP_PLAN[0]['Plan'], **{'Actual Total Time': 5.0}), 'Execution Time': 5.0}]
+    assert Plan(faster).shape_hash() == Plan(NESTED_LOOP_PLAN).shape_hash()
+    assert Plan(PARALLEL_PLAN).shape_hash() != Plan(NESTED_LOOP_PLAN).shape_hash()
@@ -5,9 +5,24 @@ interface InsightsPanelProps {
   data: any;
   onClose: () => void;
   onInsertSQL?: (sql: string) => void;
+  onRequestAI?: () => void;
+  isAIProcessing?: boolean;
 }
 
-const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onInsertSQL }) => {
+const SEVERITY_STYLES: Record<string, string> = {
+  high: 'bg-red-100 text-red-700 dark:bg-red-900/30 dark:text-red-300',
+  medium: 'bg-yellow-100 text-yellow-700 dark:bg-yellow-900/30 dark:text-yellow-300',
+  low: 'bg-gray-100 text-gray-600 dark:bg-gray-800 dark:text-gray-400',
+};
+
+const InsightsPanel: React.FC<InsightsPanelProps> = ({
+  type,
+  data,
+  onClose,
+  onInsertSQL,
+  onRequestAI,
+  isAIProcessing,
+}) => {
   const renderExplainContent = () => (
     <div className="space-y-4">
       <div className="prose dark:prose-invert max-w-none">
@@ -112,7 +127,27 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
         </div>
       )}
 
-      {data.bottlenecks && data.bottlenecks.length > 0 && (
+      {data.findings && data.findings.length > 0 && (
+        <div>
+          <h4 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">
+            🔎 Plan Checks:
+          </h4>
+          <ul className="space-y-2">
+            {data.findings.map((finding: any, index: number) => (
+              <li key={index} className="text-sm text-gray-600 dark:text-gray-400">
+                <span className={`mr-2 px-1.5 py-0.5 rounded text-xs font-medium ${SEVERITY_STYLES[finding.severity]}`}>
+                  {finding.severity}
+                </span>
+                {finding.message}
+                <div className="ml-1 mt-0.5 text-xs text-gray-500 dark:text-gray-500">→ {finding.recommendation}</div>
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+
+      {/* Rule findings already list every issue; the lists below carry the AI's take */}
+      {data.source !== 'local' && data.bottlenecks && data.bottlenecks.length > 0 && (
         <div>
           <h4 className="text-sm font-semibold text-red-700 dark:text-red-400 mb-2">
             🚨 Performance Bottlenecks:
@@ -138,7 +173,7 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
         </div>
       )}
 
-      {data.recommendations && data.recommendations.length > 0 && (
+      {data.source !== 'local' && data.recommendations && data.recommendations.length > 0 && (
         <div>
           <h4 className="text-sm font-semibold text-green-700 dark:text-green-400 mb-2">
             ✅ Recommendations:
@@ -151,6 +186,16 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
         </div>
       )}
 
+      {data.source === 'local' && onRequestAI && (
+        <button
+          onClick={onRequestAI}
+          disabled={isAIProcessing}
+          className="px-4 py-2 bg-purple-600 hover:bg-purple-700 disabled:opacity-50 text-white text-sm font-medium rounded-lg transition-colors"
+        >
+          {isAIProcessing ? 'Asking AI...' : 'Ask AI for a deeper analysis'}
+        </button>
+      )}
+
       {data.plan_text && (
         <details className="mt-4">
           <summary className="cursor-pointer text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">
@@ -170,10 +215,20 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
     <div className="space-y-4">
       <div className="bg-green-50 dark:bg-green-900/20 border border-green-200 dark:border-green-800 rounded-lg p-4">
         <p className="text-sm text-green-700 dark:text-green-400">
-          Analyzed {data.analyzed_queries} recent queries
+          Analyzed {data.analyzed_queries} distinct statements ({data.workload_seconds?.toFixed(1)}s of execution time)
+          {data.sources?.length > 0 && ` from ${data.sources.join(' and ')}`}
         </p>
+        {data.pg_stat_statements_error && (
+          <p className="text-xs text-gray-500 dark:text-gray-400 mt-1">
+            Query history only: {data.pg_stat_statements_error}
+          </p>
+        )}
       </div>
 
+      {data.narrative && (
+        <div className="whitespace-pre-wrap text-sm text-gray-700 dark:text-gray-300">{data.narrative}</div>
+      )}
+
       {data.recommendations && data.recommendations.length > 0 ? (
         <div className="space-y-4">
           {data.recommendations.map((rec: any, index: number) => (
@@ -182,9 +237,16 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
               className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-lg p-4"
             >
               {rec.table && (
-                <div className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">
-                  Table: {rec.table}
-                  {rec.columns && ` (${rec.columns.join(', ')})`}
+                <div className="flex items-center justify-between text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">
+                  <span>
+                    Table: {rec.table}
+                    {rec.columns && ` (${rec.columns.join(', ')})`}
+                  </span>
+                  {rec.workload_percent !== undefined && (
+                    <span className="text-xs font-normal text-gray-500 dark:text-gray-400">
+                      {rec.workload_percent}% of workload time
+                    </span>
+                  )}
                 </div>
               )}
               {rec.reason && (
@@ -197,6 +259,23 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
                   </pre>
                 </div>
               )}
+              {rec.replaces?.length > 0 && (
+                <p className="text-xs text-gray-500 dark:text-gray-400 mt-2">
+                  Makes {rec.replaces.join(', ')} redundant
+                </p>
+              )}
+              {rec.example_queries?.length > 0 && (
+                <details className="mt-2">
+                  <summary className="cursor-pointer text-xs text-gray-500 dark:text-gray-400">
+                    {rec.query_count} statement(s), {rec.calls} call(s)
+                  </summary>
+                  {rec.example_queries.map((q: string, i: number) => (
+                    <div key={i} className="font-mono text-xs text-gray-700 dark:text-gray-300 truncate mt-1" title={q}>
+                      {q}
+                    </div>
+                  ))}
+                </details>
+              )}
             </div>
           ))}
         </div>
@@ -205,6 +284,24 @@ const InsightsPanel: React.FC<InsightsPanelProps> = ({ type, data, onClose, onIn
           No index recommendations found. Your database seems well-optimized!
         </div>
       )}
+
+      {data.covered && data.covered.length > 0 && (
+        <div>
+          <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">Already served by existing indexes</h3>
+          <ul className="space-y-1 text-xs text-gray-600 dark:text-gray-400">
+            {data.covered.map((c: any, index: number) => (
+              <li key={index}>
+                {c.table} ({c.columns.join(', ')}) by <span className="font-mono">{c.index}</span>,{' '}
+                {c.benefit_seconds}s in {c.query_count} statement(s)
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+
+      {data.narrative_error && (
+        <p className="text-xs text-gray-500 dark:text-gray-400">AI explanation unavailable: {data.narrative_error}</p>
+      )}
     </div>
   );
 
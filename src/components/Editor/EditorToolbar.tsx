@@ -9,6 +9,8 @@ interface EditorToolbarProps {
   onExplain?: () => void;
   onOptimize?: () => void;
   onAnalyze?: () => void;
+  onCancel?: () => void;
+  onRunScript?: () => void;
   isExecuting: boolean;
 }
 
@@ -21,6 +23,8 @@ const EditorToolbar: React.FC<EditorToolbarProps> = ({
   onExplain,
   onOptimize,
   onAnalyze,
+  onCancel,
+  onRunScript,
   isExecuting,
 }) => {
   return (
@@ -38,6 +42,27 @@ const EditorToolbar: React.FC<EditorToolbarProps> = ({
           {isExecuting ? 'Executing...' : 'Run (⌘↵)'}
         </button>
 
+        {onRunScript && (
+          <button
+            onClick={onRunScript}
+            disabled={isExecuting}
+            className="px-3 py-1.5 text-sm bg-gray-200 dark:bg-gray-700 text-gray-700 dark:text-gray-200 rounded hover:bg-gray-300 dark:hover:bg-gray-600 transition disabled:opacity-50"
+            title="Run each statement in sequence, in one transaction"
+          >
+            Run Script
+          </button>
+        )}
+
+        {isExecuting && onCancel && (
+          <button
+            onClick={onCancel}
+            className="px-3 py-1.5 text-sm font-medium bg-red-600 text-white rounded hover:bg-red-700 transition"
+            title="Cancel running query"
+          >
+            Cancel
+          </button>
+        )}
+
         <button
           onClick={onFormat}
           className="px-3 py-1.5 text-sm bg-gray-200 dark:bg-gray-700 text-gray-700 dark:text-gray-200 rounded hover:bg-gray-300 dark:hover:bg-gray-600 transition"
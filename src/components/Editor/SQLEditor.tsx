@@ -14,6 +14,8 @@ interface SQLEditorProps {
   onExplain?: () => void;
   onOptimize?: () => void;
   onAnalyze?: () => void;
+  onCancel?: () => void;
+  onRunScript?: (script: string) => void;
   isExecuting: boolean;
   theme?: 'light' | 'dark';
   connectionId?: number;
@@ -30,6 +32,8 @@ const SQLEditor: React.FC<SQLEditorProps> = ({
   onExplain,
   onOptimize,
   onAnalyze,
+  onCancel,
+  onRunScript,
   isExecuting,
   theme = 'dark',
   connectionId,
@@ -210,6 +214,8 @@ const SQLEditor: React.FC<SQLEditorProps> = ({
         onExplain={onExplain}
         onOptimize={onOptimize}
         onAnalyze={onAnalyze}
+        onCancel={onCancel}
+        onRunScript={onRunScript ? () => onRunScript(value) : undefined}
         isExecuting={isExecuting}
       />
 
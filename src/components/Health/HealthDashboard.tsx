@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
-import { databaseAPI } from '../../services/api';
+import React, { useState, useEffect, useRef } from 'react';
+import { databaseAPI, waitForJob } from '../../services/api';
+import { HealthAnalysis } from '../../types';
 
 interface HealthDashboardProps {
   connectionId: number;
@@ -9,22 +10,45 @@ interface HealthDashboardProps {
 const HealthDashboard: React.FC<HealthDashboardProps> = ({ connectionId, onClose }) => {
   const [loading, setLoading] = useState(true);
   const [healthData, setHealthData] = useState<any>(null);
+  const [aiAnalysis, setAiAnalysis] = useState<HealthAnalysis | null>(null);
+  const [aiLoading, setAiLoading] = useState(false);
+  const [exactBloat, setExactBloat] = useState(false);
+  const loadCounter = useRef(0);
   const [activeTab, setActiveTab] = useState<'overview' | 'bloat' | 'indexes' | 'cache'>('overview');
 
   useEffect(() => {
     loadHealthData();
-  }, [connectionId]);
+  }, [connectionId, exactBloat]);
 
   const loadHealthData = async () => {
+    const load = ++loadCounter.current;
     setLoading(true);
+    setAiAnalysis(null);
+    let aiJobId: string | null = null;
     try {
-      const response = await databaseAPI.getHealth(connectionId);
+      const response = await databaseAPI.getHealth(connectionId, exactBloat);
+      if (load !== loadCounter.current) return;
       setHealthData(response.data);
+      aiJobId = response.data.ai_job_id;
     } catch (error) {
       console.error('Failed to load health data:', error);
     } finally {
       setLoading(false);
     }
+
+    // Raw stats are shown right away; the AI verdict arrives when its job finishes
+    if (!aiJobId) return;
+    setAiLoading(true);
+    try {
+      const analysis = await waitForJob<HealthAnalysis>(aiJobId);
+      if (load === loadCounter.current) setAiAnalysis(analysis);
+    } catch (error: any) {
+      if (load === loadCounter.current) {
+        setAiAnalysis({ success: false, error: error.response?.data?.error } as HealthAnalysis);
+      }
+    } finally {
+      if (load === loadCounter.current) setAiLoading(false);
+    }
   };
 
   const getHealthColor = (score: number) => {
@@ -57,7 +81,13 @@ const HealthDashboard: React.FC<HealthDashboardProps> = ({ connectionId, onClose
   };
 
   const renderOverview = () => {
-    const aiAnalysis = healthData?.ai_analysis;
+    if (aiLoading) {
+      return (
+        <div className="p-8 text-center text-gray-500 dark:text-gray-400">
+          ⏳ AI analysis in progress...
+        </div>
+      );
+    }
     if (!aiAnalysis?.success) {
       return (
         <div className="p-8 text-center text-gray-500 dark:text-gray-400">
@@ -157,18 +187,68 @@ const HealthDashboard: React.FC<HealthDashboardProps> = ({ connectionId, onClose
     );
   };
 
+  const formatBytes = (bytes: number | null | undefined) => {
+    if (!bytes) return '0 B';
+    const units = ['B', 'kB', 'MB', 'GB', 'TB'];
+    const exponent = Math.min(Math.floor(Math.log(bytes) / Math.log(1024)), units.length - 1);
+    return `${(bytes / Math.pow(1024, exponent)).toFixed(exponent ? 1 : 0)} ${units[exponent]}`;
+  };
+
+  const getBloatColor = (percent: number) =>
+    percent > 30
+      ? 'text-red-600 dark:text-red-400 font-bold'
+      : percent > 10
+      ? 'text-yellow-600 dark:text-yellow-400'
+      : 'text-green-600 dark:text-green-400';
+
   const renderBloatTab = () => {
     const tables = healthData?.bloat?.tables || [];
+    const indexes = healthData?.bloat?.indexes || [];
     const bloatedTables = tables.filter((t: any) => t.bloat_percent > 10);
+    const bloatedIndexes = indexes.filter((i: any) => i.bloat_percent > 10);
+    const wastedBytes = [...tables, ...indexes].reduce((sum: number, r: any) => sum + (r.bloat_bytes || 0), 0);
+
+    // Estimates without planner statistics fall back to defaults and are flagged rather than hidden
+    const renderBloatCell = (row: any) => (
+      <td className="px-4 py-3">
+        <span className={getBloatColor(row.bloat_percent)}>{row.bloat_percent}%</span>
+        {row.stats_missing && (
+          <span className="ml-1 text-xs text-gray-500 dark:text-gray-400" title="Not analyzed yet; run ANALYZE">
+            (no stats)
+          </span>
+        )}
+        {row.estimate_source === 'pgstattuple_approx' && (
+          <span className="ml-1 text-xs text-gray-500 dark:text-gray-400" title={`Scanned ${row.scanned_percent}% of the table`}>
+            (measured)
+          </span>
+        )}
+      </td>
+    );
 
     return (
       <div className="space-y-4">
-        <div className="bg-blue-50 dark:bg-blue-900/20 border border-blue-200 dark:border-blue-800 rounded-lg p-4">
+        <div className="bg-blue-50 dark:bg-blue-900/20 border border-blue-200 dark:border-blue-800 rounded-lg p-4 flex items-center justify-between">
           <p className="text-sm text-blue-700 dark:text-blue-400">
-            Found {bloatedTables.length} tables with &gt;10% bloat
+            Found {bloatedTables.length} tables and {bloatedIndexes.length} indexes with &gt;10% bloat,{' '}
+            {formatBytes(wastedBytes)} wasted in total
           </p>
+          <label className="flex items-center gap-2 text-sm text-blue-700 dark:text-blue-400">
+            <input
+              type="checkbox"
+              checked={exactBloat}
+              onChange={(e) => setExactBloat(e.target.checked)}
+              className="rounded"
+            />
+            Measure tables with pgstattuple
+          </label>
         </div>
 
+        {healthData?.bloat?.exact_error && (
+          <div className="bg-yellow-50 dark:bg-yellow-900/20 border border-yellow-200 dark:border-yellow-800 rounded-lg p-3 text-xs text-yellow-700 dark:text-yellow-400">
+            {healthData.bloat.exact_error}
+          </div>
+        )}
+
         <div className="overflow-x-auto">
           <table className="w-full text-sm">
             <thead className="bg-gray-100 dark:bg-gray-800">
@@ -182,6 +262,9 @@ const HealthDashboard: React.FC<HealthDashboardProps> = ({ connectionId, onClose
                 <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
                   Bloat %
                 </th>
+                <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
+                  Wasted
+                </th>
                 <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
                   Dead Tuples
                 </th>
@@ -195,20 +278,12 @@ const HealthDashboard: React.FC<HealthDashboardProps> = ({ connectionId, onClose
                 <tr key={idx} className="border-b border-gray-200 dark:border-gray-700">
                   <td className="px-4 py-3 font-medium">{table.tablename}</td>
                   <td className="px-4 py-3">{table.total_size}</td>
+                  {renderBloatCell(table)}
+                  <td className="px-4 py-3">{formatBytes(table.bloat_bytes)}</td>
                   <td className="px-4 py-3">
-                    <span
-                      className={
-                        table.bloat_percent > 30
-                          ? 'text-red-600 dark:text-red-400 font-bold'
-                          : table.bloat_percent > 10
-                          ? 'text-yellow-600 dark:text-yellow-400'
-                          : 'text-green-600 dark:text-green-400'
-                      }
-                    >
-                      {table.bloat_percent}%
-                    </span>
+                    {table.n_dead_tup?.toLocaleString()}
+                    <span className="ml-1 text-xs text-gray-500 dark:text-gray-400">({table.dead_tuple_percent}%)</span>
                   </td>
-                  <td className="px-4 py-3">{table.n_dead_tup?.toLocaleString()}</td>
                   <td className="px-4 py-3 text-xs">
                     {table.last_autovacuum
                       ? new Date(table.last_autovacuum).toLocaleString()
@@ -219,6 +294,43 @@ const HealthDashboard: React.FC<HealthDashboardProps> = ({ connectionId, onClose
             </tbody>
           </table>
         </div>
+
+        {indexes.length > 0 && (
+          <div className="overflow-x-auto">
+            <table className="w-full text-sm">
+              <thead className="bg-gray-100 dark:bg-gray-800">
+                <tr>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
+                    Index
+                  </th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
+                    Table
+                  </th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
+                    Size
+                  </th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
+                    Bloat %
+                  </th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">
+                    Wasted
+                  </th>
+                </tr>
+              </thead>
+              <tbody>
+                {indexes.map((index: any, idx: number) => (
+                  <tr key={idx} className="border-b border-gray-200 dark:border-gray-700">
+                    <td className="px-4 py-3 font-medium">{index.indexname}</td>
+                    <td className="px-4 py-3">{index.tablename}</td>
+                    <td className="px-4 py-3">{index.total_size}</td>
+                    {renderBloatCell(index)}
+                    <td className="px-4 py-3">{formatBytes(index.bloat_bytes)}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        )}
       </div>
     );
   };
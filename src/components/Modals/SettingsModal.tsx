@@ -221,6 +221,48 @@ const SettingsModal: React.FC<SettingsModalProps> = ({
                   className="w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded focus:outline-none focus:ring-2 focus:ring-blue-500 bg-white dark:bg-gray-700 text-gray-800 dark:text-gray-200"
                 />
               </div>
+
+              <div>
+                <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-1">
+                  Max Rows per Result
+                </label>
+                <input
+                  type="number"
+                  value={settings.query_max_rows ?? 100000}
+                  onChange={(e) =>
+                    setSettings({ ...settings, query_max_rows: parseInt(e.target.value) })
+                  }
+                  className="w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded focus:outline-none focus:ring-2 focus:ring-blue-500 bg-white dark:bg-gray-700 text-gray-800 dark:text-gray-200"
+                />
+              </div>
+
+              <div>
+                <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-1">
+                  Max Result Size (MB)
+                </label>
+                <input
+                  type="number"
+                  value={settings.query_max_mb ?? 256}
+                  onChange={(e) =>
+                    setSettings({ ...settings, query_max_mb: parseInt(e.target.value) })
+                  }
+                  className="w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded focus:outline-none focus:ring-2 focus:ring-blue-500 bg-white dark:bg-gray-700 text-gray-800 dark:text-gray-200"
+                />
+              </div>
+
+              <div>
+                <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-1">
+                  Capture Plans Slower Than (ms, 0 = off)
+                </label>
+                <input
+                  type="number"
+                  value={settings.plan_capture_threshold_ms ?? 1000}
+                  onChange={(e) =>
+                    setSettings({ ...settings, plan_capture_threshold_ms: parseInt(e.target.value) })
+                  }
+                  className="w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded focus:outline-none focus:ring-2 focus:ring-blue-500 bg-white dark:bg-gray-700 text-gray-800 dark:text-gray-200"
+                />
+              </div>
             </div>
           </div>
 
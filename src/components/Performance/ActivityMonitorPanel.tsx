@@ -0,0 +1,218 @@
+import React, { useState, useEffect } from 'react';
+import { ActivitySession, ActivityEvent } from '../../types';
+import { subscribeActivity } from '../../services/api';
+import WaitProfilePanel from './WaitProfilePanel';
+import LocksPanel from './LocksPanel';
+
+interface ActivityMonitorPanelProps {
+  connectionId: number;
+  onClose: () => void;
+}
+
+// pid alone is reused by the server, so sessions are keyed together with their start time
+const sessionKey = (session: { pid: number; backend_start: string }) =>
+  `${session.pid}:${session.backend_start}`;
+
+const ActivityMonitorPanel: React.FC<ActivityMonitorPanelProps> = ({ connectionId, onClose }) => {
+  const [sessions, setSessions] = useState<Map<string, ActivitySession>>(new Map());
+  const [serverTime, setServerTime] = useState<string | null>(null);
+  const [intervalSeconds, setIntervalSeconds] = useState(2);
+  const [showIdle, setShowIdle] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+  const [connected, setConnected] = useState(false);
+  const [showWaitProfile, setShowWaitProfile] = useState(false);
+  const [showLocks, setShowLocks] = useState(false);
+
+  useEffect(() => {
+    setConnected(false);
+    const close = subscribeActivity(connectionId, intervalSeconds, (event: ActivityEvent) => {
+      if (event.type === 'error') {
+        setError(event.error);
+        return;
+      }
+      setError(null);
+      setConnected(true);
+      setServerTime(event.server_time);
+      if (event.type === 'snapshot') {
+        setSessions(new Map(event.sessions.map((s) => [sessionKey(s), s])));
+        return;
+      }
+      setSessions((previous) => {
+        const next = new Map(previous);
+        event.removed.forEach((s) => next.delete(sessionKey(s)));
+        [...event.added, ...event.changed].forEach((s) => next.set(sessionKey(s), s));
+        return next;
+      });
+    });
+    return close;
+  }, [connectionId, intervalSeconds]);
+
+  // Durations use the server's clock so client clock skew does not distort them
+  const formatDuration = (since: string | null) => {
+    if (!since || !serverTime) return '-';
+    const seconds = Math.max(0, (new Date(serverTime).getTime() - new Date(since).getTime()) / 1000);
+    if (seconds < 60) return `${seconds.toFixed(1)}s`;
+    if (seconds < 3600) return `${Math.floor(seconds / 60)}m ${Math.floor(seconds % 60)}s`;
+    return `${Math.floor(seconds / 3600)}h ${Math.floor((seconds % 3600) / 60)}m`;
+  };
+
+  const getStateColor = (state: string | null) => {
+    if (state === 'active') return 'text-green-600 dark:text-green-400 font-semibold';
+    if (state?.startsWith('idle in transaction')) return 'text-orange-600 dark:text-orange-400 font-semibold';
+    return 'text-gray-500 dark:text-gray-400';
+  };
+
+  const visible = Array.from(sessions.values())
+    .filter((s) => showIdle || s.state !== 'idle')
+    .sort((a, b) => (a.query_start || '').localeCompare(b.query_start || ''));
+
+  return (
+    <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50 p-4">
+      <div className="bg-white dark:bg-gray-900 rounded-lg shadow-xl max-w-6xl w-full max-h-[90vh] flex flex-col">
+        {/* Header */}
+        <div className="flex items-center justify-between p-6 border-b border-gray-200 dark:border-gray-700">
+          <div className="flex items-center gap-2">
+            <span className="text-2xl">📡</span>
+            <h2 className="text-xl font-semibold text-gray-800 dark:text-gray-100">
+              Live Activity
+            </h2>
+          </div>
+          <button
+            onClick={onClose}
+            className="text-gray-500 hover:text-gray-700 dark:text-gray-400 dark:hover:text-gray-200 text-2xl"
+          >
+            ×
+          </button>
+        </div>
+
+        {/* Filters */}
+        <div className="flex items-center gap-4 p-4 border-b border-gray-200 dark:border-gray-700 bg-gray-50 dark:bg-gray-800">
+          <label className="flex items-center gap-2 text-sm text-gray-700 dark:text-gray-300">
+            Refresh:
+            <select
+              value={intervalSeconds}
+              onChange={(e) => setIntervalSeconds(parseFloat(e.target.value))}
+              className="px-2 py-1 border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700"
+            >
+              <option value={1}>1s</option>
+              <option value={2}>2s</option>
+              <option value={5}>5s</option>
+              <option value={10}>10s</option>
+            </select>
+          </label>
+
+          <label className="flex items-center gap-2 text-sm text-gray-700 dark:text-gray-300">
+            <input
+              type="checkbox"
+              checked={showIdle}
+              onChange={(e) => setShowIdle(e.target.checked)}
+              className="rounded"
+            />
+            Show idle sessions
+          </label>
+
+          <button
+            onClick={() => setShowWaitProfile(true)}
+            className="px-3 py-1 bg-orange-100 hover:bg-orange-200 dark:bg-orange-900/30 dark:hover:bg-orange-900/50 text-orange-700 dark:text-orange-300 text-sm rounded"
+            title="Sample wait events at high frequency"
+          >
+            🔥 Profile waits
+          </button>
+
+          <button
+            onClick={() => setShowLocks(true)}
+            className="px-3 py-1 bg-red-100 hover:bg-red-200 dark:bg-red-900/30 dark:hover:bg-red-900/50 text-red-700 dark:text-red-300 text-sm rounded"
+            title="Blocking trees and root blockers"
+          >
+            🔒 Locks
+          </button>
+
+          <div className="flex-1" />
+
+          <div className="text-sm text-gray-600 dark:text-gray-400 flex items-center gap-2">
+            <span
+              className={`px-2 py-1 rounded text-xs ${
+                connected
+                  ? 'bg-green-100 dark:bg-green-900/30 text-green-700 dark:text-green-300'
+                  : 'bg-gray-200 dark:bg-gray-700 text-gray-600 dark:text-gray-300'
+              }`}
+            >
+              {connected ? '● Live' : 'Connecting...'}
+            </span>
+            <span>
+              {visible.length} of {sessions.size} sessions
+            </span>
+          </div>
+        </div>
+
+        {error && (
+          <div className="px-4 py-2 text-xs text-red-700 dark:text-red-300 bg-red-50 dark:bg-red-900/20 border-b border-gray-200 dark:border-gray-700">
+            {error}
+          </div>
+        )}
+
+        {/* Content */}
+        <div className="flex-1 overflow-y-auto">
+          {visible.length === 0 ? (
+            <div className="p-8 text-center text-gray-500 dark:text-gray-400">
+              {connected ? 'No sessions to show.' : 'Waiting for the first sample...'}
+            </div>
+          ) : (
+            <table className="w-full text-sm">
+              <thead className="bg-gray-100 dark:bg-gray-800 sticky top-0">
+                <tr>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200 w-20">PID</th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200 w-32">User</th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200 w-36">State</th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200 w-40">Wait</th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200 w-24">Query</th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200 w-24">Xact</th>
+                  <th className="px-4 py-3 text-left font-semibold text-gray-700 dark:text-gray-200">Statement</th>
+                </tr>
+              </thead>
+              <tbody>
+                {visible.map((s) => (
+                  <tr
+                    key={sessionKey(s)}
+                    className="border-b border-gray-200 dark:border-gray-700 hover:bg-gray-50 dark:hover:bg-gray-800"
+                  >
+                    <td className="px-4 py-2 font-mono text-xs text-gray-700 dark:text-gray-300">{s.pid}</td>
+                    <td className="px-4 py-2 text-xs text-gray-700 dark:text-gray-300">
+                      {s.username}
+                      {s.application_name && (
+                        <div className="text-gray-400 dark:text-gray-500">{s.application_name}</div>
+                      )}
+                    </td>
+                    <td className={`px-4 py-2 text-xs ${getStateColor(s.state)}`}>{s.state || '-'}</td>
+                    <td className="px-4 py-2 text-xs text-gray-600 dark:text-gray-400">
+                      {s.wait_event ? `${s.wait_event_type}: ${s.wait_event}` : '-'}
+                    </td>
+                    <td className="px-4 py-2 text-xs text-gray-700 dark:text-gray-300">
+                      {s.state === 'active' ? formatDuration(s.query_start) : '-'}
+                    </td>
+                    <td className="px-4 py-2 text-xs text-gray-700 dark:text-gray-300">
+                      {formatDuration(s.xact_start)}
+                    </td>
+                    <td className="px-4 py-2">
+                      <div className="font-mono text-xs text-gray-800 dark:text-gray-200 truncate max-w-xl" title={s.query || ''}>
+                        {s.query}
+                      </div>
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          )}
+        </div>
+      </div>
+
+      {showWaitProfile && (
+        <WaitProfilePanel connectionId={connectionId} onClose={() => setShowWaitProfile(false)} />
+      )}
+
+      {showLocks && <LocksPanel connectionId={connectionId} onClose={() => setShowLocks(false)} />}
+    </div>
+  );
+};
+
+export default ActivityMonitorPanel;
@@ -0,0 +1,215 @@
+import React, { useState, useEffect } from 'react';
+import { LockNode, LockTree, LockHistory } from '../../types';
+import { locksAPI } from '../../services/api';
+
+interface LocksPanelProps {
+  connectionId: number;
+  onClose: () => void;
+}
+
+const REFRESH_INTERVAL_MS = 3000;
+
+const formatSeconds = (seconds: number | null | undefined) => {
+  if (seconds === null || seconds === undefined) return '-';
+  if (seconds < 60) return `${seconds.toFixed(1)}s`;
+  if (seconds < 3600) return `${Math.floor(seconds / 60)}m ${Math.floor(seconds % 60)}s`;
+  return `${Math.floor(seconds / 3600)}h ${Math.floor((seconds % 3600) / 60)}m`;
+};
+
+const LockNodeRow: React.FC<{ node: LockNode; depth: number }> = ({ node, depth }) => (
+  <>
+    <div
+      className="flex items-start gap-3 py-1 text-xs border-b border-gray-100 dark:border-gray-800"
+      style={{ paddingLeft: `${depth * 20}px` }}
+    >
+      <span className="font-mono text-gray-700 dark:text-gray-300 w-16 shrink-0">
+        {depth > 0 && '└ '}
+        {node.pid}
+      </span>
+      <span
+        className={`w-36 shrink-0 ${
+          node.state?.startsWith('idle in transaction')
+            ? 'text-orange-600 dark:text-orange-400 font-semibold'
+            : 'text-gray-600 dark:text-gray-400'
+        }`}
+      >
+        {node.state || '-'}
+      </span>
+      <span className="w-56 shrink-0 text-gray-600 dark:text-gray-400">
+        {node.mode ? `waits ${node.mode} on ${node.relation || node.locktype}` : `holds for ${formatSeconds(node.xact_seconds)}`}
+      </span>
+      <span className="w-20 shrink-0 text-red-600 dark:text-red-400">
+        {node.wait_seconds !== null ? formatSeconds(node.wait_seconds) : ''}
+      </span>
+      <span className="font-mono text-gray-800 dark:text-gray-200 truncate" title={node.query || ''}>
+        {node.query}
+      </span>
+    </div>
+    {node.blocking.map((child) => (
+      <LockNodeRow key={`${node.pid}-${child.pid}`} node={child} depth={depth + 1} />
+    ))}
+  </>
+);
+
+const LocksPanel: React.FC<LocksPanelProps> = ({ connectionId, onClose }) => {
+  const [tree, setTree] = useState<LockTree | null>(null);
+  const [history, setHistory] = useState<LockHistory | null>(null);
+  const [windowSeconds, setWindowSeconds] = useState(3600);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    const load = async () => {
+      try {
+        const [treeResponse, historyResponse] = await Promise.all([
+          locksAPI.getTree(connectionId),
+          locksAPI.getHistory(connectionId, windowSeconds),
+        ]);
+        setTree(treeResponse.data);
+        setHistory(historyResponse.data);
+        setError(null);
+      } catch (err: any) {
+        setError(err.response?.data?.error || 'Failed to load locks');
+      }
+    };
+    load();
+    const timer = setInterval(load, REFRESH_INTERVAL_MS);
+    return () => clearInterval(timer);
+  }, [connectionId, windowSeconds]);
+
+  return (
+    <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50 p-4">
+      <div className="bg-white dark:bg-gray-900 rounded-lg shadow-xl max-w-6xl w-full max-h-[90vh] flex flex-col">
+        {/* Header */}
+        <div className="flex items-center justify-between p-6 border-b border-gray-200 dark:border-gray-700">
+          <div className="flex items-center gap-2">
+            <span className="text-2xl">🔒</span>
+            <h2 className="text-xl font-semibold text-gray-800 dark:text-gray-100">Lock Contention</h2>
+          </div>
+          <button
+            onClick={onClose}
+            className="text-gray-500 hover:text-gray-700 dark:text-gray-400 dark:hover:text-gray-200 text-2xl"
+          >
+            ×
+          </button>
+        </div>
+
+        {/* Filters */}
+        <div className="flex items-center gap-4 p-4 border-b border-gray-200 dark:border-gray-700 bg-gray-50 dark:bg-gray-800">
+          <label className="flex items-center gap-2 text-sm text-gray-700 dark:text-gray-300">
+            History:
+            <select
+              value={windowSeconds}
+              onChange={(e) => setWindowSeconds(parseInt(e.target.value))}
+              className="px-2 py-1 border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700"
+            >
+              <option value={900}>Last 15 min</option>
+              <option value={3600}>Last hour</option>
+              <option value={21600}>Last 6 hours</option>
+              <option value={86400}>Last 24 hours</option>
+            </select>
+          </label>
+
+          <div className="flex-1" />
+
+          {tree && (
+            <div className="text-sm text-gray-600 dark:text-gray-400 flex items-center gap-2">
+              {tree.deadlock && (
+                <span className="px-2 py-1 bg-red-100 dark:bg-red-900/30 text-red-700 dark:text-red-300 rounded text-xs">
+                  Lock cycle
+                </span>
+              )}
+              <span>
+                {tree.waiting_count} waiting · {tree.root_count} root blocker(s)
+              </span>
+            </div>
+          )}
+        </div>
+
+        {error && (
+          <div className="px-4 py-2 text-xs text-red-700 dark:text-red-300 bg-red-50 dark:bg-red-900/20 border-b border-gray-200 dark:border-gray-700">
+            {error}
+          </div>
+        )}
+
+        {/* Content */}
+        <div className="flex-1 overflow-y-auto p-6 space-y-6">
+          <div>
+            <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">Blocking now</h3>
+            {!tree ? (
+              <div className="text-sm text-gray-500 dark:text-gray-400">Loading locks...</div>
+            ) : tree.roots.length === 0 ? (
+              <div className="text-sm text-gray-500 dark:text-gray-400">No session is waiting on a lock.</div>
+            ) : (
+              <div className="space-y-4">
+                {tree.roots.map((root) => (
+                  <div
+                    key={`${root.pid}:${root.backend_start}`}
+                    className="border border-gray-200 dark:border-gray-700 rounded-lg p-3"
+                  >
+                    <div className="text-xs text-gray-600 dark:text-gray-400 mb-2">
+                      {root.deadlock ? 'Lock cycle through' : 'Root blocker'} pid {root.pid} holds up{' '}
+                      <span className="font-semibold text-red-600 dark:text-red-400">
+                        {root.blocked_count} session(s)
+                      </span>{' '}
+                      ({root.directly_blocked} directly, chain depth {root.depth}), {formatSeconds(root.blocked_wait_seconds)}{' '}
+                      of waiting in total, longest {formatSeconds(root.max_wait_seconds)}
+                    </div>
+                    <LockNodeRow node={root} depth={0} />
+                  </div>
+                ))}
+              </div>
+            )}
+          </div>
+
+          {history && (
+            <div>
+              <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">
+                Worst root blockers in the window
+                {history.sampler.sampling && (
+                  <span className="ml-2 font-normal text-xs text-gray-500 dark:text-gray-400">
+                    sampled every {history.sampler.interval_seconds}s
+                  </span>
+                )}
+              </h3>
+              {history.episodes.length === 0 ? (
+                <div className="text-sm text-gray-500 dark:text-gray-400">No lock waits were sampled in this window.</div>
+              ) : (
+                <table className="w-full text-xs">
+                  <thead className="bg-gray-100 dark:bg-gray-800">
+                    <tr>
+                      <th className="px-2 py-2 text-left font-semibold text-gray-700 dark:text-gray-200">PID</th>
+                      <th className="px-2 py-2 text-left font-semibold text-gray-700 dark:text-gray-200">Seen</th>
+                      <th className="px-2 py-2 text-left font-semibold text-gray-700 dark:text-gray-200">Max blocked</th>
+                      <th className="px-2 py-2 text-left font-semibold text-gray-700 dark:text-gray-200">Blocked time</th>
+                      <th className="px-2 py-2 text-left font-semibold text-gray-700 dark:text-gray-200">Query</th>
+                    </tr>
+                  </thead>
+                  <tbody>
+                    {history.episodes.map((episode) => (
+                      <tr key={episode.id} className="border-b border-gray-200 dark:border-gray-700">
+                        <td className="px-2 py-1 font-mono text-gray-700 dark:text-gray-300">{episode.pid}</td>
+                        <td className="px-2 py-1 text-gray-600 dark:text-gray-400">
+                          {new Date(episode.first_seen * 1000).toLocaleTimeString()} for{' '}
+                          {formatSeconds(episode.last_seen - episode.first_seen)}
+                        </td>
+                        <td className="px-2 py-1 text-gray-700 dark:text-gray-300">{episode.max_blocked}</td>
+                        <td className="px-2 py-1 text-gray-700 dark:text-gray-300">
+                          ~{formatSeconds(episode.blocked_session_seconds)}
+                        </td>
+                        <td className="px-2 py-1 font-mono text-gray-800 dark:text-gray-200 truncate max-w-md" title={episode.query || ''}>
+                          {episode.query}
+                        </td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+              )}
+            </div>
+          )}
+        </div>
+      </div>
+    </div>
+  );
+};
+
+export default LocksPanel;
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { QueryHistory } from '../../types';
-import { historyAPI, aiAPI } from '../../services/api';
+import { historyAPI, aiAPI, locksAPI } from '../../services/api';
+import LocksPanel from './LocksPanel';
 
 interface SlowQueriesPanelProps {
   connectionId: number;
@@ -23,18 +24,39 @@ const SlowQueriesPanel: React.FC<SlowQueriesPanelProps> = ({
   const [dataSource, setDataSource] = useState<string>('none');
   const [availableSources, setAvailableSources] = useState<string[]>([]);
   const [selectedSource, setSelectedSource] = useState<string>('auto');
+  // 0 means cumulative counters since the last pg_stat_statements reset
+  const [windowSeconds, setWindowSeconds] = useState<number>(0);
+  const [windowNote, setWindowNote] = useState<string | null>(null);
+  // Sessions waiting on locks right now; their queries look slow but are only queued
+  const [lockWaiters, setLockWaiters] = useState(0);
+  const [showLocks, setShowLocks] = useState(false);
 
   useEffect(() => {
     loadSlowQueries();
-  }, [connectionId, minTime, selectedSource]);
+  }, [connectionId, minTime, selectedSource, windowSeconds]);
 
   const loadSlowQueries = async () => {
     setLoading(true);
     try {
-      const response = await historyAPI.getSlowQueries(connectionId, minTime, 50, selectedSource);
+      const response = await historyAPI.getSlowQueries(
+        connectionId,
+        minTime,
+        50,
+        selectedSource,
+        windowSeconds || undefined
+      );
       setSlowQueries(response.data.queries || []);
+      setWindowNote(
+        windowSeconds && response.data.window_error
+          ? `Window unavailable (${response.data.window_error}); showing totals since the last stats reset`
+          : null
+      );
       setDataSource(response.data.source || 'none');
       setAvailableSources(response.data.sources_available || []);
+      locksAPI
+        .getTree(connectionId)
+        .then((locks) => setLockWaiters(locks.data.waiting_count || 0))
+        .catch(() => setLockWaiters(0));
     } catch (error) {
       console.error('Failed to load slow queries:', error);
     } finally {
@@ -264,6 +286,22 @@ const SlowQueriesPanel: React.FC<SlowQueriesPanelProps> = ({
             </select>
           </label>
 
+          <label className="flex items-center gap-2 text-sm text-gray-700 dark:text-gray-300">
+            Window:
+            <select
+              value={windowSeconds}
+              onChange={(e) => setWindowSeconds(parseInt(e.target.value))}
+              disabled={selectedSource === 'history'}
+              className="px-2 py-1 border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700"
+            >
+              <option value={0}>Since stats reset</option>
+              <option value={900}>Last 15 min</option>
+              <option value={3600}>Last hour</option>
+              <option value={21600}>Last 6 hours</option>
+              <option value={86400}>Last 24 hours</option>
+            </select>
+          </label>
+
           <div className="flex-1" />
 
           <div className="text-sm text-gray-600 dark:text-gray-400 flex items-center gap-2">
@@ -276,6 +314,24 @@ const SlowQueriesPanel: React.FC<SlowQueriesPanelProps> = ({
           </div>
         </div>
 
+        {lockWaiters > 0 && (
+          <div className="px-4 py-2 text-xs text-red-700 dark:text-red-300 bg-red-50 dark:bg-red-900/20 border-b border-gray-200 dark:border-gray-700 flex items-center gap-2">
+            <span>
+              {lockWaiters} session(s) are waiting on locks right now; some of these queries may be slow only because
+              they are blocked.
+            </span>
+            <button onClick={() => setShowLocks(true)} className="underline font-semibold">
+              View blocking tree
+            </button>
+          </div>
+        )}
+
+        {windowNote && (
+          <div className="px-4 py-2 text-xs text-yellow-700 dark:text-yellow-300 bg-yellow-50 dark:bg-yellow-900/20 border-b border-gray-200 dark:border-gray-700">
+            {windowNote}
+          </div>
+        )}
+
         {/* Content */}
         <div className="flex-1 overflow-y-auto">
           {loading ? (
@@ -442,6 +498,8 @@ const SlowQueriesPanel: React.FC<SlowQueriesPanelProps> = ({
           </div>
         </div>
       </div>
+
+      {showLocks && <LocksPanel connectionId={connectionId} onClose={() => setShowLocks(false)} />}
     </div>
   );
 };
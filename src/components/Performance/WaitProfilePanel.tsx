@@ -0,0 +1,293 @@
+import React, { useState } from 'react';
+import { WaitProfile } from '../../types';
+import { waitProfileAPI } from '../../services/api';
+
+interface WaitProfilePanelProps {
+  connectionId: number;
+  onClose: () => void;
+}
+
+interface FlameNode {
+  name: string;
+  samples: number;
+  children: FlameNode[];
+}
+
+const WAIT_TYPE_COLORS: Record<string, string> = {
+  CPU: 'bg-green-500',
+  Lock: 'bg-red-500',
+  LWLock: 'bg-orange-500',
+  IO: 'bg-blue-500',
+  IPC: 'bg-purple-500',
+  Client: 'bg-gray-400',
+  Timeout: 'bg-yellow-500',
+  BufferPin: 'bg-pink-500',
+  Activity: 'bg-teal-500',
+  Extension: 'bg-indigo-500',
+};
+
+const colorFor = (waitType: string) => WAIT_TYPE_COLORS[waitType] || 'bg-gray-500';
+
+// Fold collapsed stacks ("a;b;c" with a count) into a tree, children sorted largest first
+const buildFlameTree = (stacks: WaitProfile['stacks']): FlameNode => {
+  const root: FlameNode = { name: 'all', samples: 0, children: [] };
+  stacks.forEach(({ stack, samples }) => {
+    root.samples += samples;
+    let node = root;
+    stack.split(';').forEach((frame) => {
+      let child = node.children.find((c) => c.name === frame);
+      if (!child) {
+        child = { name: frame, samples: 0, children: [] };
+        node.children.push(child);
+      }
+      child.samples += samples;
+      node = child;
+    });
+  });
+  const sort = (node: FlameNode) => {
+    node.children.sort((a, b) => b.samples - a.samples);
+    node.children.forEach(sort);
+  };
+  sort(root);
+  return root;
+};
+
+// Icicle layout: each frame spans its share of its parent's width, callees below callers
+const FlameFrame: React.FC<{ node: FlameNode; total: number; depth: number; waitType?: string }> = ({
+  node,
+  total,
+  depth,
+  waitType,
+}) => {
+  const percent = (node.samples / total) * 100;
+  // The third frame of each stack is the wait class, which colours it and the wait events below it
+  const frameWaitType = depth === 3 ? node.name : waitType;
+  const color = frameWaitType ? colorFor(frameWaitType) : 'bg-gray-300 dark:bg-gray-600';
+  return (
+    <div style={{ width: `${percent}%` }} className="min-w-0">
+      <div
+        className={`h-6 border border-white dark:border-gray-900 px-1 text-xs truncate ${color} ${
+          frameWaitType ? 'text-white' : 'text-gray-800 dark:text-gray-100'
+        }`}
+        title={`${node.name}: ${node.samples} samples (${percent.toFixed(1)}%)`}
+      >
+        {node.name}
+      </div>
+      <div className="flex">
+        {node.children.map((child) => (
+          <FlameFrame
+            key={child.name}
+            node={child}
+            total={node.samples}
+            depth={depth + 1}
+            waitType={frameWaitType}
+          />
+        ))}
+      </div>
+    </div>
+  );
+};
+
+const WaitProfilePanel: React.FC<WaitProfilePanelProps> = ({ connectionId, onClose }) => {
+  const [seconds, setSeconds] = useState(10);
+  const [hz, setHz] = useState(20);
+  const [running, setRunning] = useState(false);
+  const [profile, setProfile] = useState<WaitProfile | null>(null);
+  const [error, setError] = useState<string | null>(null);
+
+  const runProfile = async () => {
+    setRunning(true);
+    setError(null);
+    try {
+      setProfile(await waitProfileAPI.run(connectionId, seconds, hz));
+    } catch (err: any) {
+      setError(err.response?.data?.error || err.message || 'Failed to profile wait events');
+    } finally {
+      setRunning(false);
+    }
+  };
+
+  const downloadCollapsed = () => {
+    if (!profile) return;
+    const url = URL.createObjectURL(new Blob([profile.collapsed + '\n'], { type: 'text/plain' }));
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = `wait-profile-${connectionId}.folded`;
+    link.click();
+    URL.revokeObjectURL(url);
+  };
+
+  const flameTree = profile ? buildFlameTree(profile.stacks) : null;
+
+  return (
+    <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50 p-4">
+      <div className="bg-white dark:bg-gray-900 rounded-lg shadow-xl max-w-6xl w-full max-h-[90vh] flex flex-col">
+        {/* Header */}
+        <div className="flex items-center justify-between p-6 border-b border-gray-200 dark:border-gray-700">
+          <div className="flex items-center gap-2">
+            <span className="text-2xl">🔥</span>
+            <h2 className="text-xl font-semibold text-gray-800 dark:text-gray-100">Wait Event Profile</h2>
+          </div>
+          <button
+            onClick={onClose}
+            className="text-gray-500 hover:text-gray-700 dark:text-gray-400 dark:hover:text-gray-200 text-2xl"
+          >
+            ×
+          </button>
+        </div>
+
+        {/* Filters */}
+        <div className="flex items-center gap-4 p-4 border-b border-gray-200 dark:border-gray-700 bg-gray-50 dark:bg-gray-800">
+          <label className="flex items-center gap-2 text-sm text-gray-700 dark:text-gray-300">
+            Duration:
+            <select
+              value={seconds}
+              onChange={(e) => setSeconds(parseInt(e.target.value))}
+              disabled={running}
+              className="px-2 py-1 border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700"
+            >
+              <option value={5}>5s</option>
+              <option value={10}>10s</option>
+              <option value={30}>30s</option>
+              <option value={60}>60s</option>
+            </select>
+          </label>
+
+          <label className="flex items-center gap-2 text-sm text-gray-700 dark:text-gray-300">
+            Rate:
+            <select
+              value={hz}
+              onChange={(e) => setHz(parseInt(e.target.value))}
+              disabled={running}
+              className="px-2 py-1 border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700"
+            >
+              <option value={10}>10 Hz</option>
+              <option value={20}>20 Hz</option>
+              <option value={50}>50 Hz</option>
+              <option value={100}>100 Hz</option>
+            </select>
+          </label>
+
+          <button
+            onClick={runProfile}
+            disabled={running}
+            className="px-3 py-1 bg-blue-600 hover:bg-blue-700 disabled:opacity-50 text-white text-sm rounded"
+          >
+            {running ? `Sampling for ${seconds}s...` : 'Start profile'}
+          </button>
+
+          <div className="flex-1" />
+
+          {profile && (
+            <div className="text-sm text-gray-600 dark:text-gray-400 flex items-center gap-3">
+              <span>
+                {profile.average_active_sessions.toFixed(2)} avg active sessions · {profile.samples.toLocaleString()}{' '}
+                samples at {profile.achieved_hz.toFixed(0)} Hz
+                {profile.missed_ticks > 0 && ` (${profile.missed_ticks} ticks missed)`}
+              </span>
+              <button onClick={downloadCollapsed} className="text-blue-600 dark:text-blue-400 hover:underline text-xs">
+                Download stacks
+              </button>
+            </div>
+          )}
+        </div>
+
+        {error && (
+          <div className="px-4 py-2 text-xs text-red-700 dark:text-red-300 bg-red-50 dark:bg-red-900/20 border-b border-gray-200 dark:border-gray-700">
+            {error}
+          </div>
+        )}
+
+        {/* Content */}
+        <div className="flex-1 overflow-y-auto p-6 space-y-6">
+          {!profile ? (
+            <div className="p-8 text-center text-gray-500 dark:text-gray-400">
+              {running
+                ? 'Sampling pg_stat_activity...'
+                : 'Start a profile to see what active sessions spend their time on.'}
+            </div>
+          ) : profile.samples === 0 ? (
+            <div className="p-8 text-center text-gray-500 dark:text-gray-400">
+              No active sessions were seen during the profile.
+            </div>
+          ) : (
+            <>
+              <div>
+                <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">Wait classes</h3>
+                <div className="flex h-6 rounded overflow-hidden">
+                  {profile.wait_types.map((w) => (
+                    <div
+                      key={w.wait_type}
+                      className={colorFor(w.wait_type)}
+                      style={{ width: `${w.percent}%` }}
+                      title={`${w.wait_type}: ${w.percent.toFixed(1)}%`}
+                    />
+                  ))}
+                </div>
+                <div className="flex flex-wrap gap-3 mt-2 text-xs text-gray-600 dark:text-gray-400">
+                  {profile.wait_types.map((w) => (
+                    <span key={w.wait_type} className="flex items-center gap-1">
+                      <span className={`inline-block w-3 h-3 rounded ${colorFor(w.wait_type)}`} />
+                      {w.wait_type} {w.percent.toFixed(1)}% ({w.average_active_sessions.toFixed(2)} AAS)
+                    </span>
+                  ))}
+                </div>
+              </div>
+
+              {flameTree && (
+                <div>
+                  <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">
+                    Backend → query → wait class → wait event
+                  </h3>
+                  <FlameFrame node={flameTree} total={flameTree.samples} depth={0} />
+                </div>
+              )}
+
+              <div className="grid grid-cols-2 gap-6">
+                <div>
+                  <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">Top wait events</h3>
+                  <table className="w-full text-xs">
+                    <tbody>
+                      {profile.wait_events.map((w) => (
+                        <tr
+                          key={`${w.wait_event_type}:${w.wait_event}`}
+                          className="border-b border-gray-200 dark:border-gray-700"
+                        >
+                          <td className="py-1 text-gray-800 dark:text-gray-200">
+                            {w.wait_event ? `${w.wait_event_type}: ${w.wait_event}` : w.wait_event_type}
+                          </td>
+                          <td className="py-1 text-right text-gray-600 dark:text-gray-400">
+                            {w.percent.toFixed(1)}%{w.error > 0 && ` ±${((w.error / profile.samples) * 100).toFixed(1)}`}
+                          </td>
+                        </tr>
+                      ))}
+                    </tbody>
+                  </table>
+                </div>
+                <div>
+                  <h3 className="text-sm font-semibold text-gray-700 dark:text-gray-300 mb-2">Top queries</h3>
+                  <table className="w-full text-xs">
+                    <tbody>
+                      {profile.queries.map((q) => (
+                        <tr key={q.query_id} className="border-b border-gray-200 dark:border-gray-700">
+                          <td className="py-1 font-mono text-gray-800 dark:text-gray-200 truncate max-w-xs" title={q.query || ''}>
+                            {q.query}
+                          </td>
+                          <td className="py-1 text-right text-gray-600 dark:text-gray-400 w-24">
+                            {q.average_active_sessions.toFixed(2)} AAS
+                          </td>
+                        </tr>
+                      ))}
+                    </tbody>
+                  </table>
+                </div>
+              </div>
+            </>
+          )}
+        </div>
+      </div>
+    </div>
+  );
+};
+
+export default WaitProfilePanel;
@@ -1,11 +1,11 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { QueryTab as QueryTabType, QueryResult } from '../../types';
 import SQLEditor from '../Editor/SQLEditor';
 import ResultsGrid from '../Results/ResultsGrid';
 import QueryHistory from '../History/QueryHistory';
 import FavoriteQueries from '../History/FavoriteQueries';
 import InsightsPanel from '../AIAssistant/InsightsPanel';
-import { queryAPI, favoritesAPI, aiAPI } from '../../services/api';
+import { queryAPI, favoritesAPI, aiAPI, executeScript } from '../../services/api';
 
 interface QueryTabProps {
   tab: QueryTabType;
@@ -32,13 +32,18 @@ const QueryTab: React.FC<QueryTabProps> = ({
     data: any;
   } | null>(null);
   const [isAIProcessing, setIsAIProcessing] = useState(false);
+  const runningQueryId = useRef<string | null>(null);
+  const [executedQuery, setExecutedQuery] = useState<string | undefined>(undefined);
 
   const handleExecute = async (query: string) => {
     if (!query.trim()) return;
 
+    const queryId = crypto.randomUUID();
+    runningQueryId.current = queryId;
     setIsExecuting(true);
     try {
-      const response = await queryAPI.execute(connectionId, query);
+      const response = await queryAPI.execute(connectionId, query, undefined, undefined, queryId);
+      setExecutedQuery(query);
       onResultChange(response.data);
     } catch (error: any) {
       onResultChange({
@@ -46,10 +51,68 @@ const QueryTab: React.FC<QueryTabProps> = ({
         error: error.response?.data?.error || 'Failed to execute query',
       });
     } finally {
+      runningQueryId.current = null;
       setIsExecuting(false);
     }
   };
 
+  // Show a script run as a results table with one row per statement, updated as each one finishes
+  const handleRunScript = async (script: string) => {
+    if (!script.trim()) return;
+
+    const queryId = crypto.randomUUID();
+    runningQueryId.current = queryId;
+    setIsExecuting(true);
+    const statements: any[] = [];
+    const columns = ['#', 'line', 'statement', 'status', 'rows', 'time (s)', 'error'];
+    const publish = (extra: Partial<QueryResult> = {}) =>
+      onResultChange({
+        success: true,
+        columns,
+        rows: [...statements],
+        row_count: statements.length,
+        ...extra,
+      });
+
+    try {
+      await executeScript(connectionId, script, { queryId }, (event) => {
+        if (event.type === 'statement') {
+          statements.push({
+            '#': (event.index ?? 0) + 1,
+            line: event.line,
+            statement: event.statement,
+            status: event.success ? event.status : 'ERROR',
+            rows: event.row_count,
+            'time (s)': event.execution_time,
+            error: event.error || null,
+          });
+          publish();
+        } else if (event.type === 'done') {
+          publish({ execution_time: event.execution_time });
+        } else if (event.type === 'error') {
+          onResultChange({ success: false, error: event.error });
+        }
+      });
+    } catch (error: any) {
+      onResultChange({
+        success: false,
+        error: error.response?.data?.error || 'Failed to execute script',
+      });
+    } finally {
+      runningQueryId.current = null;
+      setIsExecuting(false);
+    }
+  };
+
+  const handleCancel = async () => {
+    if (!runningQueryId.current) return;
+    try {
+      await queryAPI.cancel(connectionId, runningQueryId.current);
+    } catch (error) {
+      console.error('Failed to cancel query:', error);
+    }
+  };
+
   const handleFormat = async (query: string) => {
     try {
       const response = await queryAPI.format(connectionId, query);
@@ -129,12 +192,12 @@ const QueryTab: React.FC<QueryTabProps> = ({
     }
   };
 
-  const handleAnalyze = async () => {
+  const handleAnalyze = async (useAI = false) => {
     if (!tab.content.trim()) return;
 
     setIsAIProcessing(true);
     try {
-      const response = await aiAPI.analyzeExplain(tab.content, connectionId);
+      const response = await aiAPI.analyzeExplain(tab.content, connectionId, useAI);
       if (response.data.success) {
         setAiInsight({
           type: 'analyze',
@@ -190,7 +253,9 @@ const QueryTab: React.FC<QueryTabProps> = ({
             onShowFavorites={() => setShowFavorites(true)}
             onExplain={handleExplain}
             onOptimize={handleOptimize}
-            onAnalyze={handleAnalyze}
+            onAnalyze={() => handleAnalyze(false)}
+            onCancel={isExecuting ? handleCancel : undefined}
+            onRunScript={handleRunScript}
             isExecuting={isExecuting || isAIProcessing}
             theme={theme}
             connectionId={connectionId}
@@ -201,6 +266,8 @@ const QueryTab: React.FC<QueryTabProps> = ({
           <div className="h-1/2 border-t border-gray-200 dark:border-gray-700 overflow-hidden">
             <ResultsGrid
               result={tab.result}
+              connectionId={connectionId}
+              query={executedQuery}
               onDebugQuery={tab.result.error ? () => handleDebugQuery(tab.content, tab.result!.error!) : undefined}
             />
           </div>
@@ -229,6 +296,8 @@ const QueryTab: React.FC<QueryTabProps> = ({
           data={aiInsight.data}
           onClose={() => setAiInsight(null)}
           onInsertSQL={handleInsertSQL}
+          onRequestAI={aiInsight.type === 'analyze' ? () => handleAnalyze(true) : undefined}
+          isAIProcessing={isAIProcessing}
         />
       )}
     </>
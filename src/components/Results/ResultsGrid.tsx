@@ -1,14 +1,18 @@
 import React, { useState } from 'react';
-import { QueryResult } from '../../types';
+import { QueryResult, ExportFormat } from '../../types';
+import { downloadExport } from '../../services/api';
 
 interface ResultsGridProps {
   result: QueryResult;
+  connectionId?: number;
+  query?: string;
   onDebugQuery?: () => void;
 }
 
-const ResultsGrid: React.FC<ResultsGridProps> = ({ result, onDebugQuery }) => {
+const ResultsGrid: React.FC<ResultsGridProps> = ({ result, connectionId, query, onDebugQuery }) => {
   const [currentPage, setCurrentPage] = useState(0);
   const [pageSize, setPageSize] = useState(100);
+  const [exportFormat, setExportFormat] = useState<ExportFormat>('csv');
 
   // Helper to format cell values (especially JSON)
   const formatCellValue = (value: any): string => {
@@ -99,25 +103,10 @@ const ResultsGrid: React.FC<ResultsGridProps> = ({ result, onDebugQuery }) => {
     navigator.clipboard.writeText(JSON.stringify(row, null, 2));
   };
 
-  const handleExportCSV = () => {
-    if (!result.columns || !result.rows) return;
-
-    const csv = [
-      result.columns.join(','),
-      ...result.rows.map(row =>
-        result.columns!.map(col => {
-          const val = row[col];
-          return typeof val === 'string' && val.includes(',') ? `"${val}"` : val;
-        }).join(',')
-      ),
-    ].join('\n');
-
-    const blob = new Blob([csv], { type: 'text/csv' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `query-results-${Date.now()}.csv`;
-    a.click();
+  const handleExport = () => {
+    // The backend re-runs the query and streams every row, not just those loaded in the grid
+    if (connectionId === undefined || !query) return;
+    downloadExport(connectionId, query, exportFormat);
   };
 
   return (
@@ -128,14 +117,44 @@ const ResultsGrid: React.FC<ResultsGridProps> = ({ result, onDebugQuery }) => {
           <span>{result.row_count} rows</span>
           <span>•</span>
           <span>{result.execution_time}s</span>
+          {result.truncated && (
+            <span
+              className="px-1.5 py-0.5 text-xs rounded bg-yellow-100 dark:bg-yellow-900/30 text-yellow-700 dark:text-yellow-300"
+              title={`Stopped at the ${result.truncated_reason === 'max_bytes' ? 'size' : 'row'} limit; export to get every row`}
+            >
+              truncated
+            </span>
+          )}
+          {result.truncated && result.message && <span>{result.message}</span>}
+          {result.cache === 'hit' && (
+            <span
+              className="px-1.5 py-0.5 text-xs rounded bg-green-100 dark:bg-green-900/30 text-green-700 dark:text-green-300"
+              title="Served from the result cache"
+            >
+              cached
+            </span>
+          )}
         </div>
 
-        <button
-          onClick={handleExportCSV}
-          className="px-3 py-1 text-sm bg-blue-500 text-white rounded hover:bg-blue-600 transition"
-        >
-          Export CSV
-        </button>
+        {connectionId !== undefined && query && (
+          <div className="flex items-center space-x-2">
+            <select
+              value={exportFormat}
+              onChange={(e) => setExportFormat(e.target.value as ExportFormat)}
+              className="px-2 py-1 text-sm border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700 text-gray-700 dark:text-gray-200"
+            >
+              <option value="csv">CSV</option>
+              <option value="jsonl">JSON Lines</option>
+              <option value="sql">SQL INSERT</option>
+            </select>
+            <button
+              onClick={handleExport}
+              className="px-3 py-1 text-sm bg-blue-500 text-white rounded hover:bg-blue-600 transition"
+            >
+              Export
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Table */}
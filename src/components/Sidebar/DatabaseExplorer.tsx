@@ -5,6 +5,7 @@ import TableTree from './TableTree';
 import TableSearch from './TableSearch';
 import InsightsPanel from '../AIAssistant/InsightsPanel';
 import SlowQueriesPanel from '../Performance/SlowQueriesPanel';
+import ActivityMonitorPanel from '../Performance/ActivityMonitorPanel';
 import HealthDashboard from '../Health/HealthDashboard';
 
 interface DatabaseExplorerProps {
@@ -20,6 +21,7 @@ const DatabaseExplorer: React.FC<DatabaseExplorerProps> = ({ connectionId }) =>
   const [indexInsights, setIndexInsights] = useState<any>(null);
   const [isAnalyzing, setIsAnalyzing] = useState(false);
   const [showSlowQueries, setShowSlowQueries] = useState(false);
+  const [showActivityMonitor, setShowActivityMonitor] = useState(false);
   const [showHealthDashboard, setShowHealthDashboard] = useState(false);
 
   useEffect(() => {
@@ -111,6 +113,14 @@ const DatabaseExplorer: React.FC<DatabaseExplorerProps> = ({ connectionId }) =>
               >
                 ⏱️
               </button>
+              <button
+                onClick={() => setShowActivityMonitor(true)}
+                disabled={loading}
+                className="p-1 hover:bg-purple-100 dark:hover:bg-purple-900/30 rounded transition text-sm"
+                title="Live Activity"
+              >
+                📡
+              </button>
               <button
                 onClick={handleIndexAdvisor}
                 disabled={isAnalyzing || loading}
@@ -168,6 +178,13 @@ const DatabaseExplorer: React.FC<DatabaseExplorerProps> = ({ connectionId }) =>
         />
       )}
 
+      {showActivityMonitor && (
+        <ActivityMonitorPanel
+          connectionId={connectionId}
+          onClose={() => setShowActivityMonitor(false)}
+        />
+      )}
+
       {showHealthDashboard && (
         <HealthDashboard
           connectionId={connectionId}
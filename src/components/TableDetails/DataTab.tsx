@@ -1,6 +1,8 @@
 import React, { useState, useEffect } from 'react';
-import { QueryResult } from '../../types';
-import { queryAPI } from '../../services/api';
+import { BrowseResult } from '../../types';
+import { databaseAPI } from '../../services/api';
+
+const PAGE_SIZE = 100;
 
 interface DataTabProps {
   connectionId: number;
@@ -8,8 +10,10 @@ interface DataTabProps {
 }
 
 const DataTab: React.FC<DataTabProps> = ({ connectionId, tableName }) => {
-  const [result, setResult] = useState<QueryResult | null>(null);
+  const [result, setResult] = useState<BrowseResult | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [sort, setSort] = useState<{ column: string; direction: 'asc' | 'desc' } | null>(null);
 
   // Helper to render cell content (especially JSON)
   const renderCellContent = (value: any) => {
@@ -38,16 +42,20 @@ const DataTab: React.FC<DataTabProps> = ({ connectionId, tableName }) => {
 
   useEffect(() => {
     loadData();
-  }, [connectionId, tableName]);
+  }, [connectionId, tableName, sort]);
+
+  const fetchPage = (cursor?: string) =>
+    databaseAPI.browseRows(connectionId, tableName, {
+      pageSize: PAGE_SIZE,
+      sort: sort?.column,
+      direction: sort?.direction,
+      cursor,
+    });
 
   const loadData = async () => {
     setLoading(true);
     try {
-      const response = await queryAPI.execute(
-        connectionId,
-        `SELECT * FROM ${tableName}`,
-        10
-      );
+      const response = await fetchPage();
       setResult(response.data);
     } catch (error: any) {
       setResult({
@@ -59,6 +67,37 @@ const DataTab: React.FC<DataTabProps> = ({ connectionId, tableName }) => {
     }
   };
 
+  const loadMore = async () => {
+    if (!result?.next_cursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetchPage(result.next_cursor);
+      setResult({
+        ...response.data,
+        rows: [...(result.rows || []), ...(response.data.rows || [])],
+        row_count: (result.row_count || 0) + (response.data.row_count || 0),
+      });
+    } catch (error: any) {
+      setResult({
+        ...result,
+        has_more: false,
+        error: error.response?.data?.error || 'Failed to load more rows',
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const toggleSort = (column: string) => {
+    if (sort?.column !== column) {
+      setSort({ column, direction: 'asc' });
+    } else if (sort.direction === 'asc') {
+      setSort({ column, direction: 'desc' });
+    } else {
+      setSort(null);
+    }
+  };
+
   if (loading) {
     return <div className="p-6 text-gray-500 dark:text-gray-400">Loading...</div>;
   }
@@ -87,9 +126,11 @@ const DataTab: React.FC<DataTabProps> = ({ connectionId, tableName }) => {
             {result.columns.map((col) => (
               <th
                 key={col}
-                className="px-4 py-2 text-left font-semibold text-gray-700 dark:text-gray-200 border-b border-gray-300 dark:border-gray-600"
+                onClick={() => toggleSort(col)}
+                className="px-4 py-2 text-left font-semibold text-gray-700 dark:text-gray-200 border-b border-gray-300 dark:border-gray-600 cursor-pointer select-none"
               >
                 {col}
+                {sort?.column === col && (sort.direction === 'asc' ? ' ▲' : ' ▼')}
               </th>
             ))}
           </tr>
@@ -109,11 +150,19 @@ const DataTab: React.FC<DataTabProps> = ({ connectionId, tableName }) => {
           ))}
         </tbody>
       </table>
-      {result.rows && result.rows.length >= 10 && (
-        <div className="p-4 text-center text-sm text-gray-500 dark:text-gray-400">
-          Showing first 10 rows
-        </div>
-      )}
+      <div className="p-4 text-center text-sm text-gray-500 dark:text-gray-400">
+        Showing {result.rows?.length.toLocaleString() || 0} rows
+        {result.has_more && (
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="ml-3 px-3 py-1 rounded bg-blue-600 text-white hover:bg-blue-700 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
+        {result.error && <span className="ml-3 text-red-600 dark:text-red-400">{result.error}</span>}
+      </div>
     </div>
   );
 };
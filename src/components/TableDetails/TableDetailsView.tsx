@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { Column, Index, Relation } from '../../types';
+import { Column, Index, Relation, TableStats } from '../../types';
 import { databaseAPI } from '../../services/api';
 import DataTab from './DataTab';
 import StructureTab from './StructureTab';
@@ -24,7 +24,7 @@ const TableDetailsView: React.FC<TableDetailsViewProps> = ({
   const [indexes, setIndexes] = useState<Index[]>([]);
   const [relations, setRelations] = useState<Relation[]>([]);
   const [ddl, setDdl] = useState<string>('');
-  const [stats, setStats] = useState<{ row_count: number; size: string } | null>(null);
+  const [stats, setStats] = useState<TableStats | null>(null);
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
@@ -34,19 +34,25 @@ const TableDetailsView: React.FC<TableDetailsViewProps> = ({
   const loadTableInfo = async () => {
     setLoading(true);
     try {
-      const [columnsRes, indexesRes, relationsRes, ddlRes, statsRes] = await Promise.all([
-        databaseAPI.getColumns(connectionId, tableName),
-        databaseAPI.getIndexes(connectionId, tableName),
-        databaseAPI.getRelations(connectionId, tableName),
-        databaseAPI.getDDL(connectionId, tableName),
-        databaseAPI.getStats(connectionId, tableName),
-      ]);
+      const params = { table: tableName };
+      const { data } = await databaseAPI.batch(connectionId, {
+        columns: { op: 'columns', params },
+        indexes: { op: 'indexes', params },
+        relations: { op: 'relations', params },
+        ddl: { op: 'ddl', params },
+        stats: { op: 'stats', params },
+      });
+      const results = data.results;
 
-      setColumns(columnsRes.data);
-      setIndexes(indexesRes.data);
-      setRelations([...relationsRes.data.outgoing, ...relationsRes.data.incoming]);
-      setDdl(ddlRes.data.ddl);
-      setStats(statsRes.data);
+      // Each section is filled independently so one failing catalog query doesn't blank the others
+      if (results.columns.success) setColumns(results.columns.data);
+      if (results.indexes.success) setIndexes(results.indexes.data);
+      if (results.relations.success) setRelations([...results.relations.data.outgoing, ...results.relations.data.incoming]);
+      if (results.ddl.success) setDdl(results.ddl.data.ddl);
+      if (results.stats.success) setStats(results.stats.data);
+      Object.entries(results)
+        .filter(([, result]) => !result.success)
+        .forEach(([name, result]) => console.error(`Failed to load table ${name}:`, result.error));
     } catch (error) {
       console.error('Failed to load table info:', error);
     } finally {
@@ -65,7 +71,7 @@ const TableDetailsView: React.FC<TableDetailsViewProps> = ({
             </h2>
             {stats && (
               <p className="text-sm text-gray-500 dark:text-gray-400">
-                {stats.row_count.toLocaleString()} rows • {stats.size}
+                {stats.row_count_estimated ? '~' : ''}{stats.row_count.toLocaleString()} rows • {stats.size}
               </p>
             )}
           </div>
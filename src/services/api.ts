@@ -6,11 +6,33 @@ import type {
   Index,
   Relation,
   QueryResult,
+  ActiveQuery,
+  Job,
+  BatchItem,
+  BatchResult,
+  ExplainPlan,
+  PlanFinding,
+  PlanFingerprint,
+  CapturedPlan,
+  StatementWindowStats,
+  StatementSeriesPoint,
+  ActivityEvent,
+  WaitProfile,
+  LockTree,
+  LockHistory,
+  IndexAdvice,
+  ResultFormat,
+  ExportFormat,
+  ImportPreview,
+  ScriptEvent,
   QueryHistory,
   FavoriteQuery,
   AIConversation,
   Settings,
   AutoCompleteData,
+  BrowseFilter,
+  BrowseResult,
+  TableStats,
 } from '../types';
 
 const API_BASE_URL = 'http://localhost:5001/api';
@@ -22,6 +44,37 @@ const api = axios.create({
   },
 });
 
+// Background jobs: slow endpoints accept ?async=1 and return a job id to poll
+const JOB_POLL_INTERVAL_MS = 500;
+
+export const jobsAPI = {
+  get: (jobId: string) => api.get<Job>(`/jobs/${jobId}`),
+};
+
+// Poll a job until it finishes and resolve with its result
+export async function waitForJob<T = any>(jobId: string): Promise<T> {
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    const { data: job } = await jobsAPI.get(jobId);
+    if (job.status === 'done') {
+      return job.result as T;
+    }
+    if (job.status === 'error') {
+      throw { response: { data: { error: job.error } } };
+    }
+  }
+}
+
+// Start an endpoint as a job and resolve with its response once the job finishes
+export async function runAsJob<T>(path: string, body?: any): Promise<{ data: T }> {
+  const started = await api.post<{ job_id: string }>(`${path}?async=1`, body);
+  const { status_code, body: result } = await waitForJob(started.data.job_id);
+  if (status_code >= 400) {
+    throw { response: { status: status_code, data: result } };
+  }
+  return { data: result as T };
+}
+
 // Connection Management
 export const connectionAPI = {
   getAll: () => api.get<Connection[]>('/connections'),
@@ -45,49 +98,175 @@ export const databaseAPI = {
     ),
   getDDL: (connectionId: number, tableName: string) =>
     api.get<{ ddl: string }>(`/connections/${connectionId}/tables/${tableName}/ddl`),
+  browseRows: (
+    connectionId: number,
+    tableName: string,
+    params: {
+      pageSize?: number;
+      sort?: string;
+      direction?: 'asc' | 'desc';
+      cursor?: string;
+      filters?: BrowseFilter[];
+    } = {}
+  ) =>
+    api.get<BrowseResult>(`/connections/${connectionId}/tables/${tableName}/rows`, {
+      params: {
+        page_size: params.pageSize,
+        sort: params.sort,
+        direction: params.direction,
+        cursor: params.cursor,
+        filters: params.filters ? JSON.stringify(params.filters) : undefined,
+      },
+    }),
   getStats: (connectionId: number, tableName: string) =>
-    api.get<{ row_count: number; size: string }>(`/connections/${connectionId}/tables/${tableName}/stats`),
+    api.get<TableStats>(`/connections/${connectionId}/tables/${tableName}/stats`),
+  getAllTableStats: (connectionId: number) =>
+    api.get<{ success: boolean; tables: TableStats[]; error?: string }>(`/connections/${connectionId}/table-stats`),
+  countRows: (connectionId: number, tableName: string, samplePercent?: number, timeoutSeconds?: number, queryId?: string) =>
+    api.post<{
+      success: boolean;
+      query_id?: string;
+      row_count?: number;
+      row_count_estimated?: boolean;
+      cancelled?: boolean;
+      error?: string;
+    }>(`/connections/${connectionId}/tables/${tableName}/count`, {
+      sample_percent: samplePercent,
+      timeout_seconds: timeoutSeconds,
+      query_id: queryId,
+    }),
+  // Several catalog operations or queries in one round trip, run concurrently on the server
+  batch: (connectionId: number, items: Record<string, BatchItem>) =>
+    api.post<BatchResult>(`/connections/${connectionId}/batch`, { items }),
   getAutocomplete: (connectionId: number) =>
     api.get<AutoCompleteData>(`/connections/${connectionId}/autocomplete`),
   refreshSchema: (connectionId: number) =>
     api.post<{ success: boolean; message: string; table_count: number }>(
       `/connections/${connectionId}/refresh-schema`
     ),
-  getHealth: (connectionId: number) =>
+  getHealth: (connectionId: number, exactBloat = false) =>
     api.get<{
       success: boolean;
       bloat: any;
       indexes: any;
       cache: any;
-      ai_analysis: {
-        success: boolean;
-        health_score: number;
-        grade: string;
-        critical_issues: any[];
-        action_items: Array<{
-          priority: string;
-          title: string;
-          description: string;
-          fix_sql?: string;
-          impact: string;
-        }>;
-        summary: string;
-      };
-    }>(`/connections/${connectionId}/health`),
+      ai_job_id: string;
+    }>(`/connections/${connectionId}/health`, { params: { exact_bloat: exactBloat ? 1 : undefined } }),
 };
 
 // Query Execution
 export const queryAPI = {
-  execute: (connectionId: number, query: string, limit?: number) =>
-    api.post<QueryResult>(`/connections/${connectionId}/query`, { query, limit }),
+  execute: (
+    connectionId: number,
+    query: string,
+    limit?: number,
+    format?: ResultFormat,
+    queryId?: string,
+    cache?: boolean
+  ) =>
+    api.post<QueryResult>(`/connections/${connectionId}/query`, { query, limit, format, query_id: queryId, cache }),
+  cancel: (connectionId: number, queryId: string) =>
+    api.post<{ success: boolean; query_id: string }>(`/connections/${connectionId}/queries/${queryId}/cancel`),
+  getActive: (connectionId: number) => api.get<ActiveQuery[]>(`/connections/${connectionId}/queries`),
   format: (connectionId: number, query: string) =>
     api.post<{ formatted: string }>(`/connections/${connectionId}/format-sql`, { query }),
+  exportToFile: (connectionId: number, query: string, format: ExportFormat, tableName?: string) =>
+    api.post<{ job_id: string; query_id: string; path: string }>(`/connections/${connectionId}/export`, {
+      query,
+      format,
+      table_name: tableName,
+      destination: 'file',
+    }),
+};
+
+// Run a multi-statement script, calling onEvent for each NDJSON progress line as it arrives
+export async function executeScript(
+  connectionId: number,
+  script: string,
+  options: { mode?: 'transaction' | 'autocommit'; stopOnError?: boolean; queryId?: string },
+  onEvent: (event: ScriptEvent) => void
+): Promise<void> {
+  const response = await fetch(`${API_BASE_URL}/connections/${connectionId}/script`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      script,
+      mode: options.mode || 'transaction',
+      stop_on_error: options.stopOnError ?? true,
+      query_id: options.queryId,
+    }),
+  });
+  if (!response.ok || !response.body) {
+    const body = await response.json().catch(() => ({}));
+    throw { response: { status: response.status, data: body } };
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || '';
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+// Stream an export straight to the browser's download manager, without buffering it in the page
+export function downloadExport(connectionId: number, query: string, format: ExportFormat, tableName?: string) {
+  const form = document.createElement('form');
+  form.method = 'POST';
+  form.action = `${API_BASE_URL}/connections/${connectionId}/export`;
+  form.style.display = 'none';
+  const fields: Record<string, string> = { query, format, table_name: tableName || 'export' };
+  Object.entries(fields).forEach(([name, value]) => {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+  });
+  document.body.appendChild(form);
+  form.submit();
+  form.remove();
+}
+
+// File Import
+export const importAPI = {
+  preview: (connectionId: number, file: File) => {
+    const form = new FormData();
+    form.append('file', file);
+    return api.post<ImportPreview>(`/connections/${connectionId}/import/preview`, form, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+  },
+  start: (
+    connectionId: number,
+    file: File,
+    options: { tableName: string; createTable: boolean; columns?: string[]; types?: string[]; sheet?: string }
+  ) => {
+    const form = new FormData();
+    form.append('file', file);
+    form.append('table_name', options.tableName);
+    form.append('create_table', String(options.createTable));
+    if (options.columns) form.append('columns', JSON.stringify(options.columns));
+    if (options.types) form.append('types', JSON.stringify(options.types));
+    if (options.sheet) form.append('sheet', options.sheet);
+    return api.post<{ job_id: string; query_id: string; columns: string[]; types: string[] }>(
+      `/connections/${connectionId}/import`,
+      form,
+      { headers: { 'Content-Type': 'multipart/form-data' } }
+    );
+  },
 };
 
 // AI Features
 export const aiAPI = {
   generateSQL: (prompt: string, connectionId?: number) =>
-    api.post<{ success: boolean; sql?: string; error?: string }>('/ai/generate-sql', {
+    runAsJob<{ success: boolean; sql?: string; error?: string }>('/ai/generate-sql', {
       prompt,
       connection_id: connectionId,
     }),
@@ -95,12 +274,12 @@ export const aiAPI = {
     api.get<AIConversation[]>(`/ai/conversations/${connectionId}`),
   deleteConversation: (conversationId: number) => api.delete(`/ai/conversations/${conversationId}`),
   explainQuery: (query: string, connectionId?: number) =>
-    api.post<{ success: boolean; explanation?: string; error?: string }>('/ai/explain-query', {
+    runAsJob<{ success: boolean; explanation?: string; error?: string }>('/ai/explain-query', {
       query,
       connection_id: connectionId,
     }),
   debugQuery: (query: string, error: string, connectionId?: number) =>
-    api.post<{ success: boolean; fixed_query?: string; explanation?: string; error?: string }>(
+    runAsJob<{ success: boolean; fixed_query?: string; explanation?: string; error?: string }>(
       '/ai/debug-query',
       {
         query,
@@ -109,7 +288,7 @@ export const aiAPI = {
       }
     ),
   optimizeQuery: (query: string, connectionId?: number, executionTime?: number) =>
-    api.post<{
+    runAsJob<{
       success: boolean;
       original_query?: string;
       optimized_query?: string;
@@ -121,36 +300,32 @@ export const aiAPI = {
       connection_id: connectionId,
       execution_time: executionTime,
     }),
-  analyzeExplain: (query: string, connectionId: number) =>
-    api.post<{
+  // Rule-based analysis by default; useAI adds the model's review of the plan and the local findings
+  analyzeExplain: (query: string, connectionId: number, useAI = false) =>
+    runAsJob<{
       success: boolean;
       insights?: string[];
       bottlenecks?: string[];
       recommendations?: string[];
       summary?: string;
+      source?: 'local' | 'ai';
+      findings?: PlanFinding[];
       plan_text?: string;
       plan_json?: any;
+      plan?: ExplainPlan;
       error?: string;
     }>('/ai/analyze-explain', {
       query,
       connection_id: connectionId,
+      use_ai: useAI,
     }),
-  suggestIndexes: (connectionId: number) =>
-    api.post<{
-      success: boolean;
-      recommendations?: Array<{
-        table?: string;
-        columns?: string[];
-        reason?: string;
-        create_statement?: string;
-      }>;
-      analyzed_queries?: number;
-      error?: string;
-    }>('/ai/suggest-indexes', {
+  suggestIndexes: (connectionId: number, useAI = true) =>
+    runAsJob<IndexAdvice>('/ai/suggest-indexes', {
       connection_id: connectionId,
+      use_ai: useAI,
     }),
   analyzeSlowQueries: (connectionId: number, queries: any[]) =>
-    api.post<{
+    runAsJob<{
       success: boolean;
       analyses?: Array<{
         query_number: number;
@@ -172,12 +347,93 @@ export const aiAPI = {
 export const historyAPI = {
   get: (connectionId: number) => api.get<QueryHistory[]>(`/history/${connectionId}`),
   delete: (historyId: number) => api.delete(`/history/${historyId}`),
-  getSlowQueries: (connectionId: number, minTime: number = 1.0, limit: number = 50, source: string = 'auto') =>
+  // windowSeconds ranks pg_stat_statements activity over that recent window instead of since the last stats reset
+  getSlowQueries: (
+    connectionId: number,
+    minTime: number = 1.0,
+    limit: number = 50,
+    source: string = 'auto',
+    windowSeconds?: number
+  ) =>
     api.get<{
       queries: QueryHistory[];
       source: string;
       sources_available: string[];
-    }>(`/connections/${connectionId}/slow-queries?min_time=${minTime}&limit=${limit}&source=${source}`),
+      window_seconds?: number;
+      window_error?: string;
+    }>(`/connections/${connectionId}/slow-queries`, {
+      params: { min_time: minTime, limit, source, window: windowSeconds },
+    }),
+};
+
+// pg_stat_statements deltas from the backend's periodic snapshots
+export const statementStatsAPI = {
+  get: (
+    connectionId: number,
+    windowSeconds: number = 3600,
+    order: 'total_time' | 'mean_time' | 'calls' | 'rows' = 'total_time',
+    limit: number = 50
+  ) =>
+    api.get<StatementWindowStats>(`/connections/${connectionId}/statement-stats`, {
+      params: { window: windowSeconds, order, limit },
+    }),
+  getSeries: (connectionId: number, queryid: number, windowSeconds: number = 3600) =>
+    api.get<{ queryid: number; series: StatementSeriesPoint[] }>(
+      `/connections/${connectionId}/statement-stats/${queryid}/series`,
+      { params: { window: windowSeconds } }
+    ),
+};
+
+// Live pg_stat_activity over Server-Sent Events: a snapshot first, then a diff per poll; returns a close function
+export const subscribeActivity = (
+  connectionId: number,
+  intervalSeconds: number,
+  onEvent: (event: ActivityEvent) => void
+) => {
+  const source = new EventSource(
+    `${API_BASE_URL}/connections/${connectionId}/activity/stream?interval=${intervalSeconds}`
+  );
+  ['snapshot', 'diff', 'error'].forEach((type) =>
+    source.addEventListener(type, (e) => {
+      // The browser's own connection errors arrive as plain Events without data and retry by themselves
+      const data = (e as MessageEvent).data;
+      if (data) onEvent(JSON.parse(data));
+    })
+  );
+  return () => source.close();
+};
+
+// Lock waits as blocking trees, plus what the background lock sampler recorded
+export const locksAPI = {
+  getTree: (connectionId: number) => api.get<LockTree>(`/connections/${connectionId}/locks`),
+  getHistory: (connectionId: number, windowSeconds: number = 3600, limit: number = 50) =>
+    api.get<LockHistory>(`/connections/${connectionId}/locks/history`, {
+      params: { window: windowSeconds, limit },
+    }),
+};
+
+// Sample wait events of active sessions for a few seconds; resolves with the profile once the job finishes
+export const waitProfileAPI = {
+  run: async (connectionId: number, seconds: number = 10, hz: number = 20, topK: number = 20) => {
+    const started = await api.post<{ job_id: string }>(`/connections/${connectionId}/wait-profile`, {
+      seconds,
+      hz,
+      top_k: topK,
+    });
+    return waitForJob<WaitProfile>(started.data.job_id);
+  },
+};
+
+// Plans captured in the background for slow queries, grouped by query fingerprint
+export const plansAPI = {
+  getFingerprints: (connectionId: number, limit: number = 100) =>
+    api.get<{ fingerprints: PlanFingerprint[] }>(`/connections/${connectionId}/plans`, { params: { limit } }),
+  getHistory: (connectionId: number, fingerprint: string, limit: number = 50) =>
+    api.get<{ fingerprint: string; plans: CapturedPlan[] }>(`/connections/${connectionId}/plans/${fingerprint}`, {
+      params: { limit },
+    }),
+  getRegressions: (connectionId: number, limit: number = 50) =>
+    api.get<{ regressions: CapturedPlan[] }>(`/connections/${connectionId}/plan-regressions`, { params: { limit } }),
 };
 
 // Favorites
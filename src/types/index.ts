@@ -8,6 +8,10 @@ export interface Connection {
   password?: string;
   ssl_enabled?: boolean;
   color?: string;
+  pool_min_size?: number;
+  pool_max_size?: number;
+  statement_timeout_ms?: number;
+  lock_timeout_ms?: number;
   created_at?: string;
   last_used?: string;
 }
@@ -32,6 +36,20 @@ export interface Index {
   definition: string;
 }
 
+export interface TableStats {
+  row_count: number;
+  row_count_estimated?: boolean;
+  size: string;
+  schema?: string;
+  name?: string;
+  relpages?: number;
+  total_bytes?: number;
+  heap_bytes?: number;
+  toast_bytes?: number;
+  index_bytes?: number;
+  last_analyzed?: string | null;
+}
+
 export interface Relation {
   constraint_name: string;
   column_name: string;
@@ -41,21 +59,419 @@ export interface Relation {
   referenced_column_name?: string;
 }
 
+export interface ColumnType {
+  name: string;
+  type_oid: number;
+  type: string;
+  category: string;
+}
+
+export type ResultFormat = 'objects' | 'arrays' | 'columnar';
+
+export type ExportFormat = 'csv' | 'jsonl' | 'sql';
+
+export interface ImportPreview {
+  success: boolean;
+  columns: string[];
+  types: string[];
+  sample: (string | null)[][];
+  sampled_rows: number;
+}
+
+export interface ImportProgress {
+  read: number;
+  imported: number;
+  rejected: number;
+  bytes_read: number;
+  total_bytes: number;
+}
+
+export interface ScriptStatementTiming {
+  index: number;
+  line: number;
+  success: boolean;
+  row_count?: number | null;
+  execution_time: number;
+  error?: string | null;
+}
+
+export interface ScriptEvent {
+  type: 'start' | 'statement' | 'done' | 'error';
+  query_id?: string;
+  statement_count?: number;
+  mode?: 'transaction' | 'autocommit';
+  index?: number;
+  line?: number;
+  statement?: string;
+  success?: boolean;
+  row_count?: number;
+  status?: string;
+  columns?: string[];
+  rows?: any[][];
+  error?: string;
+  cancelled?: boolean;
+  execution_time?: number;
+  committed?: boolean | null;
+  executed?: number;
+  statements?: ScriptStatementTiming[];
+}
+
 export interface QueryResult {
   success: boolean;
+  query_id?: string;
+  cancelled?: boolean;
+  cache?: 'hit' | 'miss' | 'bypass';
+  truncated?: boolean;
+  truncated_reason?: 'max_rows' | 'max_bytes';
   columns?: string[];
+  column_types?: ColumnType[];
+  format?: ResultFormat;
   rows?: any[];
+  column_data?: any[][];
   row_count?: number;
   execution_time?: number;
   error?: string;
   message?: string;
 }
 
+export interface ActiveQuery {
+  query_id: string;
+  connection_id: number;
+  pid: number;
+  query: string;
+  started_at: number;
+  duration: number;
+}
+
+export interface Job<T = any> {
+  job_id: string;
+  kind: string;
+  status: 'pending' | 'running' | 'done' | 'error';
+  progress?: any;
+  result?: T;
+  error?: string;
+  created_at: number;
+  finished_at?: number;
+}
+
+export interface BatchItem {
+  op?: 'tables' | 'columns' | 'indexes' | 'relations' | 'ddl' | 'stats' | 'table_stats'
+    | 'running_queries' | 'locks' | 'bloat' | 'index_health' | 'cache_hit_ratio' | 'query';
+  params?: Record<string, any>;
+}
+
+export interface BatchItemResult<T = any> {
+  success: boolean;
+  data?: T;
+  error?: string;
+  execution_time: number;
+}
+
+export interface BatchResult {
+  success: boolean;
+  results: Record<string, BatchItemResult>;
+  execution_time: number;
+}
+
+export interface ExplainPlanNode {
+  node_type: string;
+  label: string;
+  relation?: string;
+  schema?: string;
+  alias?: string;
+  index_name?: string;
+  parent_relationship?: string;
+  subplan_name?: string;
+  startup_cost: number;
+  total_cost: number;
+  plan_rows: number;
+  actual_rows: number;
+  loops: number;
+  total_rows: number;
+  row_estimate_ratio: number | null;
+  misestimate_factor: number | null;
+  under_limit: boolean;
+  total_time_ms: number;
+  exclusive_time_ms: number;
+  exclusive_time_percent: number | null;
+  buffers: Record<string, number>;
+  exclusive_buffers: Record<string, number>;
+  details: Record<string, any>;
+  children: ExplainPlanNode[];
+}
+
+export interface ExplainPlan {
+  planning_time_ms: number | null;
+  execution_time_ms: number | null;
+  buffer_totals: Record<string, number>;
+  node_count: number;
+  triggers: any[];
+  root: ExplainPlanNode;
+}
+
+export interface PlanFinding {
+  rule: 'seq_scan' | 'row_misestimate' | 'disk_spill' | 'nested_loop' | 'low_buffer_hits';
+  severity: 'high' | 'medium' | 'low';
+  node: string;
+  message: string;
+  recommendation: string;
+  metrics: Record<string, number>;
+}
+
+export interface PlanRegression {
+  reasons: ('shape_changed' | 'cost_increased' | 'slower')[];
+  previous_plan_id: number;
+  previous_shape_hash: string;
+  previous_cost: number;
+  cost: number;
+  cost_ratio: number | null;
+  previous_execution_time: number | null;
+  execution_time: number;
+}
+
+export interface CapturedPlan {
+  id: number;
+  connection_id: number;
+  fingerprint: string;
+  query: string;
+  shape_hash: string;
+  total_cost: number;
+  execution_time: number;
+  regression: PlanRegression | null;
+  captured_at: string;
+  plan?: ExplainPlan;
+  plan_json?: any;
+}
+
+export interface PlanFingerprint {
+  fingerprint: string;
+  query: string;
+  captures: number;
+  shapes: number;
+  min_cost: number;
+  max_cost: number;
+  max_execution_time: number;
+  regressions: number;
+  last_captured_at: string;
+}
+
+export interface StatementActivity {
+  queryid: number;
+  query: string;
+  calls: number;
+  total_time_ms: number;
+  mean_time_ms: number;
+  rows: number;
+  calls_per_second: number;
+  rows_per_second: number;
+}
+
+export interface StatementWindowStats {
+  success: boolean;
+  error?: string;
+  from?: number;
+  to?: number;
+  window_seconds?: number;
+  requested_window_seconds?: number;
+  queries: StatementActivity[];
+  sampler: {
+    sampling: boolean;
+    interval_seconds: number;
+    retention_hours: number;
+    error: string | null;
+    first_snapshot: number | null;
+    last_snapshot: number | null;
+  };
+}
+
+export interface StatementSeriesPoint {
+  from: number;
+  to: number;
+  calls: number;
+  calls_per_second: number | null;
+  mean_time_ms: number | null;
+  rows_per_second: number | null;
+}
+
+// One client backend from pg_stat_activity, keyed by pid and backend_start
+export interface ActivitySession {
+  pid: number;
+  backend_start: string;
+  database: string | null;
+  username: string | null;
+  application_name: string | null;
+  client_addr: string | null;
+  state: string | null;
+  wait_event_type: string | null;
+  wait_event: string | null;
+  backend_xid: string | null;
+  xact_start: string | null;
+  query_start: string | null;
+  state_change: string | null;
+  query: string | null;
+}
+
+export type ActivityEvent =
+  | { type: 'snapshot'; server_time: string; sessions: ActivitySession[] }
+  | {
+      type: 'diff';
+      server_time: string;
+      added: ActivitySession[];
+      removed: { pid: number; backend_start: string }[];
+      changed: ActivitySession[];
+    }
+  | { type: 'error'; error: string };
+
+// A session in a lock chain; blocking holds the sessions waiting on it
+export interface LockNode {
+  pid: number;
+  backend_start: string | null;
+  xact_start?: string | null;
+  database?: string | null;
+  username?: string | null;
+  application_name?: string | null;
+  client_addr?: string | null;
+  state: string | null;
+  wait_event_type?: string | null;
+  wait_event?: string | null;
+  query: string | null;
+  blocked_by: number[];
+  locktype?: string | null;
+  mode?: string | null;
+  relation?: string | null;
+  xact_seconds: number | null;
+  wait_seconds: number | null;
+  blocking: LockNode[];
+}
+
+export interface RootBlocker extends LockNode {
+  deadlock: boolean;
+  directly_blocked: number;
+  blocked_count: number;
+  blocked_wait_seconds: number;
+  max_wait_seconds: number;
+  depth: number;
+}
+
+export interface LockTree {
+  success: boolean;
+  error?: string;
+  roots: RootBlocker[];
+  waiting_count: number;
+  root_count: number;
+  max_wait_seconds: number;
+  deadlock: boolean;
+}
+
+export interface LockEpisode {
+  id: number;
+  pid: number;
+  backend_start: string;
+  xact_start: string;
+  username: string | null;
+  application_name: string | null;
+  state: string | null;
+  query: string | null;
+  first_seen: number;
+  last_seen: number;
+  samples: number;
+  max_blocked: number;
+  max_wait_seconds: number | null;
+  blocked_session_seconds: number;
+}
+
+export interface LockHistory {
+  samples: { sampled_at: number; waiting_count: number; root_count: number; max_wait_seconds: number | null; deadlock: number }[];
+  episodes: LockEpisode[];
+  sampler: { sampling: boolean; interval_seconds: number; retention_hours: number; error: string | null };
+}
+
+// Share of sampled active-session time; average_active_sessions is samples per tick
+export interface WaitShare {
+  samples: number;
+  percent: number;
+  average_active_sessions: number;
+}
+
+export interface WaitProfile {
+  success: boolean;
+  duration_seconds: number;
+  requested_hz: number;
+  achieved_hz: number;
+  ticks: number;
+  missed_ticks: number;
+  samples: number;
+  average_active_sessions: number;
+  wait_types: (WaitShare & { wait_type: string })[];
+  // error bounds the Space-Saving overcount; the true count lies in [samples - error, samples]
+  wait_events: (WaitShare & { wait_event_type: string; wait_event: string | null; error: number })[];
+  queries: (WaitShare & { query_id: string; query: string | null; error: number })[];
+  timeline: { second: number; average_active_sessions: Record<string, number> }[];
+  stacks: { stack: string; samples: number }[];
+  collapsed: string;
+}
+
+// benefit_seconds is the total execution time of the workload statements an index would serve
+export interface IndexProposal {
+  table: string;
+  columns: string[];
+  benefit_seconds: number;
+  workload_percent: number;
+  query_count: number;
+  calls: number;
+  usage: Partial<Record<'equality' | 'range' | 'sort' | 'join', string[]>>;
+  example_queries: string[];
+}
+
+export interface IndexAdvice {
+  success: boolean;
+  source: 'local';
+  recommendations: (IndexProposal & { create_statement: string; replaces: string[]; reason: string })[];
+  covered: (IndexProposal & { index: string })[];
+  analyzed_queries: number;
+  parsed_queries: number;
+  workload_seconds: number;
+  sources: string[];
+  pg_stat_statements_error?: string;
+  narrative?: string;
+  narrative_error?: string;
+  error?: string;
+}
+
+export interface HealthAnalysis {
+  success: boolean;
+  health_score: number;
+  grade: string;
+  critical_issues: any[];
+  action_items: Array<{
+    priority: string;
+    title: string;
+    description: string;
+    fix_sql?: string;
+    impact: string;
+  }>;
+  summary: string;
+  error?: string;
+}
+
+export interface BrowseFilter {
+  column: string;
+  op: '=' | '!=' | '<' | '<=' | '>' | '>=' | 'like' | 'ilike' | 'in' | 'is_null' | 'not_null';
+  value?: any;
+}
+
+export interface BrowseResult extends QueryResult {
+  key_columns?: string[];
+  has_more?: boolean;
+  next_cursor?: string | null;
+}
+
 export interface QueryHistory {
   id: number;
   connection_id: number;
   query: string;
   execution_time: number;
+  statement_timings?: ScriptStatementTiming[];
   executed_at: string;
 }
 
@@ -94,6 +510,15 @@ export interface Settings {
   tab_size?: number;
   auto_complete_enabled?: boolean;
   default_query_limit?: number;
+  pool_max_total_connections?: number;
+  result_cache_ttl_seconds?: number;
+  result_cache_max_mb?: number;
+  query_max_rows?: number;
+  query_max_mb?: number;
+  plan_capture_threshold_ms?: number;
+  pg_stat_sample_interval_seconds?: number;
+  pg_stat_retention_hours?: number;
+  lock_sample_interval_seconds?: number;
 }
 
 export interface AutoCompleteData {